@@ -2,13 +2,17 @@
 Backend file for the monitoring dashboard. This file contains the API endpoints for the dashboard.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import logging
-from src.dashboard.workspace_manager import WorkspaceManager
-from scripts.data_details import load_details
-from src.utils.config_manager import load_config
-from src.dashboard.create_project import update_panels
+from src.dashboard.workspace_manager import WorkspaceManager, get_generation
+from src.utils.config_manager import get_config
+from src.dashboard.dashboard_cache import DashboardCache
+from src.dashboard.filter_options import FilterOptionsCache
+from scripts.data_details import get_details_store
+from src.utils.metric_store import MetricStore
+from src.utils.field_paths import check_panels_map
+from src.dashboard.static_panels import get_fact_card_path, file_digest, asset_name, get_mime_type
 import os
 
 logging.basicConfig(level=logging.INFO)
@@ -30,58 +34,28 @@ CORS(
     resources={r"/*": {"origins": allowed_origins}},
 )
 
-config = load_config()
-details = load_details()
-workspace_instance = WorkspaceManager.get_instance()
-ws = workspace_instance.workspace
+# fail at startup on an invalid panels mapping, the field paths are resolved with Evidently on the first update
+check_panels_map()
+filter_options = FilterOptionsCache(get_config(), store=get_details_store())
+# the workspace (and Evidently) is loaded by the first request that needs it, not when the app is imported
+dashboard_cache = DashboardCache()
+# opened read-only, the flow creates and writes the metric store
+metric_store = MetricStore(read_only=True)
 
 dashboard_url = os.environ.get("DASHBOARD_URL", "http://localhost:3000")
 evidently_url = os.environ.get("EVIDENTLY_URL", "http://localhost:8000")
 
 
-def get_filters(config: dict) -> dict:
-    """
-    Get the filter options for the dashboard.
-    """
-    cols = config["columns"]
-    strata_mapping = {
-        "hospital": details["hospital_unique_values"],
-    }
-    if cols["instrument_type"]:
-        strata_mapping["instrument_type"] = details["instrument_type_unique_values"]
-    if cols["patient_class"]:
-        strata_mapping["patient_class"] = details["patient_class_unique_values"]
-
-    sex_values = details["sex_unique_values"]
-    sex_list = []
-    for sex in sex_values:
-        if sex.lower() == "f":
-            sex_list.append("female")
-        elif sex.lower() == "m":
-            sex_list.append("male")
-        else:
-            sex_list.append(sex)
-    strata_mapping["sex"] = sex_list
-
-    if config["age_filtering"]["filter_type"] == "custom":
-        custom_ranges = config["age_filtering"]["custom_ranges"]
-        range_list = [f"[{range_['min']}-{range_['max']}]" for range_ in custom_ranges]
-        strata_mapping["age"] = range_list
-    else:
-        strata_mapping["age"] = [
-            "[0-18]",
-            "[18-65]",
-            "[65+]",
-        ]
-    return strata_mapping
-
-
 @app.route("/get_filter_options", methods=["GET"])
 def get_filter_options():
     """
-    Get the filter options for the dashboard.
+    Get the filter options for the dashboard. Clients revalidate with the ETag and get a 304 if nothing changed.
     """
-    return jsonify(get_filters(config))
+    body, etag = filter_options.get(get_config())
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
 
 @app.route("/apply_filters", methods=["POST"])
@@ -99,20 +73,63 @@ def apply_filters():
     logger.debug("tags: %s", tags)
 
     workspace_instance = WorkspaceManager.get_instance()
-    workspace_instance.reload_workspace()
+    workspace_instance.reload_if_changed()
     ws = workspace_instance.workspace
 
     if tags:
         logger.info("Applying filters: %s", tags)
-        update_panels(ws, config, tags)
     else:
         logger.info("No filters applied")
-        update_panels(ws, config)
+        tags = ["main", "single"]
+
+    try:
+        dashboard_cache.apply(ws, get_config(), tags, get_generation())
+    except Exception as e:
+        logger.error(f"Error updating panels: {e}")
+        return jsonify({"status": "error", "message": f"Error updating panels: {e}"}), 500
 
     filtered_url = f"{dashboard_url}/dashboard"
     return jsonify({"status": "updated", "filtered_url": filtered_url})
 
 
+@app.route("/metrics_series", methods=["GET"])
+def get_metrics_series():
+    """
+    Get the time series of a dashboard metric for the selected filters, optionally within a time range. The
+    dashboard panels don't use it, they are rendered by Evidently from the snapshots.
+    """
+    metric = request.args.get("metric")
+    if not metric:
+        return jsonify({"status": "error", "message": "Missing metric parameter"}), 400
+
+    tags = [tag for tag in request.args.get("tags", "").split(",") if tag]
+    if len(tags) == 1:
+        tags.append("single")
+    if not tags:
+        tags = ["main", "single"]
+
+    try:
+        series = metric_store.query(tags, metric, request.args.get("start"), request.args.get("end"))
+    except Exception as e:
+        logger.error(f"Error querying metric store: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"metric": metric, "tags": tags, "series": series})
+
+
+@app.route("/assets/<name>", methods=["GET"])
+def get_asset(name):
+    """
+    Serve the fact card image under its content-addressed name, so browsers can cache it indefinitely.
+    """
+    fact_card_path = get_fact_card_path(get_config())
+    if not fact_card_path or name != asset_name(fact_card_path, file_digest(fact_card_path)):
+        return jsonify({"status": "error", "message": "Asset not found"}), 404
+
+    response = send_file(fact_card_path, mimetype=get_mime_type(fact_card_path))
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 @app.route("/get_dashboard_url", methods=["GET"])
 def get_dashboard_url():
     """
@@ -120,9 +137,9 @@ def get_dashboard_url():
     """
     try:
         workspace_instance = WorkspaceManager.get_instance()
-        workspace_instance.reload_workspace()
+        workspace_instance.reload_if_changed()
         ws = workspace_instance.workspace
-        project = ws.search_project(config["info"]["project_name"])[0]
+        project = ws.search_project(get_config()["info"]["project_name"])[0]
         if not evidently_url:
             return jsonify({"status": "error", "message": "Evidently URL not configured"}), 500
         dashboard_url = f"{evidently_url}/projects/{project.id}"
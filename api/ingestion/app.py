@@ -2,16 +2,19 @@
 File to create API endpoints to ingest the results (predictions, data) and labels from the user.
 """
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 from flask_cors import CORS
-from pymongo.mongo_client import MongoClient
 from datetime import datetime, timezone
 import os
 import pandas as pd
 import logging
 from werkzeug.exceptions import RequestEntityTooLarge
 
-from src.utils.config_manager import load_config
+from api.ingestion import metrics
+from src.utils.config_manager import get_config
+from src.utils.mongo import MongoManager
+from src.utils.prometheus_metrics import CONTENT_TYPE
+from src.utils.tracing import TRACE_CONTEXT_FIELD, get_traceparent, instrument_flask, setup_tracing
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -23,9 +26,9 @@ app.config.from_object("api.ingestion.config.Config")
 ingestion_frontend_url = os.environ.get("INGESTION_FRONTEND_URL", "http://localhost:3001")
 
 allowed_origins = [
-    "http://localhost:3001", 
+    "http://localhost:3001",
     "http://localhost:3000",
-    "http://ingestion_frontend:3001", 
+    "http://ingestion_frontend:3001",
     os.environ.get("INGESTION_FRONTEND_URL", ""),
 ]
 
@@ -36,32 +39,37 @@ CORS(
     supports_credentials=True,
     resources={r"/*": {"origins": allowed_origins}},
 )
-# Load the database
-mongo_uri = os.getenv("MONGO_URI")
-db_name = os.getenv("MONGO_DB_NAME", "data_ingestion")
-
 ingestion_api_port = int(os.getenv("INGESTION_API_PORT", 5001))
 
-
-client = MongoClient(mongo_uri)
-db = client[db_name]
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16 MB limit
 
-# Send a ping to confirm a successful connection
-try:
-    client.admin.command("ping")
-    logger.info("Pinged deployment. Connected to MongoDB")
-except Exception as e:
-    logger.error(f"Failed to connect to MongoDB: {e}")
+# Trace the requests, the ingested records keep the trace context of their upload
+setup_tracing("ingestion-api")
+instrument_flask(app)
 
-# Load the configuration
-config = load_config()
-model_id = config["model_config"]["model_id"]
+ALLOWED_EXTENSIONS = {"csv"}
 
-# Load the database
-db = client["data_ingestion"]
 
-ALLOWED_EXTENSIONS = {"csv"}
+class MissingColumnsError(ValueError):
+    """
+    Raised when an uploaded CSV file misses required columns.
+    """
+
+
+@app.before_request
+def start_metrics():
+    """
+    Start dumping the metrics of the worker, on its first request.
+    """
+    metrics.start()
+
+
+@app.route("/metrics")
+def serve_metrics():
+    """
+    Serve the metrics of the API in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype=CONTENT_TYPE)
 
 
 def allowed_file(filename):
@@ -76,6 +84,7 @@ def handle_request_entity_too_large(error):
     """
     Handle the request entity too large error.
     """
+    metrics.too_large.inc()
     return jsonify({"message": "File size too large. Maximum size is 16MB."}), 413
 
 
@@ -98,28 +107,32 @@ def index():
     return render_template("upload.html")
 
 
-def get_column_mapping():
+def validate_csv_columns(df, required_columns):
     """
-    Get the column mapping from the configuration.
+    Validate the CSV columns against the required columns.
     """
-    return config["columns"]
+    df_columns = df.columns.tolist()
+    missing_columns = [col for col in required_columns if col not in df_columns]
+    if missing_columns:
+        raise MissingColumnsError(f"Missing columns: {', '.join(missing_columns)}")
 
 
-def get_model_config():
+def get_rejection_reason(error):
     """
-    Get the model configuration from the configuration.
+    Get the reason label of a rejected upload.
     """
-    return config["model_config"]
+    if isinstance(error, MissingColumnsError):
+        return "missing_columns"
+    if isinstance(error, (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError)):
+        return "unreadable"
+    return "error"
 
 
-def validate_csv_columns(df, required_columns):
+def get_model_label(model_id):
     """
-    Validate the CSV columns against the required columns.
+    Get the model label of the upload metrics, the configured model or other, so the labels stay bounded.
     """
-    df_columns = df.columns.tolist()
-    missing_columns = [col for col in required_columns if col not in df_columns]
-    if missing_columns:
-        raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
+    return model_id if model_id == get_config().model_id else "other"
 
 
 def get_collection(model_id, collection_suffix):
@@ -127,7 +140,7 @@ def get_collection(model_id, collection_suffix):
     Get the collection for the model.
     """
     collection_name = f"{model_id}_{collection_suffix}"
-    return db[collection_name]
+    return MongoManager.get_instance().get_collection(collection_name)
 
 
 @app.route("/ingest_results", methods=["POST"])
@@ -143,86 +156,59 @@ def ingest_results():
         # Load the uploaded CSV file
         file = request.files["csvFile"]
         if not file or not allowed_file(file.filename):
+            metrics.rejected_files.inc(endpoint=request.endpoint, reason="invalid_file")
             return jsonify({"message": "Invalid file."}), 400
 
-        df = pd.read_csv(file)
-
-        if config["columns"]["timestamp"] and config["columns"]["timestamp"] in df.columns:
-            df[config["columns"]["timestamp"]] = pd.to_datetime(df[config["columns"]["timestamp"]])
-
-        columns = get_column_mapping()
-        model_config = get_model_config()
-
-        # Prepare the list of required columns
-        required_columns = [
-            columns["study_id"],
-            columns["sex"],
-            columns["hospital"],
-            columns["age"],
-        ]
-
-        if columns["instrument_type"]:
-            required_columns.append(columns["instrument_type"])
-
-        if columns["patient_class"]:
-            required_columns.append(columns["patient_class"])
+        metrics.uploaded_bytes.inc(request.content_length or 0, endpoint=request.endpoint)
+        with metrics.parse_seconds.time(endpoint=request.endpoint):
+            df = pd.read_csv(file)
 
-        if model_config["model_type"]["regression"]:
-            required_columns.append(columns["predictions"]["regression_prediction"])
-
-        if model_config["model_type"]["binary_classification"]:
-            required_columns.append(columns["predictions"]["classification_prediction"])
+        # the configuration is cached, and reloaded if the file has changed
+        config = get_config()
+        timestamp_col = config["columns"]["timestamp"]
+        if timestamp_col and timestamp_col in df.columns:
+            df[timestamp_col] = pd.to_datetime(df[timestamp_col])
 
         # Validate that the CSV contains all required columns
-        validate_csv_columns(df, required_columns)
+        validate_csv_columns(df, config.results_required_columns)
 
-        # Extract features (all keys that are not part of the defined columns)
-        features = [col for col in df.columns if col not in columns.values()]
+        # Extract features (all columns that are not part of the defined columns)
+        features = [col for col in df.columns if col not in config.defined_columns]
+        # the columns copied from each row, resolved once for the whole file
+        row_columns = list(dict.fromkeys([*config.results_required_columns, *features]))
 
         # Convert dataframe to list of dictionaries
         data = df.to_dict("records")
 
         # Insert data into MongoDB
         results_collection = get_collection(model_id, "results")
+        traceparent = get_traceparent()
         results = []
         for row in data:
-            new_result = {
-                columns["study_id"]: row[columns["study_id"]],
-                columns["sex"]: row.get(columns["sex"]),
-                columns["hospital"]: row.get(columns["hospital"]),
-                columns["age"]: row.get(columns["age"]),
-            }
-            if columns["instrument_type"]:
-                new_result[columns["instrument_type"]] = row.get(columns["instrument_type"])
-
-            if columns["patient_class"]:
-                new_result[columns["patient_class"]] = row.get(columns["patient_class"])
-
-            for feature in features:
-                new_result[feature] = row.get(feature)
-
-            if model_config["model_type"]["regression"]:
-                new_result[columns["predictions"]["regression_prediction"]] = row[
-                    columns["predictions"]["regression_prediction"]
-                ]
-
-            if model_config["model_type"]["binary_classification"]:
-                new_result[columns["predictions"]["classification_prediction"]] = row[
-                    columns["predictions"]["classification_prediction"]
-                ]
-
-            if columns.get("timestamp") and columns["timestamp"] in row:
-                new_result[columns["timestamp"]] = row[columns["timestamp"]]
+            new_result = {column: row.get(column) for column in row_columns}
+
+            if timestamp_col and timestamp_col in row:
+                new_result[timestamp_col] = row[timestamp_col]
             else:
                 new_result["timestamp"] = datetime.now(timezone.utc)
 
+            if traceparent:
+                new_result[TRACE_CONTEXT_FIELD] = traceparent
+
             results.append(new_result)
 
-        results_collection.insert_many(results)
+        with metrics.mongo_write_seconds.time(endpoint=request.endpoint):
+            results_collection.insert_many(results)
+        metrics.uploaded_rows.inc(len(results), endpoint=request.endpoint, model_id=get_model_label(model_id))
+        MongoManager.get_instance().mark_collection(results_collection.name)
 
         logger.info("Results ingested successfully.")
         return jsonify({"message": "Results ingested successfully."}), 200
+    except RequestEntityTooLarge:
+        # raised when the form is read, answered with a 413 by its error handler
+        raise
     except Exception as e:
+        metrics.rejected_files.inc(endpoint=request.endpoint, reason=get_rejection_reason(e))
         logger.error(f"Error occurred while ingesting results: {e}")
         return jsonify({"message": f"Error occurred while ingesting results: {e}"}), 500
 
@@ -240,58 +226,53 @@ def ingest_labels():
         # Load the uploaded CSV file
         file = request.files["csvFile"]
         if not file or not allowed_file(file.filename):
+            metrics.rejected_files.inc(endpoint=request.endpoint, reason="invalid_file")
             return jsonify({"message": "Invalid file."}), 400
 
-        df = pd.read_csv(file)
-
-        if config["columns"]["timestamp"] and config["columns"]["timestamp"] in df.columns:
-            df[config["columns"]["timestamp"]] = pd.to_datetime(df[config["columns"]["timestamp"]])
-
-        columns = get_column_mapping()
-        model_config = get_model_config()
+        metrics.uploaded_bytes.inc(request.content_length or 0, endpoint=request.endpoint)
+        with metrics.parse_seconds.time(endpoint=request.endpoint):
+            df = pd.read_csv(file)
 
-        # Prepare the list of required columns based on user configuration
-        required_columns = [
-            columns["study_id"],
-        ]
-
-        if model_config["model_type"]["regression"]:
-            required_columns.append(columns["labels"]["regression_label"])
-
-        if model_config["model_type"]["binary_classification"]:
-            required_columns.append(columns["labels"]["classification_label"])
+        config = get_config()
+        timestamp_col = config["columns"]["timestamp"]
+        if timestamp_col and timestamp_col in df.columns:
+            df[timestamp_col] = pd.to_datetime(df[timestamp_col])
 
         # Validate that the CSV contains all required columns
-        validate_csv_columns(df, required_columns)
+        validate_csv_columns(df, config.labels_required_columns)
 
         # Convert dataframe to list of dictionaries
         data = df.to_dict("records")
 
         # Insert data into MongoDB
         labels_collection = get_collection(model_id, "labels")
+        traceparent = get_traceparent()
         labels = []
         for row in data:
-            new_label = {
-                columns["study_id"]: row[columns["study_id"]],
-            }
-            if model_config["model_type"]["regression"]:
-                new_label[columns["labels"]["regression_label"]] = row[columns["labels"]["regression_label"]]
+            new_label = {column: row.get(column) for column in config.labels_required_columns}
 
-            if model_config["model_type"]["binary_classification"]:
-                new_label[columns["labels"]["classification_label"]] = row[columns["labels"]["classification_label"]]
-
-            if columns.get("timestamp") and columns["timestamp"] in row:
-                new_label[columns["timestamp"]] = row[columns["timestamp"]]
+            if timestamp_col and timestamp_col in row:
+                new_label[timestamp_col] = row[timestamp_col]
             else:
                 new_label["timestamp"] = datetime.now(timezone.utc)
 
+            if traceparent:
+                new_label[TRACE_CONTEXT_FIELD] = traceparent
+
             labels.append(new_label)
 
-        labels_collection.insert_many(labels)
+        with metrics.mongo_write_seconds.time(endpoint=request.endpoint):
+            labels_collection.insert_many(labels)
+        metrics.uploaded_rows.inc(len(labels), endpoint=request.endpoint, model_id=get_model_label(model_id))
+        MongoManager.get_instance().mark_collection(labels_collection.name)
 
         logger.info("Labels ingested successfully.")
         return jsonify({"message": "Labels ingested successfully."}), 200
+    except RequestEntityTooLarge:
+        # raised when the form is read, answered with a 413 by its error handler
+        raise
     except Exception as e:
+        metrics.rejected_files.inc(endpoint=request.endpoint, reason=get_rejection_reason(e))
         logger.error(f"Error occurred while ingesting labels: {str(e)}")
         return (
             jsonify({"message": f"Error occurred while ingesting labels: {str(e)}"}),
@@ -308,7 +289,7 @@ def check_model_id():
     if not model_id:
         return jsonify({"message": "Model ID not provided."}), 400
 
-    if db.list_collection_names(filter={"name": f"{model_id}_results"}):
+    if MongoManager.get_instance().collection_exists(f"{model_id}_results"):
         return (
             jsonify({"message": "Model ID already in use."}),
             409,
@@ -328,11 +309,10 @@ def authenticate():
         return jsonify({"message": "Model ID not provided."}), 400
 
     if action == "signup":
-        if db.list_collection_names(filter={"name": f"{model_id}_results"}) or db.list_collection_names(
-            filter={"name": f"{model_id}_labels"}
-        ):
+        mongo = MongoManager.get_instance()
+        if mongo.collection_exists(f"{model_id}_results") or mongo.collection_exists(f"{model_id}_labels"):
             return jsonify({"message": "Model ID is already in use."}), 409
-        if model_id != config["model_config"]["model_id"]:
+        if model_id != get_config().model_id:
             return (
                 jsonify({"message": "Model ID does not match the configuration file."}),
                 400,
@@ -340,7 +320,7 @@ def authenticate():
         return jsonify({"message": "Sign up successful.", "model": model_id}), 200
 
     elif action == "login":
-        if model_id == config["model_config"]["model_id"]:
+        if model_id == get_config().model_id:
             return (
                 jsonify({"message": "Authentication successful.", "model": model_id}),
                 200,
@@ -0,0 +1,132 @@
+"""
+File to define the metrics of the ingestion API, served on /metrics: uploaded rows and bytes, parse time, MongoDB write latency, rejected files, uploads over the size limit, and the backlog of results and labels not yet matched by the ETL, per model.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from scripts.data_details import file_lock
+from src.utils.mongo import MongoManager
+from src.utils.prometheus_metrics import MetricsRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKLOG_INTERVAL = 30
+BACKLOG_KINDS = ("results", "labels")
+
+
+def get_metrics_dir() -> str:
+    """
+    Get the directory where the workers dump their metrics: INGESTION_METRICS_DIR, or a temporary directory shared by
+    the workers of the server.
+    """
+    # the workers are children of the server process
+    return os.getenv("INGESTION_METRICS_DIR") or os.path.join(
+        tempfile.gettempdir(), f"ingestion-metrics-{os.getppid()}"
+    )
+
+
+registry = MetricsRegistry(get_metrics_dir())
+
+uploaded_rows = registry.counter("ingestion_uploaded_rows_total", "Rows ingested.", ("endpoint", "model_id"))
+uploaded_bytes = registry.counter("ingestion_uploaded_bytes_total", "Bytes of the upload requests.", ("endpoint",))
+parse_seconds = registry.histogram("ingestion_parse_seconds", "Time to parse an uploaded CSV file.", ("endpoint",))
+mongo_write_seconds = registry.histogram(
+    "ingestion_mongo_write_seconds", "Time to insert the rows of an upload into MongoDB.", ("endpoint",)
+)
+rejected_files = registry.counter("ingestion_rejected_files_total", "Uploads rejected.", ("endpoint", "reason"))
+too_large = registry.counter("ingestion_request_too_large_total", "Requests over the size limit (413).")
+backlog_documents = registry.gauge(
+    "ingestion_backlog_documents", "Results and labels waiting to be matched by the ETL.", ("model_id", "kind")
+)
+backlog_refreshed = registry.gauge(
+    "ingestion_backlog_refreshed_timestamp_seconds", "Unix time of the last count of the backlog."
+)
+
+
+def count_backlog(mongo: MongoManager) -> dict:
+    """
+    Count the documents of the results and labels collections, by (model_id, kind). The ETL moves the matched ones
+    out, so these are the unmatched ones.
+    """
+    counts = {}
+    for name in sorted(mongo.refresh_collections()):
+        model_id, _, kind = name.rpartition("_")
+        if model_id and kind in BACKLOG_KINDS:
+            # from the collection metadata, without scanning it
+            counts[(model_id, kind)] = mongo.get_collection(name).estimated_document_count()
+    return counts
+
+
+class BacklogMonitor:
+    """
+    Count the backlog in a background thread every interval seconds, so a scrape only reads the last counts. The
+    workers elect one poller through a lock file: the others wait on the lock and take over when the poller exits.
+    """
+
+    def __init__(self, interval: float = None, get_mongo=MongoManager.get_instance, lock_path: str = None):
+        self.interval = interval or float(os.getenv("INGESTION_BACKLOG_INTERVAL") or DEFAULT_BACKLOG_INTERVAL)
+        self.get_mongo = get_mongo
+        self.lock_path = lock_path or os.path.join(registry.dump_dir, "backlog")
+        self.thread = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """
+        Count the backlog and update the gauges.
+        """
+        for (model_id, kind), count in count_backlog(self.get_mongo()).items():
+            backlog_documents.set(count, model_id=model_id, kind=kind)
+        backlog_refreshed.set(time.time())
+
+    def run(self) -> None:
+        """
+        Wait to be elected, then refresh the backlog every interval seconds, failed or not, until stopped.
+        """
+        with file_lock(self.lock_path):
+            logger.info(f"Worker {os.getpid()} counts the ingestion backlog.")
+            while not self.stopped.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Error counting the ingestion backlog: {e}")
+                self.stopped.wait(self.interval)
+
+    def start(self) -> None:
+        """
+        Start the background thread, once per process.
+        """
+        with self.lock:
+            if self.thread is None or self.thread[0] != os.getpid():
+                thread = threading.Thread(target=self.run, name="ingestion-backlog", daemon=True)
+                thread.start()
+                self.thread = (os.getpid(), thread)
+
+    def stop(self) -> None:
+        """
+        Stop refreshing the backlog, releasing the lock for another worker.
+        """
+        self.stopped.set()
+
+
+backlog = BacklogMonitor()
+
+
+def start() -> None:
+    """
+    Start dumping the metrics of the worker and counting the backlog.
+    """
+    registry.start()
+    backlog.start()
+
+
+def render() -> str:
+    """
+    Render the metrics of all the workers, with the last counts of the backlog.
+    """
+    return registry.render()
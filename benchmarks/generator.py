@@ -0,0 +1,177 @@
+"""
+File to generate synthetic bone age workloads with the column mapping of the configuration file: results and labels with controlled hospital, sex and age distributions, drift injected into the most recent rows, and labels lagging behind the results.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKLOAD = {
+    # hospital names, from the hospital test of the configuration when not set
+    "hospitals": None,
+    # relative weights of the hospitals, uniform when not set
+    "hospital_weights": None,
+    "female_share": 0.5,
+    # chronological age in months
+    "age_mean": 130.0,
+    "age_std": 45.0,
+    "age_min": 1.0,
+    "age_max": 228.0,
+    # prediction error in months, and threshold of the classification (e.g. delayed bone age)
+    "prediction_std": 6.0,
+    "classification_threshold": 12.0,
+    # share of the most recent rows with drift, and the drift applied to them
+    "drift_fraction": 0.0,
+    "drift_age_shift": 24.0,
+    "drift_prediction_bias": 6.0,
+    "drift_female_share": None,
+    "drift_hospital_weights": None,
+    # share of the results without a label yet
+    "label_lag": 0.0,
+    "days": 30,
+    "end": None,
+    "seed": 42,
+}
+
+
+def get_workload_options(options: dict = None) -> dict:
+    """
+    Get the workload options, the defaults updated with the given ones.
+    """
+    workload = dict(DEFAULT_WORKLOAD)
+    for key, value in (options or {}).items():
+        if key not in workload:
+            raise ValueError(f"Unknown workload option: {key}")
+        if value is not None:
+            workload[key] = value
+    return workload
+
+
+def get_listed_values(config: dict, column: str) -> list:
+    """
+    Get the values allowed for a column by the test_col_list tests of the configuration.
+    """
+    for test in config.get("tests", {}).get("data_quality_tests", []):
+        params = test.get("params", {})
+        if test["name"] == "test_col_list" and params.get("column_name") == column:
+            return list(params["values"])
+    return []
+
+
+def get_hospitals(config: dict, workload: dict, faker: Faker) -> list:
+    """
+    Get the hospital names: from the workload, the configuration, or generated.
+    """
+    hospitals = workload["hospitals"] or get_listed_values(config, config["columns"]["hospital"])
+    if not hospitals:
+        hospitals = [f"{faker.city()} Hospital" for _ in range(3)]
+    return list(hospitals)
+
+
+def get_probabilities(weights, size: int) -> np.ndarray:
+    """
+    Normalize the weights of the categories, uniform when not set.
+    """
+    if not weights:
+        return np.full(size, 1 / size)
+    if len(weights) != size:
+        raise ValueError(f"Expected {size} weights, got {len(weights)}")
+    weights = np.asarray(weights, dtype=float)
+    return weights / weights.sum()
+
+
+def generate_workload(config: dict, num_rows: int, options: dict = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Generate the results and labels of a workload, ordered by timestamp. The last drift_fraction of the rows are
+    drifted, and label_lag of the results have no label.
+    """
+    workload = get_workload_options(options)
+    columns = config["columns"]
+    model_type = config["model_config"]["model_type"]
+    rng = np.random.default_rng(workload["seed"])
+    faker = Faker()
+    faker.seed_instance(workload["seed"])
+
+    hospitals = get_hospitals(config, workload, faker)
+    sexes = get_listed_values(config, columns["sex"]) or ["M", "F"]
+    drifted = np.arange(num_rows) >= num_rows - int(round(num_rows * workload["drift_fraction"]))
+
+    # hospital and sex, with the drifted mix on the drifted rows
+    hospital_p = get_probabilities(workload["hospital_weights"], len(hospitals))
+    drift_hospital_p = get_probabilities(
+        workload["drift_hospital_weights"] or workload["hospital_weights"], len(hospitals)
+    )
+    hospital = np.where(
+        drifted,
+        rng.choice(hospitals, size=num_rows, p=drift_hospital_p),
+        rng.choice(hospitals, size=num_rows, p=hospital_p),
+    )
+    female_share = np.where(
+        drifted,
+        workload["drift_female_share"] if workload["drift_female_share"] is not None else workload["female_share"],
+        workload["female_share"],
+    )
+    female = "F" if "F" in sexes else sexes[-1]
+    male = "M" if "M" in sexes else sexes[0]
+    sex = np.where(rng.random(num_rows) < female_share, female, male)
+
+    # age, and a label around it with the prediction error (and bias on the drifted rows)
+    age = rng.normal(workload["age_mean"], workload["age_std"], num_rows) + drifted * workload["drift_age_shift"]
+    age = np.clip(age, workload["age_min"], workload["age_max"]).round(1)
+    label = np.clip(age + rng.normal(0, 12, num_rows), workload["age_min"], workload["age_max"]).round(1)
+    prediction = (label + rng.normal(0, workload["prediction_std"], num_rows)).round(1)
+    prediction += drifted * workload["drift_prediction_bias"]
+
+    # timestamps spread over the period, in order, naive UTC like the ones read from MongoDB
+    end = pd.Timestamp(workload["end"] or pd.Timestamp.now(tz="UTC").floor("s"))
+    if end.tzinfo is not None:
+        end = end.tz_convert("UTC").tz_localize(None)
+    offsets = np.sort(rng.uniform(0, workload["days"] * 86400, num_rows))[::-1]
+    timestamp = end - pd.to_timedelta(offsets.round(), unit="s")
+
+    prefix = faker.bothify("??").upper()
+    study_id = [f"{prefix}{i:09d}" for i in range(num_rows)]
+
+    results = pd.DataFrame(
+        {
+            columns["study_id"]: study_id,
+            columns["sex"]: sex,
+            columns["hospital"]: hospital,
+            columns["age"]: age,
+        }
+    )
+    if columns["instrument_type"]:
+        results[columns["instrument_type"]] = rng.choice(["Scanner A", "Scanner B"], size=num_rows)
+    if columns["patient_class"]:
+        results[columns["patient_class"]] = rng.choice(["Inpatient", "Outpatient", "Emergency"], size=num_rows)
+    for feature, offset in zip(columns.get("features") or [], (12.0, -12.0)):
+        # e.g. the upper and lower limits of the prediction
+        results[feature] = (prediction + offset).round(1)
+
+    labels = pd.DataFrame({columns["study_id"]: study_id})
+    delayed = (label - age) > workload["classification_threshold"]
+    if model_type["regression"]:
+        results[columns["predictions"]["regression_prediction"]] = prediction
+        labels[columns["labels"]["regression_label"]] = label
+    if model_type["binary_classification"]:
+        predicted_delayed = (prediction - age) > workload["classification_threshold"]
+        results[columns["predictions"]["classification_prediction"]] = predicted_delayed.astype(int)
+        labels[columns["labels"]["classification_label"]] = delayed.astype(int)
+
+    timestamp_col = columns.get("timestamp") or "timestamp"
+    results[timestamp_col] = timestamp
+    labels[timestamp_col] = timestamp
+
+    # the labels of the most recent results are still missing
+    num_labelled = num_rows - int(round(num_rows * workload["label_lag"]))
+    labels = labels.iloc[:num_labelled].reset_index(drop=True)
+
+    logger.info(
+        f"Generated {num_rows} results and {len(labels)} labels, {int(drifted.sum())} drifted rows, "
+        f"hospitals {hospitals}."
+    )
+    return results, labels
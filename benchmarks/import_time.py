@@ -0,0 +1,138 @@
+"""
+Script to benchmark the cold start of the entry points: each one is imported in a new interpreter with python -X importtime, and the wall time of the interpreter, the import time of the entry point and the heaviest packages it loads are saved. The medians can be compared with a baseline, e.g. saved before a change to the imports.
+
+Run from the root of the repository:
+    python -m benchmarks.import_time --save-baseline
+    python -m benchmarks.import_time --target 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.micro import compare
+from benchmarks.results import ROOT_DIR, get_environment, save_results
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(ROOT_DIR, "benchmarks", "import_baseline.json")
+DEFAULT_ENTRYPOINTS = ["flow.main", "api.dashboard.app", "api.ingestion.app"]
+DEFAULT_REPEATS = 5
+DEFAULT_TOP = 10
+
+
+def parse_importtime(output: str, module: str) -> tuple[float, dict]:
+    """
+    Parse the output of -X importtime. Return the cumulative import time of the module in seconds, and the self time
+    of each top-level package in seconds.
+    """
+    module_seconds = 0.0
+    packages = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+        if name == module:
+            module_seconds = int(cumulative_us) / 1e6
+    return module_seconds, packages
+
+
+def measure(module: str) -> dict:
+    """
+    Import a module in a new interpreter. Return the wall time, the import time and the packages, or the error.
+    """
+    env = {**os.environ, "PYTHONPATH": ROOT_DIR}
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        return {"error": process.stderr.strip().splitlines()[-1]}
+    import_seconds, packages = parse_importtime(process.stderr, module)
+    return {"wall_seconds": wall_seconds, "import_seconds": import_seconds, "packages": packages}
+
+
+def run_entrypoint(module: str, repeats: int, top: int) -> dict:
+    """
+    Measure the cold start of an entry point. Return the medians and the heaviest packages of the last run.
+    """
+    runs = [measure(module) for _ in range(repeats)]
+    if "error" in runs[-1]:
+        logger.error(f"{module} can't be imported: {runs[-1]['error']}")
+        return {"error": runs[-1]["error"]}
+    wall_times = [run["wall_seconds"] for run in runs]
+    packages = sorted(runs[-1]["packages"].items(), key=lambda item: item[1], reverse=True)[:top]
+    result = {
+        "median_seconds": round(statistics.median(wall_times), 4),
+        "min_seconds": round(min(wall_times), 4),
+        "import_seconds": round(statistics.median(run["import_seconds"] for run in runs), 4),
+        "packages": {package: round(seconds, 4) for package, seconds in packages},
+    }
+    logger.info(
+        f"{module}: {result['median_seconds']:.3f} s cold start, {result['import_seconds']:.3f} s importing it, "
+        f"heaviest: {', '.join(f'{package} {seconds:.2f} s' for package, seconds in packages[:5])}"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the entry points.")
+    parser.add_argument("--entrypoints", nargs="+", default=DEFAULT_ENTRYPOINTS, help="Modules to import")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of heaviest packages to save")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the baseline")
+    parser.add_argument(
+        "--target", type=float, default=None, help="Reduction of the cold start expected against the baseline, in %%"
+    )
+    parser.add_argument("--threshold", type=float, default=20.0, help="Slowdown allowed against the baseline, in %%")
+    parser.add_argument("--output", default=None, help="Results file, by default in benchmarks/results")
+    args = parser.parse_args()
+
+    entrypoints = {module: run_entrypoint(module, args.repeats, args.top) for module in args.entrypoints}
+    results = {
+        "benchmark": "import_time",
+        "started_at": datetime.now().strftime("%Y%m%dT%H%M%S"),
+        "environment": get_environment(),
+        "repeats": args.repeats,
+        "cases": {module: result for module, result in entrypoints.items() if "error" not in result},
+        "errors": {module: result["error"] for module, result in entrypoints.items() if "error" in result},
+    }
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        sys.exit(0)
+
+    save_results(results, args.output)
+    if not os.path.exists(args.baseline):
+        logger.warning(f"No baseline at {args.baseline}, run with --save-baseline to create it.")
+        sys.exit(0)
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results["cases"], baseline["cases"], args.threshold)
+    missed = []
+    if args.target is not None:
+        # e.g. a target of 50 expects the cold start to be halved
+        missed = compare(results["cases"], baseline["cases"], -args.target)
+        for case in missed:
+            logger.error(f"{case['case']} missed the target: {case['change_percent']:+.1f}% against the baseline")
+    for regression in regressions:
+        logger.error(f"{regression['case']} is {regression['change_percent']:.1f}% slower than the baseline")
+    if regressions or missed:
+        sys.exit(1)
@@ -0,0 +1,202 @@
+"""
+Script to micro-benchmark the pandas hot paths of the pipeline, DataSplitter.strata_products and validate_schema, over a grid of row counts, numbers of hospitals and stratum depths (the number of stratified columns: sex, age and hospital, then instrument type and patient class). The median times are compared with a baseline, and the script fails when a case is slower than the baseline by more than the threshold.
+
+Run from the root of the repository:
+    python -m benchmarks.micro
+    python -m benchmarks.micro --benchmarks strata_products --rows 1000 10000 --threshold 10
+    python -m benchmarks.micro --save-baseline
+
+Baselines are only comparable on the same machine: save one before a change, and compare after it.
+"""
+
+import argparse
+import copy
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from itertools import product
+
+from benchmarks.generator import generate_workload
+from benchmarks.results import ROOT_DIR, get_environment, save_results
+from scripts.data_details import default_details, update_details
+from src.data_preprocessing.validate import config_mappings, validate_schema
+from src.monitoring.stratify import DataSplitter
+from src.utils.config_manager import load_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 20.0
+DEFAULT_REPEATS = 5
+DEFAULT_HOSPITALS = [3, 10]
+DEFAULT_DEPTHS = [3, 5]
+# validate_schema checks each row, so it runs on fewer rows
+DEFAULT_ROWS = {"strata_products": [1000, 10000], "validate_schema": [200, 1000]}
+# columns stratified beyond sex, age and hospital, by depth
+EXTRA_STRATUM_COLUMNS = [("instrument_type", "Instrument Type"), ("patient_class", "Patient Class")]
+
+
+def get_case_config(config: dict, depth: int) -> dict:
+    """
+    Get the configuration of a stratum depth, from 3 (sex, age, hospital) to 5 (and instrument type, patient class).
+    """
+    if not 3 <= depth <= 3 + len(EXTRA_STRATUM_COLUMNS):
+        raise ValueError(f"The stratum depth must be between 3 and {3 + len(EXTRA_STRATUM_COLUMNS)}, got {depth}")
+    case_config = copy.deepcopy(config)
+    for i, (column, name) in enumerate(EXTRA_STRATUM_COLUMNS):
+        case_config["columns"][column] = name if 3 + i < depth else None
+    return case_config
+
+
+def prepare_case(config: dict, num_rows: int, num_hospitals: int, depth: int) -> tuple:
+    """
+    Generate the matched data of a case, with its configuration and details.
+    """
+    case_config = get_case_config(config, depth)
+    hospitals = [f"Hospital {i + 1}" for i in range(num_hospitals)]
+    results, labels = generate_workload(case_config, num_rows, {"hospitals": hospitals, "seed": 0})
+    timestamp_col = case_config["columns"].get("timestamp") or "timestamp"
+    data = results.merge(labels.drop(columns=[timestamp_col]), on=case_config["columns"]["study_id"])
+    details = default_details()
+    update_details(data, case_config, details)
+    return case_config, data, details
+
+
+def setup_strata_products(config: dict, data, details: dict):
+    """
+    Split the data by column, and return the call combining the strata two by two.
+    """
+    splitter = DataSplitter()
+    filter_dict = {"main_report": data}
+    filter_dict.update(splitter.stratify_sex(data, config, details))
+    filter_dict.update(splitter.stratify_age(data, config, details))
+    for column in ["hospital", "instrument_type", "patient_class"]:
+        if config["columns"][column]:
+            filter_dict.update(splitter.stratify_list(data, config, details, column))
+    return lambda: splitter.strata_products(data, filter_dict, "report")
+
+
+def setup_validate_schema(config: dict, data, details: dict):
+    """
+    Return the call validating the data against the JSON schema.
+    """
+    mapping = config_mappings(config["columns"], {})
+    return lambda: validate_schema(data, mapping)
+
+
+BENCHMARKS = {
+    "strata_products": setup_strata_products,
+    "validate_schema": setup_validate_schema,
+}
+
+
+def time_call(function, repeats: int) -> dict:
+    """
+    Time the calls of a function, after a warm-up call. Return the median and the minimum in seconds.
+    """
+    function()
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"median_seconds": round(statistics.median(times), 6), "min_seconds": round(min(times), 6)}
+
+
+def get_case_id(name: str, num_rows: int, num_hospitals: int, depth: int) -> str:
+    """
+    Get the identifier of a case, to match it with the baseline.
+    """
+    return f"{name}[rows={num_rows},hospitals={num_hospitals},depth={depth}]"
+
+
+def run_benchmarks(config: dict, names: list, rows: list, hospitals: list, depths: list, repeats: int) -> dict:
+    """
+    Run the benchmarks over the grid of cases. Return the timings by case identifier.
+    """
+    cases = {}
+    for name in names:
+        for num_rows, num_hospitals, depth in product(rows or DEFAULT_ROWS[name], hospitals, depths):
+            case_config, data, details = prepare_case(config, num_rows, num_hospitals, depth)
+            function = BENCHMARKS[name](case_config, data, details)
+            case_id = get_case_id(name, num_rows, num_hospitals, depth)
+            cases[case_id] = time_call(function, repeats)
+            logger.info(f"{case_id}: {cases[case_id]['median_seconds'] * 1000:.2f} ms")
+    return cases
+
+
+def compare(cases: dict, baseline_cases: dict, threshold: float) -> list:
+    """
+    Compare the median times with the baseline. Return the cases slower by more than the threshold (in percent),
+    with their change.
+    """
+    regressions = []
+    for case_id, timing in cases.items():
+        if case_id not in baseline_cases:
+            continue
+        baseline = baseline_cases[case_id]["median_seconds"]
+        change = (timing["median_seconds"] - baseline) / baseline * 100 if baseline else 0.0
+        logger.info(f"{case_id}: {change:+.1f}% against the baseline")
+        if change > threshold:
+            regressions.append({"case": case_id, "baseline_seconds": baseline, **timing, "change_percent": change})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark the stratification and validation hot paths.")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--rows", type=int, nargs="+", default=None, help="Row counts, by default per benchmark")
+    parser.add_argument("--hospitals", type=int, nargs="+", default=DEFAULT_HOSPITALS)
+    parser.add_argument("--depths", type=int, nargs="+", default=DEFAULT_DEPTHS, help="Stratum depths, 3 to 5")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.getenv("MICRO_BENCHMARK_THRESHOLD") or DEFAULT_THRESHOLD),
+        help="Slowdown allowed against the baseline, in percent",
+    )
+    parser.add_argument("--output", default=None, help="Results file, by default in benchmarks/results")
+    args = parser.parse_args()
+
+    # silence the warnings of the validation of each row
+    logging.getLogger("src.data_preprocessing.validate").setLevel(logging.ERROR)
+    cases = run_benchmarks(load_config(), args.benchmarks, args.rows, args.hospitals, args.depths, args.repeats)
+    results = {
+        "benchmark": "micro",
+        "started_at": datetime.now().strftime("%Y%m%dT%H%M%S"),
+        "environment": get_environment(),
+        "repeats": args.repeats,
+        "cases": cases,
+    }
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        sys.exit(0)
+
+    save_results(results, args.output)
+    if not os.path.exists(args.baseline):
+        logger.warning(f"No baseline at {args.baseline}, run with --save-baseline to create it.")
+        sys.exit(0)
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline["environment"]["platform"] != results["environment"]["platform"]:
+        logger.warning("The baseline was saved on another platform, the comparison may not be meaningful.")
+    regressions = compare(cases, baseline["cases"], args.threshold)
+    for regression in regressions:
+        logger.error(
+            f"{regression['case']} is {regression['change_percent']:.1f}% slower than the baseline "
+            f"({regression['baseline_seconds'] * 1000:.2f} ms -> {regression['median_seconds'] * 1000:.2f} ms)"
+        )
+    if regressions:
+        sys.exit(1)
+    logger.info(f"No case is more than {args.threshold}% slower than the baseline.")
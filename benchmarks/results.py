@@ -0,0 +1,49 @@
+"""
+File to describe the environment of a benchmark run and save its results, to compare runs.
+"""
+
+import json
+import logging
+import os
+import platform
+import subprocess
+import pandas as pd
+import psutil
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+
+def get_environment() -> dict:
+    """
+    Get the description of the machine and the code the benchmark ran on, to compare results files.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "memory_mb": round(psutil.virtual_memory().total / (1024 * 1024)),
+    }
+
+
+def save_results(results: dict, file_path: str = None) -> str:
+    """
+    Save the results as JSON, by default in benchmarks/results. Return the path.
+    """
+    file_path = file_path or os.path.join(RESULTS_DIR, f"{results['benchmark']}-{results['started_at']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    with open(file_path, "w") as file:
+        json.dump(results, file, indent=2)
+    logger.info(f"Benchmark results saved to {file_path}")
+    return file_path
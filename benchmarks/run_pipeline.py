@@ -0,0 +1,268 @@
+"""
+Script to benchmark the monitoring pipeline end to end on synthetic workloads: ingestion through the API, the ETL, the stratification, the reports and tests, the alerts and the dashboard update. Each size runs in its own working directory against an in-memory MongoDB (mongomock) or a MongoDB deployment, and the wall time, CPU time, peak RSS and throughput of each stage are saved to a results file comparable across runs.
+
+Run from the root of the repository, outside the docker environment:
+    python -m benchmarks.run_pipeline --sizes 10000 100000 1000000
+    python -m benchmarks.run_pipeline --sizes 10000 --drift-fraction 0.3 --label-lag 0.2 --max-strata 5
+"""
+
+import argparse
+import io
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+import mongomock
+import pandas as pd
+from pymongo import MongoClient
+
+from evidently.ui.workspace import Workspace
+
+from api.ingestion.app import app
+from benchmarks.generator import DEFAULT_WORKLOAD, generate_workload, get_workload_options
+from benchmarks.results import ROOT_DIR, get_environment, save_results
+from scripts.data_details import get_details_store
+from src.data_preprocessing.etl import etl_pipeline
+from src.monitoring.stratify import DataSplitter
+from src.monitoring.scheduler import schedule_strata
+from src.monitoring.metrics import generate_report
+from src.monitoring.tests import compile_test_plan, generate_tests
+from src.monitoring.alerts import AlertDispatcher, AlertQueue, StubTransport
+from src.monitoring.alert_state import AlertStateStore
+from src.dashboard.create_project import create_or_update
+from src.utils.config_manager import get_config
+from src.utils.mongo import MongoManager
+from src.utils.profiling import start_profile, stage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_REFERENCE_ROWS = 10000
+# rows per uploaded CSV file, under the 16 MB limit of the API
+UPLOAD_ROWS = 20000
+# files read with paths relative to the working directory
+SHARED_FILES = ["config", "src/utils/tests_map.json", "src/utils/panels_map.json"]
+
+
+def prepare_work_dir(work_dir: str) -> None:
+    """
+    Prepare a working directory for a run: the pipeline writes its snapshots, details and reference data relative
+    to it, and reads the configuration and mappings of the repository through links.
+    """
+    for relative_path in SHARED_FILES:
+        link_path = os.path.join(work_dir, relative_path)
+        os.makedirs(os.path.dirname(link_path), exist_ok=True)
+        os.symlink(os.path.join(ROOT_DIR, relative_path), link_path)
+    os.makedirs(os.path.join(work_dir, "data"), exist_ok=True)
+
+
+def get_mongo(mongo_uri: str, db_name: str) -> MongoManager:
+    """
+    Get a manager on an empty database: in memory, or on the deployment at mongo_uri.
+    """
+    if not mongo_uri:
+        return MongoManager(mongomock.MongoClient(), db_name)
+    mongo = MongoManager(MongoClient(mongo_uri), db_name)
+    mongo.client.drop_database(db_name)
+    return mongo
+
+
+def write_reference_data(config: dict, num_rows: int, workload: dict, file_path: str) -> None:
+    """
+    Write the reference data: matched results and labels of the same workload, without drift.
+    """
+    options = {**workload, "drift_fraction": 0.0, "label_lag": 0.0, "seed": workload["seed"] + 1}
+    results, labels = generate_workload(config, num_rows, options)
+    timestamp_col = config["columns"].get("timestamp") or "timestamp"
+    reference = results.merge(labels.drop(columns=[timestamp_col]), on=config["columns"]["study_id"])
+    reference.to_csv(file_path, index=False)
+
+
+def upload(client, endpoint: str, model_id: str, data: pd.DataFrame) -> int:
+    """
+    Upload the data to an ingestion endpoint in CSV files. Return the number of bytes sent.
+    """
+    num_bytes = 0
+    for start in range(0, len(data), UPLOAD_ROWS):
+        content = data.iloc[start : start + UPLOAD_ROWS].to_csv(index=False).encode()
+        response = client.post(
+            endpoint,
+            data={"model_id": model_id, "csvFile": (io.BytesIO(content), "upload.csv")},
+            content_type="multipart/form-data",
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Upload to {endpoint} failed ({response.status_code}): {response.get_json()}")
+        num_bytes += len(content)
+    return num_bytes
+
+
+def select_strata(stratifications: dict, config: dict, max_strata: int) -> list:
+    """
+    Get the (key, data) pairs scheduled by the flow, the largest first, limited to max_strata.
+    """
+    strata = [item for batch in schedule_strata(stratifications, config) for item in batch]
+    strata.sort(key=lambda item: len(item[1]), reverse=True)
+    return strata[:max_strata] if max_strata else strata
+
+
+def run_pipeline(config: dict, results: pd.DataFrame, labels: pd.DataFrame, max_strata: int) -> dict:
+    """
+    Run the pipeline on a workload in the current directory, profiling each stage. Return the counts of the run.
+    """
+    model_id = config["model_config"]["model_id"]
+    model_type = config["model_config"]["model_type"]
+    timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    counts = {}
+
+    client = app.test_client()
+    with stage("ingest", rows_in=len(results) + len(labels)) as record:
+        counts["uploaded_bytes"] = upload(client, "/ingest_results", model_id, results)
+        counts["uploaded_bytes"] += upload(client, "/ingest_labels", model_id, labels)
+        record["rows_out"] = len(results) + len(labels)
+
+    with stage("etl", rows_in=len(results) + len(labels)) as record:
+        data, reference_data = etl_pipeline(config)
+        if data is None:
+            raise RuntimeError("The ETL returned no data")
+        record["rows_out"] = len(data)
+    counts["matched_rows"] = len(data)
+    details = get_details_store().load()
+
+    strata = {}
+    for operation in ["report", "test"]:
+        with stage(f"stratify:{operation}", rows_in=len(data)) as record:
+            stratifications = DataSplitter().split_data(data, config, details, operation)
+            record["rows_out"] = sum(len(stratum) for stratum in stratifications.values())
+        strata[operation] = select_strata(stratifications, config, max_strata)
+        counts[f"{operation}_strata"] = {"total": len(stratifications), "run": len(strata[operation])}
+
+    for key, stratum in strata["report"]:
+        with stage(f"report:{key}", rows_in=len(stratum)):
+            generate_report(stratum, reference_data, config, model_type, f"/reports/{key}", timestamp, details)
+
+    test_plan = compile_test_plan(config)
+    alert_queue = AlertQueue()
+    for key, stratum in strata["test"]:
+        with stage(f"test:{key}", rows_in=len(stratum)):
+            generate_tests(
+                stratum,
+                reference_data,
+                config,
+                model_type,
+                f"/tests/{key}",
+                timestamp,
+                details,
+                test_plan=test_plan,
+                alert_queue=alert_queue,
+            )
+
+    transport = StubTransport()
+    with stage("alerts"):
+        AlertDispatcher(config, transport=transport, state=AlertStateStore("alerts.db")).dispatch(
+            alert_queue, timestamp
+        )
+    counts["alert_emails"] = len(transport.sent)
+
+    with stage("dashboard_update"):
+        workspace = Workspace.create(os.path.abspath("workspace"))
+        create_or_update(workspace, config, snapshots_dir=os.path.abspath("snapshots"))
+    return counts
+
+
+def summarize(profile) -> dict:
+    """
+    Get the totals of each stage type, with their throughput in input rows per second.
+    """
+    stages = {}
+    for stage_type, totals in profile.summary().items():
+        throughput = (
+            totals["rows_in"] / totals["wall_seconds"] if totals["rows_in"] and totals["wall_seconds"] else None
+        )
+        stages[stage_type] = {**totals, "rows_per_second": round(throughput, 1) if throughput else None}
+    return stages
+
+
+def run_size(config: dict, num_rows: int, workload: dict, args) -> dict:
+    """
+    Generate a workload of num_rows results and run the pipeline on it in a new working directory.
+    """
+    work_dir = tempfile.mkdtemp(prefix=f"benchmark-{num_rows}-")
+    previous_dir = os.getcwd()
+    previous_mongo = MongoManager._instance
+    logger.info(f"Benchmarking {num_rows} rows in {work_dir}")
+    try:
+        prepare_work_dir(work_dir)
+        started = time.perf_counter()
+        results, labels = generate_workload(config, num_rows, workload)
+        generate_seconds = round(time.perf_counter() - started, 3)
+        write_reference_data(
+            config, args.reference_rows, workload, os.path.join(work_dir, "data", "reference_data.csv")
+        )
+
+        MongoManager._instance = get_mongo(args.mongo_uri, f"benchmark_{num_rows}")
+        os.chdir(work_dir)
+        profile = start_profile(f"benchmark-{num_rows}")
+        counts = run_pipeline(config, results, labels, args.max_strata)
+        profile_dict = profile.to_dict()
+        return {
+            "rows": num_rows,
+            "labels": len(labels),
+            "generate_seconds": generate_seconds,
+            **counts,
+            "wall_seconds": profile_dict["wall_seconds"],
+            "peak_rss_mb": profile_dict["peak_rss_mb"],
+            "stages": summarize(profile),
+            "records": profile_dict["stages"] if args.records else None,
+        }
+    finally:
+        os.chdir(previous_dir)
+        MongoManager._instance = previous_mongo
+        if args.keep:
+            logger.info(f"Kept the working directory {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the monitoring pipeline on synthetic workloads.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of results to ingest")
+    parser.add_argument("--reference-rows", type=int, default=DEFAULT_REFERENCE_ROWS)
+    parser.add_argument("--max-strata", type=int, default=None, help="Run the reports and tests of the N largest")
+    parser.add_argument("--mongo-uri", default=None, help="MongoDB deployment to use instead of mongomock")
+    parser.add_argument("--output", default=None, help="Results file, by default in benchmarks/results")
+    parser.add_argument("--records", action="store_true", help="Save the record of each stage")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directories")
+    for option, default in DEFAULT_WORKLOAD.items():
+        if option in ("hospitals", "hospital_weights", "drift_hospital_weights"):
+            parser.add_argument(f"--{option.replace('_', '-')}", nargs="+", default=None)
+        elif option != "end":
+            parser.add_argument(f"--{option.replace('_', '-')}", type=type(default) if default else float)
+    args = parser.parse_args()
+
+    if os.path.exists("/app"):
+        parser.error("run the benchmark outside the docker environment, the pipeline writes to /app if it exists")
+
+    config = get_config()
+    options = {option: getattr(args, option) for option in DEFAULT_WORKLOAD if option != "end"}
+    for option in ("hospital_weights", "drift_hospital_weights"):
+        if options[option]:
+            options[option] = [float(weight) for weight in options[option]]
+    workload = get_workload_options(options)
+
+    results = {
+        "benchmark": "pipeline",
+        "started_at": datetime.now().strftime("%Y%m%dT%H%M%S"),
+        "environment": get_environment(),
+        "mongo": "mongodb" if args.mongo_uri else "mongomock",
+        "reference_rows": args.reference_rows,
+        "max_strata": args.max_strata,
+        "workload": {key: value for key, value in workload.items() if value is not None},
+        "sizes": [],
+    }
+    for num_rows in args.sizes:
+        results["sizes"].append(run_size(config, num_rows, workload, args))
+        # save after each size, the largest may not finish
+        save_results(results, args.output)
@@ -8,28 +8,41 @@ from prefect.task_runners import ConcurrentTaskRunner
 import logging
 from datetime import datetime
 import warnings
-from sklearn.exceptions import UndefinedMetricWarning
 import os
 
-from src.utils.config_manager import load_config
-from scripts.data_details import load_details
+from src.utils.config_manager import get_config
+from src.utils.field_paths import load_panel_paths
+from scripts.data_details import get_details_store
 from src.data_preprocessing.etl import etl_pipeline
 from src.monitoring.stratify import DataSplitter
-from src.monitoring.metrics import generate_report
-from src.monitoring.tests import generate_tests
-from src.dashboard.workspace_manager import WorkspaceManager
-from src.dashboard.create_project import create_or_update
+from src.monitoring.scheduler import schedule_strata
+from src.monitoring.alerts import AlertQueue, AlertDispatcher
+from src.monitoring.alert_state import AlertStateStore
+from src.dashboard.workspace_manager import WorkspaceManager, bump_generation
+from src.utils.profiling import start_profile, stage
+from src.utils.tracing import run_span, setup_tracing
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# The reports, tests and dashboard modules load Evidently, sklearn, scipy and plotly. They are imported in the tasks
+# that use them, so a run without new data (and anything importing the flow) doesn't pay for them.
+
 
 @task
 def load_configuration():
     """
-    Load the configuration file.
+    Load the configuration file, parsed once per process and shared read-only by the tasks.
+    """
+    return get_config()
+
+
+@task
+def check_panels_mapping():
+    """
+    Check the panels mapping before any report is generated.
     """
-    return load_config()
+    load_panel_paths()
 
 
 @task
@@ -37,7 +50,7 @@ def load_data_details():
     """
     Load the data details.
     """
-    return load_details()
+    return get_details_store().load()
 
 
 @task
@@ -48,47 +61,81 @@ def run_etl(config):
     return etl_pipeline(config)
 
 
+@task
+def build_test_plan(config):
+    """
+    Compile the test plan shared by all the test tasks in the run.
+    """
+    from src.monitoring.tests import compile_test_plan
+
+    with stage("test_plan"):
+        return compile_test_plan(config)
+
+
 @task
 def split_data(data, config, details, operation):
     """
     Split the data for reports and tests.
     """
     splitter = DataSplitter()
-    return splitter.split_data(data, config, details, operation)
+    with stage(f"stratify:{operation}", rows_in=len(data)) as record:
+        strata = splitter.split_data(data, config, details, operation)
+        record["rows_out"] = sum(len(stratum) for stratum in strata.values())
+    return strata
+
+
+@task
+def generate_reports_for_strata(batch, reference_data, config, model_type, timestamp, details):
+    """
+    Generate the reports for a batch of data strata.
+    """
+    from src.monitoring.metrics import generate_report
+
+    for key, data_stratification in batch:
+        with stage(f"report:{key}", rows_in=len(data_stratification)):
+            generate_report(
+                data_stratification,
+                reference_data,
+                config,
+                model_type,
+                folder_path=f"/reports/{key}",
+                timestamp=timestamp,
+                details=details,
+            )
 
 
 @task
-def generate_report_for_stratification(
-    data_stratification, reference_data, config, model_type, key, timestamp, details
-):
+def generate_tests_for_strata(batch, reference_data, config, model_type, timestamp, details, test_plan, alert_queue):
     """
-    Generate a report for a data stratum.
+    Generate the tests for a batch of data strata, publishing the failed tests to the alert queue of the run.
     """
-    generate_report(
-        data_stratification,
-        reference_data,
-        config,
-        model_type,
-        folder_path=f"/reports/{key}",
-        timestamp=timestamp,
-        details=details,
-    )
+    from src.monitoring.tests import generate_tests
+
+    for key, data_stratification in batch:
+        with stage(f"test:{key}", rows_in=len(data_stratification)):
+            generate_tests(
+                data_stratification,
+                reference_data,
+                config,
+                model_type,
+                folder_path=f"/tests/{key}",
+                timestamp=timestamp,
+                details=details,
+                test_plan=test_plan,
+                alert_queue=alert_queue,
+            )
 
 
 @task
-def generate_test_for_stratification(data_stratification, reference_data, config, model_type, key, timestamp, details):
+def dispatch_alerts(config, alert_queue, timestamp):
     """
-    Generate tests for a data stratum.
+    Send the alerts of the run in one email, skipping the failures already notified within the suppression window.
     """
-    generate_tests(
-        data_stratification,
-        reference_data,
-        config,
-        model_type,
-        folder_path=f"/tests/{key}",
-        timestamp=timestamp,
-        details=details,
-    )
+    try:
+        with stage("alerts"):
+            AlertDispatcher(config, state=AlertStateStore()).dispatch(alert_queue, timestamp)
+    except Exception as e:
+        logger.error(f"Error sending alerts: {e}")
 
 
 @task
@@ -96,66 +143,108 @@ def create_dashboard(config):
     """
     Create the dashboard.
     """
-    workspace_instance = WorkspaceManager.get_instance()
-    create_or_update(workspace_instance.workspace, config)
+    from src.dashboard.create_project import create_or_update
+
+    with stage("dashboard_update"):
+        workspace_instance = WorkspaceManager.get_instance()
+        create_or_update(workspace_instance.workspace, config)
+        # let the dashboard API know the workspace has changed
+        bump_generation()
     time.sleep(0.5)
 
 
+@task
+def apply_retention(config):
+    """
+    Roll up the runs older than the full-resolution window.
+    """
+    from src.dashboard.retention import compact_snapshots
+
+    try:
+        with stage("retention"):
+            workspace = WorkspaceManager.get_instance().workspace
+            projects = workspace.search_project(config["info"]["project_name"])
+            compact_snapshots(config, workspace=workspace, project=projects[0] if projects else None)
+    except Exception as e:
+        logger.error(f"Error applying retention: {e}")
+
+
 @flow(name="Monitoring Flow", task_runner=ConcurrentTaskRunner())
 def monitoring_flow():
     """
     Monitoring flow for the dashboard pipeline.
     """
     warnings.simplefilter(action="ignore", category=FutureWarning)
-    warnings.simplefilter(action="ignore", category=UndefinedMetricWarning)
     warnings.simplefilter(action="ignore", category=RuntimeWarning)
     warnings.simplefilter(action="ignore", category=UserWarning)
 
     timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-    config = load_configuration()
-    details = load_data_details()
-    data, reference_data = run_etl(config)
-
-    if data is None:
-        logger.info("No new data available. Monitoring flow completed successfully with no updates.")
-        return
-
-    # Split data for reports and tests concurrently
-    report_stratifications_future = split_data.submit(data, config, details, "report")
-    test_stratifications_future = split_data.submit(data, config, details, "test")
-
-    # Generate reports and tests concurrently
-    report_tasks = []
-    test_tasks = []
-
-    for stratifications_future, generation_task, task_list in [
-        (report_stratifications_future, generate_report_for_stratification, report_tasks),
-        (test_stratifications_future, generate_test_for_stratification, test_tasks),
-    ]:
-        stratifications = stratifications_future.result()
-        for key, data_stratification in stratifications.items():
-            task = generation_task.submit(
-                data_stratification,
-                reference_data,
-                config,
-                config["model_config"]["model_type"],
-                key,
-                timestamp,
-                details,
-            )
-            task_list.append(task)
-
-    # Wait for all tasks to complete
-    for task in report_tasks + test_tasks:
-        task.result()
-
-    create_dashboard(config)
-    logger.info("Monitoring flow completed successfully.")
+    setup_tracing("monitoring-flow")
+    with run_span("monitoring_run", {"run.timestamp": timestamp}):
+        profile = start_profile(timestamp)
+        config = load_configuration()
+        details = load_data_details()
+        data, reference_data = run_etl(config)
+
+        if data is None:
+            logger.info(f"Run profile: {profile.summary()}")
+            logger.info("No new data available. Monitoring flow completed successfully with no updates.")
+            return
+
+        check_panels_mapping()
+
+        # Split data for reports and tests concurrently
+        report_stratifications_future = split_data.submit(data, config, details, "report")
+        test_stratifications_future = split_data.submit(data, config, details, "test")
+
+        # Compile the test plan once for all the strata
+        test_plan = build_test_plan(config)
+        alert_queue = AlertQueue()
+
+        # Generate reports and tests concurrently
+        report_tasks = []
+        test_tasks = []
+
+        for stratifications_future, generation_task, task_list, extra_args in [
+            (report_stratifications_future, generate_reports_for_strata, report_tasks, ()),
+            (test_stratifications_future, generate_tests_for_strata, test_tasks, (test_plan, alert_queue)),
+        ]:
+            # Drop the tiny strata, order the rest largest first and batch the small ones together
+            batches = schedule_strata(stratifications_future.result(), config)
+            for batch in batches:
+                task = generation_task.submit(
+                    batch,
+                    reference_data,
+                    config,
+                    config["model_config"]["model_type"],
+                    timestamp,
+                    details,
+                    *extra_args,
+                )
+                task_list.append(task)
+
+        # Wait for all tasks to complete
+        for task in report_tasks + test_tasks:
+            task.result()
+
+        # Send the alerts while the dashboard is updated
+        alerts_future = dispatch_alerts.submit(config, alert_queue, timestamp)
+
+        from src.dashboard.retention import get_retention_options
+
+        retention_enabled, _, _ = get_retention_options(config)
+        if retention_enabled:
+            apply_retention(config)
+
+        create_dashboard(config)
+        alerts_future.result()
+        profile.save()
+        logger.info(f"Run profile: {profile.summary()}")
+        logger.info("Monitoring flow completed successfully.")
 
 
 if __name__ == "__main__":
     warnings.simplefilter(action="ignore", category=FutureWarning)
-    warnings.simplefilter(action="ignore", category=UndefinedMetricWarning)
     warnings.simplefilter(action="ignore", category=RuntimeWarning)
     warnings.simplefilter(action="ignore", category=UserWarning)
 
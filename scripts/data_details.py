@@ -2,22 +2,28 @@
 Script for comparing and storing details about the expected data.
 """
 
+import fcntl
 import logging
 import os
+import tempfile
 import pandas as pd
 import json
+from contextlib import contextmanager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 DETAILS_FILE_PATH = "src/utils/details.json"
+DETAILS_DOCUMENT_ID = "details"
+UNIQUE_VALUE_KEYS = ["hospital", "sex", "instrument_type", "patient_class"]
 
 
-def load_details(file_path=DETAILS_FILE_PATH) -> dict:
+def default_details() -> dict:
     """
-    Load the details JSON file. If the file doesn't exist, create it with a default structure.
+    Get the details of a monitoring system without data yet.
     """
-    default_content = {
+    return {
+        "version": 0,
         "num_rows": 0,
         "hospital_unique_values": [],
         "sex_unique_values": [],
@@ -26,70 +32,243 @@ def load_details(file_path=DETAILS_FILE_PATH) -> dict:
         "categorical_columns": [],
     }
 
-    if not os.path.exists(file_path):
-        with open(file_path, "w") as file:
-            json.dump(default_content, file, indent=2)
-            logger.info(f"Created new details file at {file_path}")
-        return default_content
 
+def write_json_atomic(data: dict, file_path: str) -> None:
+    """
+    Write a JSON file through a temporary file renamed over it, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".details-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(data, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+@contextmanager
+def file_lock(file_path: str):
+    """
+    Hold an exclusive lock on the lock file next to a file, for read-modify-write updates between processes.
+    """
+    with open(f"{file_path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_details(file_path: str) -> dict:
+    """
+    Read the details JSON file, or the default details if it doesn't exist.
+    """
+    if not os.path.exists(file_path):
+        return default_details()
     with open(file_path, "r") as file:
-        return json.load(file)
+        return {**default_details(), **json.load(file)}
+
+
+def load_details(file_path=DETAILS_FILE_PATH) -> dict:
+    """
+    Load the details JSON file. If the file doesn't exist, create it with a default structure.
+    """
+    if not os.path.exists(file_path):
+        with file_lock(file_path):
+            if not os.path.exists(file_path):
+                write_json_atomic(default_details(), file_path)
+                logger.info(f"Created new details file at {file_path}")
+    return read_details(file_path)
 
 
 def save_details(details: dict, file_path=DETAILS_FILE_PATH) -> None:
     """
     Save the updated details dictionary to the JSON file.
     """
-    with open(file_path, "w") as file:
-        json.dump(details, file, indent=2)
-        logger.info(f"Details updated and saved to {file_path}")
+    with file_lock(file_path):
+        write_json_atomic(details, file_path)
+    logger.info(f"Details updated and saved to {file_path}")
 
 
-def update_details(data: pd.DataFrame, config: dict, details: dict) -> dict:
+def update_details(data: pd.DataFrame, config: dict, details: dict) -> bool:
     """
-    Update the details dictionary with new data and return the updated dictionary.
+    Merge the new data into the details dictionary. Return whether anything changed, the change counter is then
+    incremented.
     """
     logger.info("Updating details...")
+    changed = False
 
-    if details["num_rows"] == 0:
+    if details["num_rows"] == 0 and len(data):
         details["num_rows"] = len(data)
+        changed = True
 
-    update_unique_values(data, config, details)
-    set_categorical_columns(data, config, details)
+    changed |= update_unique_values(data, config, details)
+    changed |= set_categorical_columns(data, config, details)
 
-    return details
+    if changed:
+        details["version"] = details.get("version", 0) + 1
+    return changed
 
 
+def merge_values(values: list, new_values) -> list:
+    """
+    Append the new values that aren't in the list yet, keeping the order of the existing ones.
+    """
+    known = set(values)
+    added = [value for value in dict.fromkeys(new_values) if value not in known]
+    return values + added
 
-def update_unique_values(data: pd.DataFrame, config: dict, details: dict) -> None:
+
+def get_unique_values(data: pd.DataFrame, config: dict) -> dict:
     """
-    Update the unique values for the categorical columns in the details dictionary.
+    Get the unique values of the categorical columns in the data, by details key.
     """
-    for key in ["hospital", "sex", "instrument_type", "patient_class"]:
+    unique_values = {}
+    for key in UNIQUE_VALUE_KEYS:
         if config["columns"].get(key):
-            unique_values = data[config["columns"][key]].unique().tolist()
-            details_key = f"{key}_unique_values"
-            details[details_key] = list(set(details[details_key] + unique_values))
+            unique_values[f"{key}_unique_values"] = data[config["columns"][key]].unique().tolist()
+    return unique_values
+
+
+def get_categorical_columns(data: pd.DataFrame, config: dict) -> list:
+    """
+    Get the non-numeric columns of the data, other than the timestamp.
+    """
+    excluded = {config["columns"]["timestamp"], "timestamp"}
+    return [
+        column for column in data.columns if not pd.api.types.is_numeric_dtype(data[column]) and column not in excluded
+    ]
 
 
-def set_categorical_columns(data: pd.DataFrame, config: dict, details: dict) -> None:
+def update_unique_values(data: pd.DataFrame, config: dict, details: dict) -> bool:
     """
-    Identify and set the categorical columns in the details dictionary.
+    Update the unique values for the categorical columns in the details dictionary. Return whether any was added.
     """
-    for column in data.columns:
-        if not pd.api.types.is_numeric_dtype(data[column]):
-            if (
-                column not in details["categorical_columns"]
-                and column != config["columns"]["timestamp"]
-                and column != "timestamp"
-            ):
-                details["categorical_columns"].append(column)
+    changed = False
+    for details_key, unique_values in get_unique_values(data, config).items():
+        merged = merge_values(details.get(details_key, []), unique_values)
+        if len(merged) != len(details.get(details_key, [])):
+            details[details_key] = merged
+            changed = True
+    return changed
+
+
+def set_categorical_columns(data: pd.DataFrame, config: dict, details: dict) -> bool:
+    """
+    Identify and set the categorical columns in the details dictionary. Return whether any was added.
+    """
+    merged = merge_values(details["categorical_columns"], get_categorical_columns(data, config))
+    if len(merged) == len(details["categorical_columns"]):
+        return False
+    details["categorical_columns"] = merged
+    return True
+
+
+class DetailsStore:
+    """
+    Details stored in a JSON file. Updates are merged under a file lock and written atomically, so the flow and
+    the APIs can share the file.
+    """
+
+    def __init__(self, file_path: str = DETAILS_FILE_PATH):
+        self.file_path = file_path
+
+    def load(self) -> dict:
+        """
+        Load the details.
+        """
+        return load_details(self.file_path)
+
+    def update(self, data: pd.DataFrame, config: dict) -> dict:
+        """
+        Merge the new data into the stored details, writing them only if they changed.
+        """
+        with file_lock(self.file_path):
+            details = read_details(self.file_path)
+            if update_details(data, config, details) or not os.path.exists(self.file_path):
+                write_json_atomic(details, self.file_path)
+                logger.info(f"Details updated and saved to {self.file_path}")
+        return details
+
+    def signature(self):
+        """
+        Get a value that changes with the details: the modification time and size of the file, or None if it
+        doesn't exist.
+        """
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+class MongoDetailsStore:
+    """
+    Details stored in a MongoDB document, shared by the containers. The unique values are merged with $addToSet,
+    so concurrent updates don't need a lock.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def load(self) -> dict:
+        """
+        Load the details.
+        """
+        document = self.collection.find_one({"_id": DETAILS_DOCUMENT_ID}, {"_id": 0}) or {}
+        return {**default_details(), **document}
+
+    def update(self, data: pd.DataFrame, config: dict) -> dict:
+        """
+        Merge the new data into the stored details, incrementing the change counter if they changed.
+        """
+        new_values = get_unique_values(data, config)
+        new_values["categorical_columns"] = get_categorical_columns(data, config)
+        result = self.collection.update_one(
+            {"_id": DETAILS_DOCUMENT_ID},
+            {"$addToSet": {key: {"$each": values} for key, values in new_values.items()}},
+            upsert=True,
+        )
+        changed = bool(result.modified_count or result.upserted_id)
+
+        if len(data):
+            result = self.collection.update_one(
+                {"_id": DETAILS_DOCUMENT_ID, "num_rows": {"$in": [0, None]}}, {"$set": {"num_rows": len(data)}}
+            )
+            changed |= bool(result.modified_count)
+
+        if changed:
+            self.collection.update_one({"_id": DETAILS_DOCUMENT_ID}, {"$inc": {"version": 1}})
+            logger.info("Details updated in MongoDB")
+        return self.load()
+
+    def signature(self):
+        """
+        Get the change counter of the details.
+        """
+        document = self.collection.find_one({"_id": DETAILS_DOCUMENT_ID}, {"version": 1})
+        return document.get("version", 0) if document else None
+
+
+def get_details_store():
+    """
+    Get the details store set by DETAILS_STORE: the JSON file by default, or mongo.
+    """
+    if os.getenv("DETAILS_STORE", "file") == "mongo":
+        from src.utils.mongo import MongoManager
+
+        return MongoDetailsStore(MongoManager.get_instance().get_collection("details"))
+    return DetailsStore()
 
 
-def data_details(data: pd.DataFrame, config: dict, file_path=DETAILS_FILE_PATH) -> None:
+def data_details(data: pd.DataFrame, config: dict, store=None) -> dict:
     """
     Function to handle the process of updating and saving details.
     """
-    details = load_details(file_path)
-    updated_details = update_details(data, config, details)
-    save_details(updated_details, file_path)
+    store = store or get_details_store()
+    return store.update(data, config)
@@ -0,0 +1,92 @@
+"""
+Script to load test the APIs, e.g. to compare the Flask development server with the uvicorn production mode.
+
+Examples:
+    python scripts/load_test.py http://localhost:5002/get_filter_options --requests 2000 --concurrency 32
+    python scripts/load_test.py http://localhost:5001/ingest_results --method POST --csv results.csv --model-id model1
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def build_request(args) -> dict:
+    """
+    Build the keyword arguments of each request: a JSON body, or a CSV upload with the model ID.
+    """
+    if args.csv:
+        with open(args.csv, "rb") as file:
+            content = file.read()
+        return {
+            "data": {"model_id": args.model_id},
+            "files": {"csvFile": (os.path.basename(args.csv), content, "text/csv")},
+        }
+    if args.json:
+        return {"json": json.loads(args.json)}
+    return {}
+
+
+def run_load_test(url: str, method: str, num_requests: int, concurrency: int, request_kwargs: dict) -> dict:
+    """
+    Send the requests from concurrent keep-alive clients. Return the requests per second and the latencies.
+    """
+    local = threading.local()
+    clients = []
+    clients_lock = threading.Lock()
+
+    def send(_):
+        if not hasattr(local, "client"):
+            local.client = httpx.Client(timeout=60)
+            with clients_lock:
+                clients.append(local.client)
+        start = time.perf_counter()
+        try:
+            response = local.client.request(method, url, **request_kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(num_requests)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.close()
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "requests": num_requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for _, ok in results if not ok),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(num_requests / elapsed, 1),
+        "latency_ms_p50": round(statistics.median(latencies) * 1000, 2),
+        "latency_ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+        "latency_ms_max": round(latencies[-1] * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test an API endpoint.")
+    parser.add_argument("url", help="URL of the endpoint")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--requests", type=int, default=1000, help="Total number of requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients")
+    parser.add_argument("--json", default=None, help='JSON body, e.g. \'{"model_id": "model1"}\'')
+    parser.add_argument("--csv", default=None, help="CSV file to upload as csvFile")
+    parser.add_argument("--model-id", default=None, help="Model ID sent with the CSV upload")
+    args = parser.parse_args()
+
+    results = run_load_test(args.url, args.method.upper(), args.requests, args.concurrency, build_request(args))
+    print(json.dumps(results, indent=2))
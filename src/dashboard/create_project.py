@@ -3,6 +3,7 @@ This script creates a new Evidently AI project in the workspace.
 """
 
 from src.utils.config_manager import load_config
+from src.utils.snapshot_io import is_snapshot_file, load_snapshots
 import json
 import logging
 from evidently.ui.dashboards import (
@@ -15,12 +16,15 @@ from evidently.ui.dashboards import (
     TestFilter,
     DashboardPanelTestSuite,
     TestSuitePanelType,
+    DashboardConfig,
 )
 from evidently.renderers.html_widgets import WidgetSize
-from evidently import metrics
-from evidently.suite.base_suite import Snapshot
+from src.dashboard.snapshot_registry import SnapshotRegistry
+from src.dashboard.static_panels import get_static_html
+from src.utils.field_paths import load_panel_paths
+from src.utils.tracing import get_ingestion_links, span
 import os
-import base64
+from types import SimpleNamespace
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,8 +46,6 @@ THP Colors:
     - Turquoise: #5AC3B3
 """
 
-MAX_URI_SIZE = 2 * 1024 * 1024
-
 
 def create_summary_panels(config: dict, tags: list, project) -> None:
     """
@@ -52,47 +54,26 @@ def create_summary_panels(config: dict, tags: list, project) -> None:
     # empty the dashboard
     project.dashboard.panels = []
 
-    # dashboard title panel
-    title = config["info"]["project_name"]
-    description = config["info"]["project_description"]
-
-    model_intro = f"""
-        <div style='background-color: #f0f8ff; padding: 15px; border-radius: 5px;'>
-            <h3 style='color: #02B3E6;'> {title}</h3>
-            <p style='text-align: left; font-size: 16px;'>{description}</p>
-        </div>
-        """
+    static_html = get_static_html(config)
 
+    # dashboard title panel
     project.dashboard.add_panel(
         DashboardPanelCounter(
             filter=ReportFilter(metadata_values={}, tag_values=[]),
             agg=CounterAgg.NONE,
             text="",
-            title=model_intro,
+            title=static_html["intro"],
             size=WidgetSize.HALF,
         )
     )
 
     # dashboard summary panel
-    model_developer = config["info"]["model_developer"]
-    contact_name = config["info"]["contact_name"]
-    contact_email = config["info"]["contact_email"]
-
-    model_info = f"""
-    <div style='background-color: #f0f8ff; padding: 15px; border-radius: 5px;'>
-        <h3 style='color: #02B3E6; text-align: center;'>Model Information</h3>
-        <p style='text-align: left; font-size: 16px;'><strong>Model Developer:</strong> {model_developer}</p>
-        <p style='text-align: left; font-size: 16px;'><strong>Contact Name:</strong> {contact_name}</p>
-        <p style='text-align: left; font-size: 16px;'><strong>Contact Email:</strong> {contact_email}</p>
-    </div>
-    """
-
     project.dashboard.add_panel(
         DashboardPanelCounter(
             filter=ReportFilter(metadata_values={}, tag_values=[]),
             agg=CounterAgg.NONE,
             text="",
-            title=model_info,
+            title=static_html["model_info"],
             size=WidgetSize.HALF,
         )
     )
@@ -133,9 +114,9 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
     Create the metric panels for the dashboard.
     """
     try:
-        panel_mapping = load_json("src/utils/panels_map.json")
+        panel_paths = load_panel_paths()
     except Exception as e:
-        logger.error(f"Error loading tests mapping: {e}")
+        logger.error(f"Error loading panels mapping: {e}")
         return
 
     panel_info = []
@@ -145,9 +126,9 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
         # get the panel name from the config
         panel_name = panel["name"]
 
-        # use the name to get the panel info from the mapping
+        # use the name to get the compiled panel from the mapping
         try:
-            panel_key = panel_mapping[panel_name]
+            panel_path = panel_paths[panel_name]
         except KeyError as e:
             logger.warning(f"Invalid panel name: {panel_name}... skipping")
             continue
@@ -160,20 +141,16 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
         plot_type = getattr(PlotType, plot.upper(), PlotType.LINE)
         size = getattr(WidgetSize, panel_size.upper(), WidgetSize.HALF)
 
-        panel_title = panel_key["title"]
-        metric_id = panel_key["metric_id"]
-        field_path = panel_key["field_path"]
-        category = panel_key["category"]
-
         panel_info.append(
             {
-                "panel_title": panel_title,
-                "metric_id": metric_id,
-                "field_path": field_path,
+                "panel_title": panel_path.title,
+                "metric_id": panel_path.metric_id,
+                "field_path": panel_path.current,
+                "reference_field_path": panel_path.reference,
                 "plot_type": plot_type,
                 "size": size,
-                "category": category,
-                "tags": tags + [category],
+                "category": panel_path.category,
+                "tags": tags + [panel_path.category],
             }
         )
 
@@ -199,9 +176,7 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
                 )
             )
 
-        if "current" in panel["field_path"]:
-            reference_field_path = panel["field_path"].replace("current", "reference")
-
+        if panel["reference_field_path"] is not None:
             # create the panel with both current and reference values
             project.dashboard.add_panel(
                 DashboardPanelPlot(
@@ -210,12 +185,12 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
                     values=[
                         PanelValue(
                             metric_id=panel["metric_id"],
-                            field_path=eval(panel["field_path"]),
+                            field_path=panel["field_path"],
                             legend="Current",
                         ),
                         PanelValue(
                             metric_id=panel["metric_id"],
-                            field_path=eval(reference_field_path),
+                            field_path=panel["reference_field_path"],
                             legend="Reference",
                         ),
                     ],
@@ -223,7 +198,7 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
                     size=panel["size"],
                 )
             )
-        elif "ColumnDriftMetric" in panel["field_path"]:
+        elif panel["metric_id"] == "ColumnDriftMetric":
             # create the prediction and ground truth column drift panel
             if config["model_config"]["model_type"]["regression"]:
                 prediction_column = config["columns"]["predictions"]["regression_prediction"]
@@ -240,13 +215,13 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
                         PanelValue(
                             metric_id=panel["metric_id"],
                             metric_args={"column_name.name": prediction_column},
-                            field_path=eval(panel["field_path"]),
+                            field_path=panel["field_path"],
                             legend="Prediction",
                         ),
                         PanelValue(
                             metric_id=panel["metric_id"],
                             metric_args={"column_name.name": label_column},
-                            field_path=eval(panel["field_path"]),
+                            field_path=panel["field_path"],
                             legend="Ground Truth",
                         ),
                     ],
@@ -263,7 +238,7 @@ def create_metric_panels(config: dict, tags: list, project) -> None:
                     values=[
                         PanelValue(
                             metric_id=panel["metric_id"],
-                            field_path=eval(panel["field_path"]),
+                            field_path=panel["field_path"],
                             legend="Current",
                         )
                     ],
@@ -439,137 +414,128 @@ def create_bottom_panels(config: dict, tags: list, project) -> None:
     """
     Create the bottom panels for the dashboard.
     """
+    static_html = get_static_html(config)
 
-    # dashboard title panel
-    references = config["info"]["references"]
-
-    # references are a list of urls, so we need to format them as a list and click-able links
-    references_list = f"""
-    <div style='background-color: #f0f8ff; padding: 1px; border-radius: 5px;'>
-        <h3 style='color: #02B3E6; text-align: center;'>References</h3>
-        <ul style='text-align: left; font-size: 16px;'>
-            {"".join([f"<li><a href='{reference['url']}'>{reference['name']}</a></li>" for reference in references])}
-        </ul>
-    </div>
-    """
-
+    # references panel
     project.dashboard.add_panel(
         DashboardPanelCounter(
             filter=ReportFilter(metadata_values={}, tag_values=[]),
             agg=CounterAgg.NONE,
             text="",
-            title=references_list,
+            title=static_html["references"],
             size=WidgetSize.HALF,
         )
     )
 
-    def image_to_data_uri(file_path):
-        """
-        Convert an image to a data URI.
-        """
-        with open(file_path, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
-            file_extension = os.path.splitext(file_path)[1].lower()
-            mime_type = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}.get(
-                file_extension, "application/octet-stream"
-            )
-            data_uri = f"data:{mime_type};base64,{encoded_string}"
-
-            if len(data_uri) > MAX_URI_SIZE:
-                raise ValueError(
-                    f"Data URI size ({len(data_uri)} bytes) exceeds the maximum allowed size ({MAX_URI_SIZE} bytes)"
-                )
-
-        return data_uri
-
-    disclaimer = config["info"]["disclaimer"]
-    disclaimer_text = f"""
-    <div style='background-color: #f0f8ff; padding: 1px; border-radius: 5px;'>
-        <p style='color: #00599D; font-size: 18px;'>{disclaimer}</p>
-    </div>
-    """
-
-    if config["info"]["fact_card"]:
-        # Check if the file exists in the public folder
-        full_path = os.path.join("/app/frontend/dashboard/public/images/", config["info"]["fact_card"])
-        if os.path.exists(full_path):
-            # Check if the image is jpg, jpeg, or png
-            if full_path.lower().endswith((".jpg", ".jpeg", ".png")):
-                try:
-                    data_uri = image_to_data_uri(full_path)
-                    disclaimer_text = f"""
-                    <div style='background-color: #f0f8ff; padding: 1px; border-radius: 5px;'>
-                        <img src='{data_uri}' alt='disclaimer' style='width: 100%; height: auto;'>
-                    </div>
-                    """
-                except ValueError as e:
-                    logger.warning(f"Image data URI too large: {e}... using text disclaimer")
-                except Exception as e:
-                    logger.warning(f"Error converting image to data URI: {e}... using text disclaimer")
-            else:
-                logger.warning(f"Invalid image file type: {full_path}... using text disclaimer")
-        else:
-            logger.warning(f"Image file not found: {full_path}... using text disclaimer")
-
+    # disclaimer panel, the fact card image if there is one
     project.dashboard.add_panel(
         DashboardPanelCounter(
             filter=ReportFilter(metadata_values={}, tag_values=[]),
             agg=CounterAgg.NONE,
             text="",
-            title=disclaimer_text,
+            title=static_html["disclaimer"],
             size=WidgetSize.HALF,
         )
     )
 
 
-def log_snapshots(project, workspace):
+def get_snapshots_dir() -> str:
     """
-    Log the JSON snapshots to the workspace.
+    Get the snapshots directory, in the docker environment or locally.
     """
     docker_snapshots_dir = "/app/snapshots"
     local_snapshots_dir = os.path.abspath(os.path.join(__file__, "..", "../../snapshots"))
 
     # Determine which directory to use
     if os.path.exists(docker_snapshots_dir):
-        snapshots_dir = docker_snapshots_dir
-    else:
-        snapshots_dir = local_snapshots_dir
+        return docker_snapshots_dir
+    return local_snapshots_dir
 
-    for timestamp in os.listdir(snapshots_dir):
-        if timestamp.startswith("."):
+
+def list_subdirectories(path: str) -> list:
+    """
+    List the visible subdirectories of a directory.
+    """
+    return sorted(
+        entry for entry in os.listdir(path) if not entry.startswith(".") and os.path.isdir(os.path.join(path, entry))
+    )
+
+
+def find_timestamp_snapshots(snapshots_dir: str, timestamp: str) -> list:
+    """
+    Find the snapshot files of a run, as paths relative to the snapshots directory.
+    """
+    snapshot_files = []
+    timestamp_path = os.path.join(snapshots_dir, timestamp)
+    for operation in list_subdirectories(timestamp_path):
+        operation_path = os.path.join(timestamp_path, operation)
+        for strata in list_subdirectories(operation_path):
+            strata_path = os.path.join(operation_path, strata)
+            for output_file in sorted(os.listdir(strata_path)):
+                if is_snapshot_file(output_file):
+                    snapshot_files.append(os.path.join(timestamp, operation, strata, output_file))
+    return snapshot_files
+
+
+def log_snapshots(project, workspace, snapshots_dir: str = None, max_workers: int = None):
+    """
+    Log the new JSON snapshots to the workspace. The snapshots already added to the project are recorded in the
+    snapshot registry and skipped, the new ones are loaded in parallel and added in batches.
+    """
+    if snapshots_dir is None:
+        snapshots_dir = get_snapshots_dir()
+    if not os.path.exists(snapshots_dir):
+        logger.info(f"Snapshots directory not found: {snapshots_dir}")
+        return
+
+    registry = SnapshotRegistry(snapshots_dir, project.id)
+
+    # find the snapshot files that haven't been added yet
+    pending_timestamps = []
+    pending_files = {}
+    for timestamp in list_subdirectories(snapshots_dir):
+        if registry.is_completed(timestamp):
             continue
-        timestamp_path = os.path.join(snapshots_dir, timestamp)
-        for operation in os.listdir(timestamp_path):
-            if operation.startswith("."):
-                continue
-            operation_path = os.path.join(timestamp_path, operation)
-            for strata in os.listdir(operation_path):
-                if strata.startswith("."):
-                    continue
-                strata_path = os.path.join(operation_path, strata)
-                for output_file in os.listdir(strata_path):
-                    if output_file.startswith(".") or not output_file.endswith(".json"):
-                        continue
-                    output_path = os.path.join(strata_path, output_file)
-                    try:
-                        with open(output_path, "r") as f:
-                            snapshot_data = json.load(f)
-                        snapshot = Snapshot(**snapshot_data)
-                        workspace.add_snapshot(project.id, snapshot)
-                    except Exception as e:
-                        logger.error(f"Error loading snapshot: {e}")
-                        continue
-
-
-def create_project(workspace, config: dict) -> None:
+        pending_timestamps.append(timestamp)
+        for relative_path in find_timestamp_snapshots(snapshots_dir, timestamp):
+            if not registry.is_registered(relative_path):
+                pending_files[os.path.join(snapshots_dir, relative_path)] = (timestamp, relative_path)
+
+    num_added = 0
+    failed_timestamps = set()
+    for batch in load_snapshots(list(pending_files), max_workers=max_workers):
+        for output_path, snapshot, error in batch:
+            timestamp, relative_path = pending_files[output_path]
+            try:
+                if error:
+                    raise ValueError(error)
+                workspace.add_snapshot(project.id, snapshot)
+                registry.register(relative_path, snapshot.id)
+                num_added += 1
+            except Exception as e:
+                logger.error(f"Error loading snapshot {relative_path}: {e}")
+                failed_timestamps.add(timestamp)
+        # save the progress after each batch
+        registry.save()
+
+    # a run with a broken snapshot is walked again next time
+    for timestamp in pending_timestamps:
+        if timestamp not in failed_timestamps:
+            registry.complete(timestamp)
+
+    registry.save()
+    logger.info(f"Added {num_added} new snapshots to the project.")
+
+
+def create_project(workspace, config: dict, snapshots_dir: str = None) -> None:
     """
     Create a new Evidently AI project in the workspace.
     """
     try:
         project = workspace.create_project(config["info"]["project_name"])
         project.description = config["info"]["project_description"]
-        log_snapshots(project, workspace)
-        update_panels(workspace, config, project=project)
+        log_snapshots(project, workspace, snapshots_dir)
+        update_panels(workspace, config)
         project.save()
     except Exception as e:
         logger.error(f"Error creating project: {e}")
@@ -578,54 +544,74 @@ def create_project(workspace, config: dict) -> None:
     project.save()
 
 
-def update_project(workspace, config: dict) -> None:
+def update_project(workspace, config: dict, snapshots_dir: str = None) -> None:
     """
     Update an existing Evidently AI project in the workspace.
     """
     try:
         project = workspace.search_project(config["info"]["project_name"])[0]
         project.description = config["info"]["project_description"]
-        log_snapshots(project, workspace)
-        update_panels(workspace, config, project=project)
+        log_snapshots(project, workspace, snapshots_dir)
+        update_panels(workspace, config)
         project.save()
     except Exception as e:
         logger.error(f"Error updating project: {e}")
         return
 
 
-def create_or_update(workspace, config: dict) -> None:
+def create_or_update(workspace, config: dict, snapshots_dir: str = None) -> None:
     """
-    Determine if the project should be created or updated.
+    Determine if the project should be created or updated, from the snapshots in snapshots_dir (by default the
+    snapshots directory of the environment). The span is linked to the uploads of the data shown for the first time.
     """
     try:
-        project = workspace.search_project(config["info"]["project_name"])
-        if not project:
-            create_project(workspace, config)
-        else:
-            update_project(workspace, config)
+        with span("dashboard.create_or_update", links=get_ingestion_links()):
+            project = workspace.search_project(config["info"]["project_name"])
+            if not project:
+                create_project(workspace, config, snapshots_dir)
+            else:
+                update_project(workspace, config, snapshots_dir)
     except Exception as e:
         logger.error(f"Error creating or updating project: {e}")
         return
 
 
-def update_panels(workspace, config: dict, tags=["main", "single"], project=None) -> None:
+def build_panels(config: dict, tags: list) -> list:
     """
-    Update the panels for the Evidently AI dashboard.
+    Build the panels for the Evidently AI dashboard without touching the project.
     """
-    try:
-        project = workspace.search_project(config["info"]["project_name"])[0]
-        # create the summary panels
-        create_summary_panels(config, tags, project)
+    # the panel functions only use the dashboard of the project
+    scratch = SimpleNamespace(dashboard=DashboardConfig(name=config["info"]["project_name"], panels=[]))
 
-        # create the test panels
-        create_test_panels(config, tags, project)
+    # create the summary panels
+    create_summary_panels(config, tags, scratch)
 
-        # create the metric panels
-        create_metric_panels(config, tags, project)
+    # create the test panels
+    create_test_panels(config, tags, scratch)
 
-        # create the bottom panels
-        create_bottom_panels(config, tags, project)
+    # create the metric panels
+    create_metric_panels(config, tags, scratch)
 
-        project.save()
+    # create the bottom panels
+    create_bottom_panels(config, tags, scratch)
+
+    return scratch.dashboard.panels
+
+
+def apply_panels(workspace, config: dict, panels: list) -> None:
+    """
+    Replace the panels of the Evidently AI dashboard and save the project.
+    """
+    project = workspace.search_project(config["info"]["project_name"])[0]
+    project.dashboard.panels = list(panels)
+    project.save()
+
+
+def update_panels(workspace, config: dict, tags: list = None) -> None:
+    """
+    Update the panels for the Evidently AI dashboard, for the main stratum by default.
+    """
+    try:
+        apply_panels(workspace, config, build_panels(config, tags or ["main", "single"]))
     except Exception as e:
         logger.error(f"Error updating panels: {e}")
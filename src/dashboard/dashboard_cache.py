@@ -0,0 +1,90 @@
+"""
+File to cache the dashboard panels for each combination of filters, so applying a filter doesn't rebuild every panel.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 64
+
+
+def build_panels(config: dict, tags: list) -> list:
+    """
+    Build the panels for the tags. Evidently is imported with the first build, not when the API starts.
+    """
+    from src.dashboard import create_project
+
+    return create_project.build_panels(config, tags)
+
+
+def apply_panels(workspace, config: dict, panels: list) -> None:
+    """
+    Show the panels on the dashboard of the project.
+    """
+    from src.dashboard import create_project
+
+    create_project.apply_panels(workspace, config, panels)
+
+
+class DashboardCache:
+    """
+    LRU cache of the dashboard panels, keyed by the set of filter tags, so the order of the filters doesn't matter.
+
+    The cache is tied to a workspace generation and a configuration: when the flow finishes a run and bumps the
+    generation, or the config file is reloaded, all the cached panels are dropped. Applying the panels to the project
+    is serialized, so concurrent filter changes can't interleave their panels.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.generation = None
+        self.config_mtime = None
+        self.panels = OrderedDict()
+        self.lock = threading.Lock()
+        self.apply_lock = threading.Lock()
+
+    def get_panels(self, config: dict, tags: list, generation: int) -> list:
+        """
+        Get the panels for the tags, building them if they are not cached.
+        """
+        key = frozenset(tags)
+        with self.lock:
+            # a reloaded configuration has a new mtime, a plain dict has none
+            config_mtime = getattr(config, "mtime", None)
+            if generation != self.generation or config_mtime != self.config_mtime:
+                self.panels.clear()
+                self.generation = generation
+                self.config_mtime = config_mtime
+            if key in self.panels:
+                self.panels.move_to_end(key)
+                return self.panels[key]
+
+        # build outside the lock, so a slow build doesn't hold up cached filters
+        panels = build_panels(config, list(tags))
+
+        with self.lock:
+            if generation == self.generation and config_mtime == self.config_mtime:
+                self.panels[key] = panels
+                self.panels.move_to_end(key)
+                while len(self.panels) > self.max_size:
+                    self.panels.popitem(last=False)
+        return panels
+
+    def apply(self, workspace, config: dict, tags: list, generation: int) -> None:
+        """
+        Show the panels for the tags on the dashboard.
+        """
+        panels = self.get_panels(config, tags, generation)
+        with self.apply_lock:
+            apply_panels(workspace, config, panels)
+
+    def clear(self) -> None:
+        """
+        Drop all the cached panels.
+        """
+        with self.lock:
+            self.panels.clear()
@@ -0,0 +1,89 @@
+"""
+File to compute the dashboard filter options from the data details. The options are cached with their JSON response and ETag, and recomputed only when the details change.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from scripts.data_details import DetailsStore, DETAILS_FILE_PATH
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEX_LABELS = {"f": "female", "m": "male"}
+DEFAULT_AGE_RANGES = ["[0-18]", "[18-65]", "[65+]"]
+
+
+def get_filters(config: dict, details: dict) -> dict:
+    """
+    Get the filter options for the dashboard.
+    """
+    cols = config["columns"]
+    strata_mapping = {
+        "hospital": details["hospital_unique_values"],
+    }
+    if cols["instrument_type"]:
+        strata_mapping["instrument_type"] = details["instrument_type_unique_values"]
+    if cols["patient_class"]:
+        strata_mapping["patient_class"] = details["patient_class_unique_values"]
+
+    strata_mapping["sex"] = [SEX_LABELS.get(sex.lower(), sex) for sex in details["sex_unique_values"]]
+
+    if config["age_filtering"]["filter_type"] == "custom":
+        custom_ranges = config["age_filtering"]["custom_ranges"]
+        strata_mapping["age"] = [f"[{range_['min']}-{range_['max']}]" for range_ in custom_ranges]
+    else:
+        strata_mapping["age"] = list(DEFAULT_AGE_RANGES)
+    return strata_mapping
+
+
+class FilterOptionsCache:
+    """
+    Cache of the filter options response, keyed by the signature of the details store (the modification time and
+    size of the details file, or the change counter of the MongoDB details) and the modification time of the
+    configuration, so a reloaded configuration is picked up too.
+
+    The ETag is the hash of the response, so it only changes when the filter options do, and clients revalidating
+    with If-None-Match get a 304 until then.
+    """
+
+    def __init__(self, config: dict, file_path: str = DETAILS_FILE_PATH, store=None):
+        self.config = config
+        self.store = store if store is not None else DetailsStore(file_path)
+        self.signature = None
+        self.config_mtime = None
+        self.body = None
+        self.etag = None
+        self.lock = threading.Lock()
+
+    def get(self, config: dict = None) -> tuple[bytes, str]:
+        """
+        Get the JSON response body and its ETag, reloading the details if they have changed. The configuration, e.g.
+        from get_config() on each request, replaces the one of the cache.
+        """
+        signature = self.store.signature()
+        with self.lock:
+            if config is not None:
+                self.config = config
+            # a reloaded configuration has a new mtime, a plain dict has none
+            config_mtime = getattr(self.config, "mtime", None)
+            if self.body is not None and signature == self.signature and config_mtime == self.config_mtime:
+                return self.body, self.etag
+
+            try:
+                details = self.store.load()
+            except (OSError, ValueError) as e:
+                # e.g. the file is being created, keep serving the previous options
+                if self.body is None:
+                    raise
+                logger.warning(f"Error reloading details, using the cached filter options: {e}")
+                return self.body, self.etag
+
+            self.body = json.dumps(get_filters(self.config, details)).encode("utf-8")
+            self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+            # the signature read before the load: a write since then is picked up by the next call
+            self.signature = signature
+            self.config_mtime = config_mtime
+            logger.info("Filter options reloaded from the details.")
+            return self.body, self.etag
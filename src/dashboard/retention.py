@@ -0,0 +1,291 @@
+"""
+File to compact the old snapshots. Runs older than the full-resolution window are rolled up into one snapshot per day or week for each stratum, keeping the average of the dashboard panel fields, so the snapshots and the workspace stop growing with every run.
+"""
+
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from src.dashboard.create_project import get_snapshots_dir, list_subdirectories, find_timestamp_snapshots
+from src.dashboard.snapshot_registry import SnapshotRegistry
+from src.utils.field_paths import get_metric_panels
+from src.utils.metric_store import METRIC_STORE_FILE_NAME, MetricStore
+from src.utils.snapshot_io import load_snapshot_data, write_snapshot_data
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_FULL_RESOLUTION_DAYS = 30
+DEFAULT_ROLLUP_PERIOD = "daily"
+ROLLUP_PERIOD_FORMATS = {"daily": "%Y-%m-%d", "weekly": "%Y-%W"}
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+STAGING_SUFFIX = ".rollup"
+# list of the runs a staged roll-up replaces, written once the roll-up is complete
+SOURCES_FILE = ".sources"
+# a rolled-up test keeps the worst status of the period
+TEST_STATUS_SEVERITY = {"SKIPPED": 0, "SUCCESS": 1, "WARNING": 2, "FAIL": 3, "ERROR": 4}
+
+
+def get_retention_options(config: dict) -> tuple[bool, int, str]:
+    """
+    Get whether retention is enabled, the number of days kept at full resolution and the roll-up period.
+    """
+    options = config.get("retention", {})
+    enabled = bool(options.get("enabled", False))
+    full_resolution_days = int(options.get("full_resolution_days", DEFAULT_FULL_RESOLUTION_DAYS))
+    rollup_period = options.get("rollup_period", DEFAULT_ROLLUP_PERIOD)
+    if full_resolution_days < 0:
+        raise ValueError(f"Invalid full resolution days: {full_resolution_days}")
+    if rollup_period not in ROLLUP_PERIOD_FORMATS:
+        raise ValueError(f"Invalid roll-up period: {rollup_period}")
+    return enabled, full_resolution_days, rollup_period
+
+
+def parse_timestamp(timestamp: str):
+    """
+    Parse the timestamp of a run directory, or return None if it isn't one.
+    """
+    try:
+        return datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def group_runs(timestamps: list, cutoff: datetime, rollup_period: str) -> list:
+    """
+    Group the runs older than the cutoff by roll-up period, keeping only the periods with more than one run.
+    """
+    groups = {}
+    for timestamp in sorted(timestamps):
+        run_time = parse_timestamp(timestamp)
+        if run_time is None or run_time >= cutoff:
+            continue
+        groups.setdefault(run_time.strftime(ROLLUP_PERIOD_FORMATS[rollup_period]), []).append(timestamp)
+    return [runs for runs in groups.values() if len(runs) > 1]
+
+
+def get_path(data: dict, parts: list):
+    """
+    Get a nested value of a snapshot, or None if it doesn't exist.
+    """
+    for part in parts:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def set_path(data: dict, parts: list, value) -> None:
+    """
+    Set a nested value of a snapshot.
+    """
+    for part in parts[:-1]:
+        data = data[part]
+    data[parts[-1]] = value
+
+
+def panel_field_parts(metric_id: str) -> list:
+    """
+    Get the fields of a metric result used by the dashboard panels, with their reference counterparts.
+    """
+    field_parts = []
+    for panel in get_metric_panels(metric_id):
+        field_parts.append(panel.parts)
+        if panel.reference_parts:
+            field_parts.append(panel.reference_parts)
+    return field_parts
+
+
+def run_weight(data: dict) -> int:
+    """
+    Get the number of runs a snapshot stands for, more than one if it is already rolled up.
+    """
+    return int(data.get("metadata", {}).get("rollup_runs", 1))
+
+
+def merge_metric_results(data: dict, runs: list, weights: list) -> None:
+    """
+    Replace the panel fields of the latest run with their weighted average over the runs.
+    """
+    suite = data["suite"]
+    for index, metric in enumerate(suite["metrics"]):
+        for parts in panel_field_parts(metric["type"].rsplit(".", 1)[-1]):
+            total, total_weight = 0.0, 0
+            for run, weight in zip(runs, weights):
+                run_metrics = run["suite"]["metrics"]
+                if index >= len(run_metrics) or run_metrics[index]["type"] != metric["type"]:
+                    continue
+                value = get_path(run["suite"]["metric_results"][index], parts)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    total += value * weight
+                    total_weight += weight
+            if total_weight and get_path(suite["metric_results"][index], parts) is not None:
+                set_path(suite["metric_results"][index], parts, total / total_weight)
+
+
+def merge_test_results(data: dict, runs: list) -> None:
+    """
+    Replace the status of each test of the latest run with its worst status over the runs.
+    """
+    for index, result in enumerate(data["suite"]["test_results"]):
+        for run in runs:
+            run_results = run["suite"]["test_results"]
+            if index >= len(run_results) or run_results[index]["name"] != result["name"]:
+                continue
+            status = run_results[index]["status"]
+            if TEST_STATUS_SEVERITY.get(status, 0) > TEST_STATUS_SEVERITY.get(result["status"], 0):
+                result["status"] = status
+
+
+def rollup_snapshot(file_paths: list, rollup_period: str):
+    """
+    Roll up the snapshots of a stratum over a period, ordered from oldest to latest, into the data of a single
+    snapshot at the time of the latest run. Return None if none of the snapshots can be read.
+    """
+    runs = []
+    for file_path in file_paths:
+        try:
+            runs.append(load_snapshot_data(file_path))
+        except Exception as e:
+            logger.warning(f"Skipping unreadable snapshot {file_path}: {e}")
+    if not runs:
+        return None
+
+    weights = [run_weight(run) for run in runs]
+    data = runs[-1]
+    merge_metric_results(data, runs, weights)
+    merge_test_results(data, runs)
+
+    data["id"] = str(uuid.uuid4())
+    # metadata values must be strings
+    data["metadata"] = {
+        **data.get("metadata", {}),
+        "rollup_period": rollup_period,
+        "rollup_runs": str(sum(weights)),
+        "rollup_start": runs[0].get("metadata", {}).get("rollup_start", str(runs[0]["timestamp"])),
+    }
+    return data
+
+
+def replace_runs(snapshots_dir: str, staging_path: str, timestamps: list) -> None:
+    """
+    Delete the rolled-up runs and move the roll-up into the directory of the latest one.
+    """
+    for timestamp in timestamps:
+        shutil.rmtree(os.path.join(snapshots_dir, timestamp), ignore_errors=True)
+    target_path = os.path.join(snapshots_dir, timestamps[-1])
+    os.rename(staging_path, target_path)
+    os.remove(os.path.join(target_path, SOURCES_FILE))
+
+
+def recover_staging(snapshots_dir: str) -> None:
+    """
+    Finish or discard the roll-ups interrupted by a crash.
+    """
+    for entry in os.listdir(snapshots_dir):
+        if not (entry.startswith(".") and entry.endswith(STAGING_SUFFIX)):
+            continue
+        staging_path = os.path.join(snapshots_dir, entry)
+        sources_path = os.path.join(staging_path, SOURCES_FILE)
+        if os.path.exists(sources_path):
+            # the roll-up is complete and its runs may be partly deleted, finish replacing them
+            with open(sources_path, "r") as file:
+                timestamps = file.read().split()
+            logger.info(f"Finishing the interrupted roll-up of runs {timestamps[0]} to {timestamps[-1]}.")
+            replace_runs(snapshots_dir, staging_path, timestamps)
+        elif os.path.exists(os.path.join(snapshots_dir, entry[1 : -len(STAGING_SUFFIX)])):
+            # interrupted while writing the roll-up, before any run was deleted
+            shutil.rmtree(staging_path)
+        else:
+            os.rename(staging_path, os.path.join(snapshots_dir, entry[1 : -len(STAGING_SUFFIX)]))
+
+
+def compact_runs(
+    snapshots_dir: str, timestamps: list, rollup_period: str, config: dict, registry, workspace, project_id
+) -> int:
+    """
+    Roll up the runs of a period into the directory of the latest run. Return the number of runs removed.
+    """
+    target = timestamps[-1]
+    staging_path = os.path.join(snapshots_dir, f".{target}{STAGING_SUFFIX}")
+    shutil.rmtree(staging_path, ignore_errors=True)
+
+    # the same stratum file across the runs, whether it was compressed or not
+    run_files = {}
+    for timestamp in timestamps:
+        for relative_path in find_timestamp_snapshots(snapshots_dir, timestamp):
+            file_key = os.path.relpath(relative_path, timestamp).removesuffix(".gz")
+            run_files.setdefault(file_key, []).append(relative_path)
+
+    for file_key, relative_paths in run_files.items():
+        data = rollup_snapshot([os.path.join(snapshots_dir, path) for path in relative_paths], rollup_period)
+        if data is None:
+            continue
+        output_path = os.path.join(staging_path, file_key)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        write_snapshot_data(data, output_path, config)
+
+    if not os.path.exists(staging_path):
+        logger.warning(f"No readable snapshots in runs {timestamps[0]} to {target}, skipping the roll-up.")
+        return 0
+
+    # remove the rolled-up runs from the project, the roll-up is added by the next dashboard update
+    if registry is not None:
+        for relative_paths in run_files.values():
+            for relative_path in relative_paths:
+                snapshot_id = registry.unregister(relative_path)
+                if snapshot_id and workspace is not None:
+                    try:
+                        workspace.delete_snapshot(project_id, snapshot_id)
+                    except Exception as e:
+                        logger.warning(f"Error deleting snapshot {relative_path} from the workspace: {e}")
+        for timestamp in timestamps:
+            registry.reopen(timestamp)
+        registry.save()
+
+    # from here on a crash is recovered by finishing the roll-up, see recover_staging
+    sources_path = os.path.join(staging_path, SOURCES_FILE)
+    with open(f"{sources_path}.tmp", "w") as file:
+        file.write("\n".join(timestamps))
+    os.replace(f"{sources_path}.tmp", sources_path)
+    replace_runs(snapshots_dir, staging_path, timestamps)
+    return len(timestamps) - 1
+
+
+def compact_snapshots(
+    config: dict, snapshots_dir: str = None, workspace=None, project=None, now: datetime = None
+) -> int:
+    """
+    Roll up the runs older than the full-resolution window into one run per period, in the snapshots, the project
+    and the metric store. Return the number of runs removed.
+    """
+    _, full_resolution_days, rollup_period = get_retention_options(config)
+    if snapshots_dir is None:
+        snapshots_dir = get_snapshots_dir()
+    if not os.path.exists(snapshots_dir):
+        logger.info(f"Snapshots directory not found: {snapshots_dir}")
+        return 0
+
+    cutoff = (now or datetime.now()) - timedelta(days=full_resolution_days)
+    recover_staging(snapshots_dir)
+
+    # without a project there is nothing registered to remove
+    registry = SnapshotRegistry(snapshots_dir, project.id) if project is not None else None
+    project_id = project.id if project is not None else None
+
+    num_removed = 0
+    for timestamps in group_runs(list_subdirectories(snapshots_dir), cutoff, rollup_period):
+        try:
+            num_removed += compact_runs(
+                snapshots_dir, timestamps, rollup_period, config, registry, workspace, project_id
+            )
+        except Exception as e:
+            logger.error(f"Error rolling up runs {timestamps[0]} to {timestamps[-1]}: {e}")
+
+    metric_store_path = os.path.join(snapshots_dir, METRIC_STORE_FILE_NAME)
+    if os.path.exists(metric_store_path):
+        MetricStore(metric_store_path).rollup(cutoff.strftime(TIMESTAMP_FORMAT), rollup_period)
+
+    logger.info(f"Rolled up {num_removed} runs older than {cutoff.strftime(TIMESTAMP_FORMAT)} ({rollup_period}).")
+    return num_removed
@@ -0,0 +1,98 @@
+"""
+File to keep track of the snapshots already added to the Evidently project, so each dashboard update only adds the new ones.
+"""
+
+import json
+import logging
+import os
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILE_NAME = ".registry.json"
+
+
+class SnapshotRegistry:
+    """
+    Manifest of the snapshot files added to a project, stored next to the snapshots.
+
+    The manifest records the snapshot id of every registered file (relative to the snapshots directory), and the
+    timestamp directories whose files are all registered, so they are not walked again. It belongs to a single
+    project, if the project is re-created the manifest starts over.
+    """
+
+    def __init__(self, snapshots_dir: str, project_id: str):
+        self.file_path = os.path.join(snapshots_dir, REGISTRY_FILE_NAME)
+        self.project_id = str(project_id)
+        self.snapshots = {}
+        self.completed_timestamps = set()
+        self.load()
+
+    def load(self) -> None:
+        """
+        Load the manifest from disk, ignoring it if it belongs to another project or can't be read.
+        """
+        if not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, "r") as file:
+                registry = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Error loading snapshot registry, all snapshots will be registered again: {e}")
+            return
+
+        if registry.get("project_id") != self.project_id:
+            logger.info("Snapshot registry belongs to another project, all snapshots will be registered again.")
+            return
+        self.snapshots = registry.get("snapshots", {})
+        self.completed_timestamps = set(registry.get("completed_timestamps", []))
+
+    def save(self) -> None:
+        """
+        Save the manifest to disk, writing to a temporary file and renaming it so it is never left half-written.
+        """
+        registry = {
+            "project_id": self.project_id,
+            "snapshots": self.snapshots,
+            "completed_timestamps": sorted(self.completed_timestamps),
+        }
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(registry, file)
+        os.replace(temp_path, self.file_path)
+
+    def is_registered(self, relative_path: str) -> bool:
+        """
+        Check if the snapshot file has already been added to the project.
+        """
+        return relative_path in self.snapshots
+
+    def register(self, relative_path: str, snapshot_id: str) -> None:
+        """
+        Record that the snapshot file has been added to the project.
+        """
+        self.snapshots[relative_path] = str(snapshot_id)
+
+    def unregister(self, relative_path: str):
+        """
+        Forget a snapshot file removed from the project. Return its snapshot id, or None if it wasn't registered.
+        """
+        return self.snapshots.pop(relative_path, None)
+
+    def is_completed(self, timestamp: str) -> bool:
+        """
+        Check if all the snapshot files of a run have been added to the project.
+        """
+        return timestamp in self.completed_timestamps
+
+    def complete(self, timestamp: str) -> None:
+        """
+        Record that all the snapshot files of a run have been added to the project.
+        """
+        self.completed_timestamps.add(timestamp)
+
+    def reopen(self, timestamp: str) -> None:
+        """
+        Record that the snapshot files of a run have changed, so the run is walked again.
+        """
+        self.completed_timestamps.discard(timestamp)
@@ -0,0 +1,167 @@
+"""
+File to pre-render the static HTML of the dashboard panels (title, model information, references and disclaimer). The HTML is cached by the project information and the content of the fact card image, and the fact card is served by the dashboard API under a content-addressed URL instead of being inlined in every project save.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FACT_CARD_DIR = "/app/frontend/dashboard/public/images/"
+IMAGE_MIME_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+MAX_URI_SIZE = 2 * 1024 * 1024
+ASSETS_ROUTE = "/assets"
+
+# file path -> (modification time, size, digest), so an unchanged image isn't hashed again
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def get_assets_url() -> str:
+    """
+    Get the public URL of the dashboard API serving the images, or an empty string to inline them.
+    """
+    return os.environ.get("DASHBOARD_ASSETS_URL", "").rstrip("/")
+
+
+def file_digest(file_path: str) -> str:
+    """
+    Get the SHA-256 digest of a file, recomputed only when the file changes.
+    """
+    stat = os.stat(file_path)
+    with _digests_lock:
+        cached = _digests.get(file_path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+    with _digests_lock:
+        _digests[file_path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def get_mime_type(file_path: str) -> str:
+    """
+    Get the MIME type of an image.
+    """
+    return IMAGE_MIME_TYPES.get(os.path.splitext(file_path)[1].lower(), "application/octet-stream")
+
+
+def asset_name(file_path: str, digest: str) -> str:
+    """
+    Get the content-addressed name of an image served by the dashboard API.
+    """
+    return f"{digest}{os.path.splitext(file_path)[1].lower()}"
+
+
+@lru_cache(maxsize=8)
+def image_to_data_uri(file_path: str, digest: str) -> str:
+    """
+    Convert an image to a data URI. The digest is part of the cache key, so a changed image is encoded again.
+    """
+    with open(file_path, "rb") as image_file:
+        encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
+    data_uri = f"data:{get_mime_type(file_path)};base64,{encoded_string}"
+
+    if len(data_uri) > MAX_URI_SIZE:
+        raise ValueError(
+            f"Data URI size ({len(data_uri)} bytes) exceeds the maximum allowed size ({MAX_URI_SIZE} bytes)"
+        )
+    return data_uri
+
+
+def get_fact_card_path(config: dict):
+    """
+    Get the path of the fact card image, or None if there is no valid image.
+    """
+    if not config["info"]["fact_card"]:
+        return None
+
+    # Check if the file exists in the public folder
+    full_path = os.path.join(FACT_CARD_DIR, config["info"]["fact_card"])
+    if not os.path.exists(full_path):
+        logger.warning(f"Image file not found: {full_path}... using text disclaimer")
+        return None
+    # Check if the image is jpg, jpeg, or png
+    if not full_path.lower().endswith(tuple(IMAGE_MIME_TYPES)):
+        logger.warning(f"Invalid image file type: {full_path}... using text disclaimer")
+        return None
+    return full_path
+
+
+def get_static_html(config: dict) -> dict:
+    """
+    Get the HTML of the static panels: intro, model_info, references and disclaimer.
+    """
+    fact_card_path = get_fact_card_path(config)
+    digest = file_digest(fact_card_path) if fact_card_path else None
+    return render_static_html(json.dumps(config["info"], sort_keys=True), fact_card_path, digest, get_assets_url())
+
+
+@lru_cache(maxsize=16)
+def render_static_html(info_json: str, fact_card_path: str, digest: str, assets_url: str) -> dict:
+    """
+    Render the HTML of the static panels for the project information and fact card image.
+    """
+    info = json.loads(info_json)
+
+    intro = f"""
+        <div style='background-color: #f0f8ff; padding: 15px; border-radius: 5px;'>
+            <h3 style='color: #02B3E6;'> {info["project_name"]}</h3>
+            <p style='text-align: left; font-size: 16px;'>{info["project_description"]}</p>
+        </div>
+        """
+
+    model_info = f"""
+    <div style='background-color: #f0f8ff; padding: 15px; border-radius: 5px;'>
+        <h3 style='color: #02B3E6; text-align: center;'>Model Information</h3>
+        <p style='text-align: left; font-size: 16px;'><strong>Model Developer:</strong> {info["model_developer"]}</p>
+        <p style='text-align: left; font-size: 16px;'><strong>Contact Name:</strong> {info["contact_name"]}</p>
+        <p style='text-align: left; font-size: 16px;'><strong>Contact Email:</strong> {info["contact_email"]}</p>
+    </div>
+    """
+
+    # references are a list of urls, so we need to format them as a list and click-able links
+    references = f"""
+    <div style='background-color: #f0f8ff; padding: 1px; border-radius: 5px;'>
+        <h3 style='color: #02B3E6; text-align: center;'>References</h3>
+        <ul style='text-align: left; font-size: 16px;'>
+            {"".join([f"<li><a href='{reference['url']}'>{reference['name']}</a></li>" for reference in info["references"]])}
+        </ul>
+    </div>
+    """
+
+    disclaimer = f"""
+    <div style='background-color: #f0f8ff; padding: 1px; border-radius: 5px;'>
+        <p style='color: #00599D; font-size: 18px;'>{info["disclaimer"]}</p>
+    </div>
+    """
+
+    if fact_card_path:
+        try:
+            # link to the image served by the dashboard API if possible, instead of inlining it
+            if assets_url:
+                image_src = f"{assets_url}{ASSETS_ROUTE}/{asset_name(fact_card_path, digest)}"
+            else:
+                image_src = image_to_data_uri(fact_card_path, digest)
+            disclaimer = f"""
+                    <div style='background-color: #f0f8ff; padding: 1px; border-radius: 5px;'>
+                        <img src='{image_src}' alt='disclaimer' style='width: 100%; height: auto;'>
+                    </div>
+                    """
+        except ValueError as e:
+            logger.warning(f"Image data URI too large: {e}... using text disclaimer")
+        except Exception as e:
+            logger.warning(f"Error converting image to data URI: {e}... using text disclaimer")
+
+    return {"intro": intro, "model_info": model_info, "references": references, "disclaimer": disclaimer}
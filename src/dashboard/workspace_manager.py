@@ -1,7 +1,11 @@
-from evidently.ui.workspace import Workspace, WorkspaceBase
+import logging
 import os
+import threading
 
 WORKSPACE_NAME = "/app/workspace"
+GENERATION_FILE = os.path.join(WORKSPACE_NAME, ".generation")
+
+logger = logging.getLogger(__name__)
 
 
 class WorkspaceManager:
@@ -21,19 +25,67 @@ class WorkspaceManager:
             raise Exception("This class is a singleton")
         else:
             WorkspaceManager._instance = self
+            self.lock = threading.Lock()
+            self.generation = get_generation()
             self.workspace = self.load_or_create_workspace(WORKSPACE_NAME)
 
-    def load_or_create_workspace(self, workspace_name: str) -> WorkspaceBase:
+    def load_or_create_workspace(self, workspace_name: str):
         """
         Load or create a workspace.
         """
+        # Evidently is only imported once the workspace is needed, not when the module is imported
+        from evidently.ui.workspace import Workspace
+
+        ensure_directory(workspace_name)
         return Workspace.create(workspace_name)
 
     def reload_workspace(self):
         """
         Reload the workspace.
         """
-        self.workspace = self.load_or_create_workspace(WORKSPACE_NAME)
+        with self.lock:
+            self.generation = get_generation()
+            self.workspace = self.load_or_create_workspace(WORKSPACE_NAME)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the workspace only if the flow has written to it since the last load. Return True if it was reloaded.
+        """
+        generation = get_generation()
+        if generation == self.generation:
+            return False
+        with self.lock:
+            # another request may have reloaded it while waiting for the lock
+            if generation == self.generation:
+                return False
+            logger.info(f"Workspace changed (generation {self.generation} -> {generation}), reloading.")
+            self.workspace = self.load_or_create_workspace(WORKSPACE_NAME)
+            self.generation = generation
+        return True
+
+
+def get_generation() -> int:
+    """
+    Get the workspace generation, which is incremented every time the flow updates the workspace.
+    """
+    try:
+        with open(GENERATION_FILE, "r") as file:
+            return int(file.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_generation() -> int:
+    """
+    Increment the workspace generation after the flow has written new snapshots to the workspace.
+    """
+    generation = get_generation() + 1
+    ensure_directory(WORKSPACE_NAME)
+    temp_path = f"{GENERATION_FILE}.tmp"
+    with open(temp_path, "w") as file:
+        file.write(str(generation))
+    os.replace(temp_path, GENERATION_FILE)
+    return generation
 
 
 def ensure_directory(directory: str) -> None:
@@ -42,6 +94,3 @@ def ensure_directory(directory: str) -> None:
     """
     if not os.path.exists(directory):
         os.makedirs(directory)
-
-
-ensure_directory(WORKSPACE_NAME)
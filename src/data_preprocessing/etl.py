@@ -4,10 +4,10 @@ ETL pipeline script. This script is responsible for loading, validating, and spl
 
 import os
 
-from pendulum import local
 from src.data_preprocessing.fetch_data import fetch_and_merge
 from src.data_preprocessing.validate import validate_data
 from scripts.data_details import data_details
+from src.utils.profiling import stage
 import pandas as pd
 import logging
 
@@ -22,7 +22,10 @@ def main_load_and_validate(config: dict) -> pd.DataFrame:
     data = fetch_and_merge(config)
 
     # Validate the data
-    if not validate_data(data, config):
+    with stage("validate", rows_in=len(data)) as record:
+        valid = validate_data(data, config)
+        record["rows_out"] = len(data) if valid else 0
+    if not valid:
         return None
     return data
 
@@ -79,8 +82,11 @@ def etl_pipeline(config: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
         logger.info("No new data available. Pipeline will exit normally.")
         return None, None
     logger.info("Data loaded and validated successfully.")
-    reference_data = reference_load_and_validate(config, data)
+    with stage("reference_load") as record:
+        reference_data = reference_load_and_validate(config, data)
+        record["rows_out"] = len(reference_data)
     logger.info("Reference data loaded and validated successfully.")
-    set_details(data, config)
+    with stage("details", rows_in=len(data)):
+        set_details(data, config)
     logger.info("Details updated and saved successfully.")
     return data, reference_data
@@ -6,25 +6,14 @@ import pandas as pd
 from pymongo import MongoClient
 from pymongo.errors import OperationFailure
 import logging
-import os
+from src.utils.mongo import MongoManager
+from src.utils.profiling import stage
+from src.utils.tracing import TRACE_CONTEXT_FIELD, add_ingestion_links, span, traced
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
-def get_db_connection(mongo_uri: str) -> MongoClient:
-    """
-    Get a connection to the MongoDB database.
-    """
-    client = MongoClient(mongo_uri)
-    db_name = "data_ingestion"
-    if db_name not in client.list_database_names():
-        db = client[db_name]
-        db.create_collection("dummy")
-        db.drop_collection("dummy")
-    return client[db_name]
-
-
 def fetch_data(db: MongoClient, collection: str) -> pd.DataFrame:
     """
     Fetch data from the MongoDB database.
@@ -92,27 +81,26 @@ def move_matched_data(
         logger.error(f"Error moving matched data: {e}")
 
 
+@traced("etl.fetch_and_merge")
 def fetch_and_merge(config: dict) -> pd.DataFrame:
     """
     Fetch data from the MongoDB database and merge it into a single DataFrame.
     """
-    mongo_uri = os.getenv("MONGO_URI")
-    if not mongo_uri:
-        raise ValueError("MONGO_URI environment variable is not set")
-
-    db = get_db_connection(mongo_uri)
+    mongo = MongoManager.get_instance()
+    db = mongo.db
 
     model_id = config["model_config"]["model_id"]
 
     collections_to_create = [f"{model_id}_results", f"{model_id}_labels", f"{model_id}_matched"]
     for collection_name in collections_to_create:
-        if collection_name not in db.list_collection_names():
-            db.create_collection(collection_name)
+        mongo.ensure_collection(collection_name)
 
     # Fetch results and labels data
     try:
-        results = fetch_data(db, f"{model_id}_results")
-        labels = fetch_data(db, f"{model_id}_labels")
+        with stage("fetch") as record:
+            results = fetch_data(db, f"{model_id}_results")
+            labels = fetch_data(db, f"{model_id}_labels")
+            record["rows_out"] = len(results) + len(labels)
     except OperationFailure as e:
         logger.error(f"Error fetching data: {e}")
         return pd.DataFrame()
@@ -124,8 +112,18 @@ def fetch_and_merge(config: dict) -> pd.DataFrame:
         return pd.DataFrame()
 
     # Process duplicates
-    results = process_duplicates(results, config)
-    labels = process_duplicates(labels, config)
+    with stage("dedupe", rows_in=len(results) + len(labels)) as record:
+        results = process_duplicates(results, config)
+        labels = process_duplicates(labels, config)
+        record["rows_out"] = len(results) + len(labels)
+
+    # Link the run to the uploads of the data, and drop their trace context
+    traceparents = []
+    for df in (results, labels):
+        if TRACE_CONTEXT_FIELD in df.columns:
+            traceparents.extend(df[TRACE_CONTEXT_FIELD].dropna().unique().tolist())
+            df.drop(columns=[TRACE_CONTEXT_FIELD], inplace=True)
+    links = add_ingestion_links(traceparents)
 
     # Drop the _id columns from MongoDB
     results.drop(columns=["_id"], inplace=True)
@@ -145,21 +143,24 @@ def fetch_and_merge(config: dict) -> pd.DataFrame:
     # Merge results and labels data
     study_id_col = config["columns"]["study_id"]
 
-    merged_data = pd.merge(
-        results,
-        labels,
-        on=study_id_col,
-    )
+    with stage("merge", rows_in=len(results) + len(labels)) as record, span("etl.merge", links=links):
+        merged_data = pd.merge(
+            results,
+            labels,
+            on=study_id_col,
+        )
+        record["rows_out"] = len(merged_data)
 
     # Move matched data to a new collection
     matched_ids = merged_data[study_id_col].tolist()
-    move_matched_data(
-        db,
-        merged_data,
-        matched_ids,
-        f"{model_id}_results",
-        f"{model_id}_labels",
-        f"{model_id}_matched",
-        config,
-    )
+    with stage("move", rows_in=len(merged_data)):
+        move_matched_data(
+            db,
+            merged_data,
+            matched_ids,
+            f"{model_id}_results",
+            f"{model_id}_labels",
+            f"{model_id}_matched",
+            config,
+        )
     return merged_data
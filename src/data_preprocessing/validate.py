@@ -6,6 +6,7 @@ import pandas as pd
 import json
 import jsonschema
 import logging
+from src.utils.tracing import traced
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -113,6 +114,7 @@ def validate_schema(data: pd.DataFrame, mapping: dict) -> bool:
     return True
 
 
+@traced("etl.validate_data")
 def validate_data(data: pd.DataFrame, config: dict) -> bool:
     """
     Main function to validate the data in a DataFrame
@@ -0,0 +1,162 @@
+"""
+File to store the state of the alerts across runs in SQLite, keyed by (test category, stratum, test id). It tracks when each failure was first and last seen, suppresses the repeated alerts of a persistent failure and finds the failures resolved in a run.
+"""
+
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ALERT_STATE_FILE_NAME = "alerts.db"
+DEFAULT_SUPPRESSION_HOURS = 24
+# last_notified of a failure whose notification wasn't sent, it sorts before any timestamp so the next run notifies it
+NEVER_NOTIFIED = ""
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS alert_state (
+        category TEXT NOT NULL,
+        stratum TEXT NOT NULL,
+        test_id TEXT NOT NULL,
+        name TEXT,
+        description TEXT,
+        first_seen TEXT NOT NULL,
+        last_seen TEXT NOT NULL,
+        last_notified TEXT NOT NULL,
+        occurrences INTEGER NOT NULL,
+        resolved_at TEXT,
+        PRIMARY KEY (category, stratum, test_id)
+    ) WITHOUT ROWID
+    """,
+    # the open alerts are the only ones read without their key
+    "CREATE INDEX IF NOT EXISTS open_alerts ON alert_state (last_seen) WHERE resolved_at IS NULL",
+]
+
+
+def get_alert_state_path() -> str:
+    """
+    Get the path of the alert state store, next to the snapshots in the docker environment or locally.
+    """
+    if os.path.exists("/app"):
+        return os.path.join("/app/snapshots", ALERT_STATE_FILE_NAME)
+    return os.path.join("snapshots", ALERT_STATE_FILE_NAME)
+
+
+def get_key(failure: dict) -> tuple:
+    """
+    Get the (category, stratum, test id) key of a failed test.
+    """
+    test = failure["test"]
+    return failure["category"], failure["stratum"], test.get("test_id") or test["name"]
+
+
+class AlertStateStore:
+    """
+    SQLite store of the alert state. A run reads and writes the rows of its failed tests by key, and the open alerts
+    to resolve, so its cost grows with the failures rather than with the history.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or get_alert_state_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    @contextmanager
+    def connect(self):
+        """
+        Open a connection to the store, committing on success and closing it when done.
+        """
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def pending(
+        self,
+        failures: list,
+        evaluated: set,
+        timestamp: str,
+        suppression_hours: float = DEFAULT_SUPPRESSION_HOURS,
+    ) -> tuple[list, list]:
+        """
+        Find what a run has to notify, without changing the store, given its failed tests as {category, stratum, test}
+        dicts and the (category, stratum) pairs it evaluated. Return the failures to notify (new, reopened, or not
+        notified within the suppression window), with their first_seen timestamp, and the open alerts of the
+        evaluated pairs that didn't fail in the run.
+        """
+        cutoff = (datetime.fromisoformat(timestamp) - timedelta(hours=suppression_hours)).isoformat(timespec="seconds")
+        notify = []
+        failed = set()
+        with self.connect() as connection:
+            for failure in failures:
+                key = get_key(failure)
+                failed.add(key)
+                row = connection.execute(
+                    "SELECT first_seen, last_notified, resolved_at FROM alert_state "
+                    "WHERE category = ? AND stratum = ? AND test_id = ?",
+                    key,
+                ).fetchone()
+                if row is None or row[2] is not None:
+                    notify.append({**failure, "first_seen": timestamp})
+                elif row[1] <= cutoff:
+                    notify.append({**failure, "first_seen": row[0]})
+
+            resolved = []
+            open_alerts = connection.execute(
+                "SELECT category, stratum, test_id, name, first_seen FROM alert_state WHERE resolved_at IS NULL"
+            ).fetchall()
+            for category, stratum, test_id, name, first_seen in open_alerts:
+                # a stratum that wasn't tested in this run may still be failing
+                if (category, stratum) not in evaluated or (category, stratum, test_id) in failed:
+                    continue
+                resolved.append(
+                    {
+                        "category": category,
+                        "stratum": stratum,
+                        "test_id": test_id,
+                        "name": name,
+                        "first_seen": first_seen,
+                    }
+                )
+        return notify, resolved
+
+    def record(self, failures: list, notified: list, resolved: list, timestamp: str) -> None:
+        """
+        Record the failed tests of a run, and the failures and resolutions that were notified. Pass empty lists when
+        the notification wasn't sent, so the failures are notified again and the resolutions found again next run.
+        """
+        notified_keys = {get_key(failure) for failure in notified}
+        with self.connect() as connection:
+            for failure in failures:
+                test = failure["test"]
+                key = get_key(failure)
+                row = connection.execute(
+                    "SELECT first_seen, last_notified, occurrences, resolved_at FROM alert_state "
+                    "WHERE category = ? AND stratum = ? AND test_id = ?",
+                    key,
+                ).fetchone()
+                if row is None or row[3] is not None:
+                    first_seen, last_notified, occurrences = timestamp, NEVER_NOTIFIED, 1
+                else:
+                    first_seen, last_notified, occurrences = row[0], row[1], row[2] + 1
+                if key in notified_keys:
+                    last_notified = timestamp
+                connection.execute(
+                    "INSERT OR REPLACE INTO alert_state (category, stratum, test_id, name, description, first_seen, "
+                    "last_seen, last_notified, occurrences, resolved_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                    (*key, test["name"], test.get("description"), first_seen, timestamp, last_notified, occurrences),
+                )
+            connection.executemany(
+                "UPDATE alert_state SET resolved_at = ? WHERE category = ? AND stratum = ? AND test_id = ?",
+                [(timestamp, alert["category"], alert["stratum"], alert["test_id"]) for alert in resolved],
+            )
+        logger.info(f"Alert state updated: {len(notified)} notified, {len(resolved)} resolved.")
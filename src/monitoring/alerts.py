@@ -1,45 +1,127 @@
+"""
+File to send the alerts of a monitoring run. The test tasks publish their failed tests to a run-scoped queue without
+blocking, and one dispatcher sends them in a single email at the end of the run, with timeouts, retries and backoff.
+"""
+
 import requests
 import os
 import logging
+import queue
+import time
 from collections import defaultdict
+from datetime import datetime
+from src.monitoring.alert_state import DEFAULT_SUPPRESSION_HOURS
 
 logger = logging.getLogger(__name__)
 
+MAILGUN_URL = "https://api.mailgun.net/v3/sandbox96338a266b544d14be5f1ba2b8749232.mailgun.org/messages"
+MAILGUN_SENDER = "AI Monitoring Alert <mailgun@sandbox96338a266b544d14be5f1ba2b8749232.mailgun.org>"
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2
 
-def send_email_alert(subject, body, to_emails):
+
+class MailgunTransport:
     """
-    Send an email alert using the Mailgun API.
+    Send emails with the Mailgun API.
     """
-    try:
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+
+    def send(self, subject: str, body: str, to_emails: list) -> None:
+        """
+        Send an email, raising an exception if it fails.
+        """
         mailgun_api_key = os.getenv("MAILGUN_API_KEY")
         if not mailgun_api_key:
             raise ValueError("Mailgun API key not found in environment variables")
 
         response = requests.post(
-            "https://api.mailgun.net/v3/sandbox96338a266b544d14be5f1ba2b8749232.mailgun.org/messages",
+            MAILGUN_URL,
             auth=("api", mailgun_api_key),
             data={
-                "from": "AI Monitoring Alert <mailgun@sandbox96338a266b544d14be5f1ba2b8749232.mailgun.org>",
+                "from": MAILGUN_SENDER,
                 "to": to_emails,
                 "subject": subject,
                 "text": body,
             },
+            timeout=self.timeout,
         )
         response.raise_for_status()
+
+
+class StubTransport:
+    """
+    Keep the emails in memory instead of sending them, for tests and local runs. The first `failures` sends fail.
+    """
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+
+    def send(self, subject: str, body: str, to_emails: list) -> None:
+        """
+        Record an email.
+        """
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("Stub transport failure")
+        self.sent.append({"subject": subject, "body": body, "to": to_emails})
+        logger.info(f"Stub transport received the email: {subject}")
+
+
+def get_transport(config: dict):
+    """
+    Get the transport set in the alerts configuration, Mailgun by default.
+    """
+    alerts = config.get("alerts", {})
+    transport = alerts.get("transport", "mailgun")
+    if transport == "mailgun":
+        return MailgunTransport(alerts.get("timeout_seconds", DEFAULT_TIMEOUT))
+    if transport == "stub":
+        return StubTransport()
+    raise ValueError(f"Unknown alert transport: {transport}")
+
+
+def send_email_alert(subject, body, to_emails):
+    """
+    Send an email alert using the Mailgun API.
+    """
+    try:
+        MailgunTransport().send(subject, body, to_emails)
         logger.info("Email alert sent successfully via Mailgun")
     except Exception as e:
         logger.error(f"Failed to send email alert via Mailgun: {e}")
 
 
-def check_test_results(test_suite, tags):
+def alerts_on_stratum(tags: list, config: dict) -> bool:
     """
-    Check the test results for failures and return a boolean flag.
+    Check if the tests of a stratum are alerted on: the main stratum, and the other strata unless alerts.strata is
+    false in the configuration.
     """
     if "main" in tags and "single" in tags:
-        test_results = test_suite.as_dict()
-        failed_tests = [test for test in test_results["tests"] if test["status"].lower() in ["fail", "error"]]
-        return bool(failed_tests), failed_tests
-    return False, []
+        return True
+    return config.get("alerts", {}).get("strata", True)
+
+
+def get_test_id(test) -> str:
+    """
+    Get the id of a test: its class and a fingerprint of its parameters.
+    """
+    return f"{type(test).__name__}:{test.get_fingerprint()}"
+
+
+def check_test_results(test_suite, tests: list = None):
+    """
+    Check the test results for failures and return a boolean flag. Pass in the tests of the suite to add their ids.
+    """
+    test_results = test_suite.as_dict()["tests"]
+    if tests is not None and len(tests) == len(test_results):
+        for test, result in zip(tests, test_results):
+            result["test_id"] = get_test_id(test)
+    failed_tests = [test for test in test_results if test["status"].lower() in ["fail", "error"]]
+    return bool(failed_tests), failed_tests
 
 
 def generate_alert_message(all_failed_tests, config):
@@ -51,44 +133,147 @@ def generate_alert_message(all_failed_tests, config):
         message += f"Category: {category}\n"
         for test in failed_tests:
             message += f"Test: {test['name']}\n"
+            if test.get("stratum"):
+                message += f"Stratum: {test['stratum']}\n"
             message += f"Description: {test['description']}\n"
-            message += f"Status: {test['status']}\n\n"
+            message += f"Status: {test['status']}\n"
+            if test.get("first_seen"):
+                message += f"Failing since: {test['first_seen']}\n"
+            message += "\n"
         message += "\n"
     return message
 
 
-class AlertCollector:
-    def __init__(self, config):
+def generate_resolution_message(resolved: list) -> str:
+    """
+    Generate a message for the failures resolved in a run.
+    """
+    message = "Resolved: these tests passed again.\n\n"
+    for alert in resolved:
+        message += f"Category: {alert['category']}\n"
+        message += f"Test: {alert['name']}\n"
+        message += f"Stratum: {alert['stratum']}\n"
+        message += f"Failing since: {alert['first_seen']}\n\n"
+    return message
+
+
+class AlertQueue:
+    """
+    Run-scoped queue of the test results, shared by the test tasks of a run.
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+
+    def publish(self, category: str, failed_tests: list, stratum: str) -> None:
         """
-        Initialize the alert collector with an empty dictionary to store failed tests
+        Add the failed tests of a test suite run on a stratum, without blocking. Publish the suites without failures
+        too, so their previous alerts can be resolved.
         """
-        self.all_failed_tests = defaultdict(list)
+        self.queue.put({"category": category, "stratum": stratum, "tests": list(failed_tests)})
+
+    def drain(self) -> list:
+        """
+        Remove and return all the published test results.
+        """
+        results = []
+        while True:
+            try:
+                results.append(self.queue.get_nowait())
+            except queue.Empty:
+                return results
+
+
+class AlertDispatcher:
+    """
+    Send the alerts of a run in one email, deduplicated and grouped by test category.
+
+    With an alert state store, a failure is only notified when it is new, reopened, or still failing after the
+    suppression window, and the failures resolved in the run are notified once.
+    """
+
+    def __init__(self, config: dict, transport=None, sleep=time.sleep, state=None):
+        alerts = config.get("alerts", {})
         self.config = config
+        self.emails = alerts.get("emails", [])
+        self.retries = alerts.get("retries", DEFAULT_RETRIES)
+        self.backoff = alerts.get("backoff_seconds", DEFAULT_BACKOFF)
+        self.suppression_hours = alerts.get("suppression_hours", DEFAULT_SUPPRESSION_HOURS)
+        self.transport = transport if transport is not None else get_transport(config)
+        self.sleep = sleep
+        self.state = state
 
-    def add_failed_tests(self, category, failed_tests):
+    def collect(self, results: list) -> tuple[list, set]:
         """
-        Add failed tests to the all_failed_tests dictionary
+        Get the failures of the published results, dropping the ones published twice (e.g. by a retried task), and
+        the (category, stratum) pairs that were evaluated.
         """
-        self.all_failed_tests[category].extend(failed_tests)
+        failures = []
+        evaluated = set()
+        seen = set()
+        for result in results:
+            evaluated.add((result["category"], result["stratum"]))
+            for test in result["tests"]:
+                key = (result["category"], result["stratum"], test.get("test_id") or test["name"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                failures.append({"category": result["category"], "stratum": result["stratum"], "test": test})
+        return failures, evaluated
 
-    def should_alert(self):
+    def send(self, subject: str, body: str) -> bool:
         """
-        Check if there are any failed tests to send an alert
+        Send an email, retrying with an exponential backoff. Return whether it was sent.
         """
-        return bool(self.all_failed_tests)
+        for attempt in range(self.retries + 1):
+            try:
+                self.transport.send(subject, body, self.emails)
+                logger.info("Email alert sent successfully.")
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to send email alert (attempt {attempt + 1}/{self.retries + 1}): {e}")
+                if attempt < self.retries:
+                    self.sleep(self.backoff * 2**attempt)
+        logger.error("Failed to send email alert, giving up.")
+        return False
 
-    def get_alert_message(self):
+    def dispatch(self, alert_queue: AlertQueue, timestamp: str = None) -> bool:
         """
-        Generate the alert message to send
+        Send the alerts published to the queue by the run at the timestamp. Return whether an email was sent.
         """
-        return generate_alert_message(self.all_failed_tests, self.config)
+        failures, evaluated = self.collect(alert_queue.drain())
+        notify, resolved = failures, []
+        if self.state is not None:
+            timestamp = timestamp or datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            notify, resolved = self.state.pending(failures, evaluated, timestamp, self.suppression_hours)
+        sent = self.notify(notify, resolved)
+        if self.state is not None:
+            # a notification that wasn't sent is not recorded, so the next run sends it again
+            self.state.record(failures, notify if sent else [], resolved if sent else [], timestamp)
+        return sent
 
-    def send_alert(self, to_emails):
+    def notify(self, failures: list, resolved: list) -> bool:
         """
-        Send an email alert if there are failed tests
+        Send the failures and the resolved alerts in one email. Return whether it was sent.
         """
-        if self.should_alert():
-            subject = f"AI Monitoring Alert: Test Failures Detected in {self.config['info']['project_name']}"
-            body = self.get_alert_message()
-            send_email_alert(subject, body, to_emails)
-            self.all_failed_tests.clear()  # Clear after sending
+        if not failures and not resolved:
+            return False
+        if not self.emails:
+            logger.warning("Alerts to send but no alert emails are configured.")
+            return False
+
+        project_name = self.config["info"]["project_name"]
+        grouped = defaultdict(list)
+        for failure in failures:
+            grouped[failure["category"]].append(
+                {**failure["test"], "stratum": failure["stratum"], "first_seen": failure.get("first_seen")}
+            )
+        if grouped:
+            subject = f"AI Monitoring Alert: Test Failures Detected in {project_name}"
+            body = generate_alert_message(grouped, self.config)
+            if resolved:
+                body += generate_resolution_message(resolved)
+        else:
+            subject = f"AI Monitoring: Test Failures Resolved in {project_name}"
+            body = generate_resolution_message(resolved)
+        return self.send(subject, body)
@@ -17,6 +17,10 @@ from evidently.metrics import (
 )
 import logging
 import pandas as pd
+from src.utils.config_manager import as_config
+from src.utils.snapshot_io import save_snapshot
+from src.utils.metric_store import MetricStore, extract_metric_points
+from src.utils.tracing import span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,74 +47,43 @@ def split_features(config: dict, details: dict) -> tuple[list, list]:
     """
     Split the features into numerical and categorical based on the validation rules.
     """
-    numerical_features = []
-    categorical_features = []
-
-    categorical_features.extend(
-        [
-            config["columns"]["sex"],
-            config["columns"]["hospital"],
-        ]
-    )
-
-    if config["columns"]["instrument_type"]:
-        categorical_features.append(config["columns"]["instrument_type"])
-
-    if config["columns"]["patient_class"]:
-        categorical_features.append(config["columns"]["patient_class"])
-
-    # Iterate through all features to classify them based on validation rules
-    for feature in config["columns"]["features"]:
-        if feature in details["categorical_columns"]:
-            if feature not in categorical_features:
-                categorical_features.append(feature)
-        else:
-            numerical_features.append(feature)
-
-    # Correctly classify 'age' as a numerical feature
-    if config["columns"]["age"] not in numerical_features:
-        numerical_features.append(config["columns"]["age"])
-
-    return numerical_features, categorical_features
+    return as_config(config).split_features(details["categorical_columns"])
 
 
 def setup_column_mapping(config: dict, report_type: str, details: dict) -> ColumnMapping:
     """
     Configure column mapping for different types of reports based on the configuration.
     """
-    features = split_features(config, details)
-    numerical_features, categorical_features = features
-
-    try:
-        mapping = ColumnMapping()
-        mapping.id = config["columns"]["study_id"]
-        mapping.datetime = config["columns"]["timestamp"]
-        mapping.numerical = numerical_features
-        mapping.categorical = categorical_features
+    # the columns are resolved once when the configuration is loaded, not for every report
+    config = as_config(config)
+    if report_type not in config.column_mappings:
+        logger.error("Incorrect report type")
+        raise ValueError("Incorrect report type")
+    numerical_features, categorical_features = config.split_features(details["categorical_columns"])
+    columns = config.column_mappings[report_type]
 
-        predictions = config["columns"]["predictions"]
-        labels = config["columns"]["labels"]
+    mapping = ColumnMapping()
+    mapping.id = columns["id"]
+    mapping.datetime = columns["datetime"]
+    mapping.target = columns["target"]
+    mapping.prediction = columns["prediction"]
+    mapping.numerical = numerical_features
+    mapping.categorical = categorical_features
+    if report_type == "data":
+        categorical_features.extend(config.classification_columns)
+    return mapping
 
-        if report_type == "data":
-            mapping.target = labels["regression_label"]
-            mapping.prediction = predictions["regression_prediction"]
-            if config["model_config"]["model_type"]["binary_classification"]:
-                categorical_features.append(predictions["classification_prediction"])
-                categorical_features.append(labels["classification_label"])
-        elif report_type == "regression":
-            mapping.target = labels["regression_label"]
-            mapping.prediction = predictions["regression_prediction"]
-        elif report_type == "classification":
-            mapping.target = labels["classification_label"]
-            mapping.prediction = predictions["classification_prediction"]
-        else:
-            logger.error("Incorrect report type")
-            raise ValueError("Incorrect report type")
 
-        return mapping
-    except KeyError as e:
-        logger.error(f"KeyError: {e}")
-        raise ValueError(f"Missing config key: {e}. Please fix the config.") from e
+def record_metrics(metrics: list, config: dict, tags: list, timestamp: str) -> None:
+    """
+    Append the dashboard panel metrics of a report to the metric store. The last tag (the report category) is not
+    part of the stratum tags.
+    """
+    try:
+        points = extract_metric_points(metrics, config)
+        MetricStore().append(tags[:-1], timestamp, points)
+    except Exception as e:
+        logger.error(f"Error recording metrics: {e}")
 
 
 def data_report(
@@ -139,27 +112,32 @@ def data_report(
     if len(t) == 1:
         t.append("single")
     t.append("data")
+    data_metrics = [
+        DatasetSummaryMetric(),
+        DatasetDriftMetric(),
+        DataDriftTable(),
+        ColumnDriftMetric(data_mapping.prediction),
+        ColumnDriftMetric(data_mapping.target),
+    ]
     data_quality_report = Report(
-        metrics=[
-            DatasetSummaryMetric(),
-            DatasetDriftMetric(),
-            DataDriftTable(),
-            ColumnDriftMetric(data_mapping.prediction),
-            ColumnDriftMetric(data_mapping.target),
-        ],
+        metrics=data_metrics,
         tags=t,
         timestamp=timestamp,
     )
-    data_quality_report.run(
-        reference_data=reference_data,
-        current_data=data,
-        column_mapping=data_mapping,
-    )
+    with span("evidently.report", {"name": "data_quality", "stratum": folder_path, "rows": len(data)}):
+        data_quality_report.run(
+            reference_data=reference_data,
+            current_data=data,
+            column_mapping=data_mapping,
+        )
     # check if in docker environment
     if os.path.exists("/app"):
-        data_quality_report.save(f"/app/snapshots/{timestamp}/{folder_path}/data_quality_report.json")
+        save_snapshot(
+            data_quality_report, f"/app/snapshots/{timestamp}/{folder_path}/data_quality_report.json", config
+        )
     else:
-        data_quality_report.save(f"snapshots/{timestamp}/{folder_path}/data_quality_report.json")
+        save_snapshot(data_quality_report, f"snapshots/{timestamp}/{folder_path}/data_quality_report.json", config)
+    record_metrics(data_metrics, config, t, timestamp)
 
 
 def regression_report(
@@ -190,24 +168,27 @@ def regression_report(
     if len(t) == 1:
         t.append("single")
     t.append("regression")
+    regression_metrics = [
+        RegressionQualityMetric(),
+        RegressionPredictedVsActualScatter(),
+    ]
     regression_report = Report(
-        metrics=[
-            RegressionQualityMetric(),
-            RegressionPredictedVsActualScatter(),
-        ],
+        metrics=regression_metrics,
         tags=t,
         timestamp=timestamp,
     )
-    regression_report.run(
-        reference_data=reference_data,
-        current_data=data,
-        column_mapping=regression_mapping,
-    )
+    with span("evidently.report", {"name": "regression", "stratum": folder_path, "rows": len(data)}):
+        regression_report.run(
+            reference_data=reference_data,
+            current_data=data,
+            column_mapping=regression_mapping,
+        )
     # check if in docker environment
     if os.path.exists("/app"):
-        regression_report.save(f"/app/snapshots/{timestamp}/{folder_path}/regression_report.json")
+        save_snapshot(regression_report, f"/app/snapshots/{timestamp}/{folder_path}/regression_report.json", config)
     else:
-        regression_report.save(f"snapshots/{timestamp}/{folder_path}/regression_report.json")
+        save_snapshot(regression_report, f"snapshots/{timestamp}/{folder_path}/regression_report.json", config)
+    record_metrics(regression_metrics, config, t, timestamp)
 
 
 def classification_report(
@@ -235,24 +216,29 @@ def classification_report(
     if len(t) == 1:
         t.append("single")
     t.append("classification")
+    classification_metrics = [
+        ClassificationQualityMetric(),
+        ClassificationConfusionMatrix(),
+    ]
     classification_report = Report(
-        metrics=[
-            ClassificationQualityMetric(),
-            ClassificationConfusionMatrix(),
-        ],
+        metrics=classification_metrics,
         tags=t,
         timestamp=timestamp,
     )
-    classification_report.run(
-        reference_data=reference_data,
-        current_data=data,
-        column_mapping=classification_mapping,
-    )
+    with span("evidently.report", {"name": "classification", "stratum": folder_path, "rows": len(data)}):
+        classification_report.run(
+            reference_data=reference_data,
+            current_data=data,
+            column_mapping=classification_mapping,
+        )
     # check if in docker environment
     if os.path.exists("/app"):
-        classification_report.save(f"/app/snapshots/{timestamp}/{folder_path}/classification_report.json")
+        save_snapshot(
+            classification_report, f"/app/snapshots/{timestamp}/{folder_path}/classification_report.json", config
+        )
     else:
-        classification_report.save(f"snapshots/{timestamp}/{folder_path}/classification_report.json")
+        save_snapshot(classification_report, f"snapshots/{timestamp}/{folder_path}/classification_report.json", config)
+    record_metrics(classification_metrics, config, t, timestamp)
 
 
 def generate_report(
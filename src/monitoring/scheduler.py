@@ -0,0 +1,99 @@
+"""
+File to schedule the stratified data into report and test tasks. Drop strata that are too small to produce meaningful results, order the remaining strata largest first, and batch the small ones into a single task.
+"""
+
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_STRATUM_ROWS = 30
+DEFAULT_BATCH_MAX_ROWS = 1000
+
+
+def get_scheduling_options(config: dict) -> tuple[int, int]:
+    """
+    Get the minimum stratum size and the maximum batch size from the configuration.
+    """
+    scheduling = config.get("scheduling", {})
+    min_rows = scheduling.get("min_stratum_rows", DEFAULT_MIN_STRATUM_ROWS)
+    batch_max_rows = scheduling.get("batch_max_rows", DEFAULT_BATCH_MAX_ROWS)
+    return int(min_rows or 0), int(batch_max_rows or 0)
+
+
+def is_main_stratum(key: str) -> bool:
+    """
+    Check if the key is the main (unfiltered) data.
+    """
+    return key.startswith("main_")
+
+
+def gate_strata(stratifications: dict, min_rows: int) -> dict:
+    """
+    Drop the strata with fewer rows than the minimum. The main data is always kept.
+    """
+    kept = {}
+    dropped = []
+    for key, data in stratifications.items():
+        if is_main_stratum(key) or len(data) >= min_rows:
+            kept[key] = data
+        else:
+            dropped.append(key)
+
+    if dropped:
+        logger.info(f"Skipping {len(dropped)} strata with fewer than {min_rows} rows: {dropped}")
+    return kept
+
+
+def batch_strata(strata: list, batch_max_rows: int) -> list:
+    """
+    Pack the (key, data) pairs into batches. Strata larger than the batch size get a batch of their own, smaller
+    strata are packed together until the batch reaches the batch size.
+    """
+    batches = []
+    current_batch = []
+    current_rows = 0
+
+    for key, data in strata:
+        if len(data) >= batch_max_rows:
+            batches.append([(key, data)])
+            continue
+        if current_batch and current_rows + len(data) > batch_max_rows:
+            batches.append(current_batch)
+            current_batch = []
+            current_rows = 0
+        current_batch.append((key, data))
+        current_rows += len(data)
+
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def batch_rows(batch: list) -> int:
+    """
+    Get the total number of rows in a batch.
+    """
+    return sum(len(data) for _, data in batch)
+
+
+def schedule_strata(stratifications: dict, config: dict) -> list:
+    """
+    Turn the stratified data into a list of batches of (key, data) pairs, largest batch first.
+
+    Each batch is meant to be run by a single task, so the pool starts with the most expensive work and the
+    many small strata share the fixed per-task overhead.
+    """
+    min_rows, batch_max_rows = get_scheduling_options(config)
+
+    strata = gate_strata(stratifications, min_rows)
+    ordered = sorted(strata.items(), key=lambda item: len(item[1]), reverse=True)
+
+    if batch_max_rows > 0:
+        batches = batch_strata(ordered, batch_max_rows)
+    else:
+        batches = [[item] for item in ordered]
+
+    batches.sort(key=batch_rows, reverse=True)
+    logger.info(f"Scheduled {len(strata)} of {len(stratifications)} strata into {len(batches)} tasks.")
+    return batches
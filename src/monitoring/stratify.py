@@ -4,12 +4,8 @@ File to split both reference and current data into stratified reports and tests
 
 import logging
 import pandas as pd
-import warnings
 from itertools import product
-from sklearn.exceptions import UndefinedMetricWarning
-from src.utils.config_manager import load_config
-from src.data_preprocessing.etl import etl_pipeline
-from scripts.data_details import load_details
+from src.utils.tracing import traced
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -135,6 +131,7 @@ class DataSplitter:
 
         return filter_product_dict
 
+    @traced("stratify.split_data")
     def split_data(self, data: pd.DataFrame, config: dict, details: dict, operation: str = "report") -> dict:
         """
         Split the data into stratified dataframes for reports and tests by sex, hospital, age, and instrument_type.
@@ -9,12 +9,16 @@ import os
 import logging
 from evidently.test_suite import TestSuite
 from src.monitoring.metrics import setup_column_mapping
-from src.monitoring.alerts import check_test_results, AlertCollector
+from src.monitoring.alerts import alerts_on_stratum, check_test_results, AlertQueue, AlertDispatcher
+from src.utils.snapshot_io import save_snapshot
+from src.utils.tracing import span
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TEST_TYPES = ["data_quality_tests", "data_drift_tests", "regression_tests", "classification_tests"]
+
 
 def ensure_directory(directory: str) -> None:
     """
@@ -49,16 +53,40 @@ def get_tags(folder_path: str) -> list:
     return tags
 
 
-def get_tests(
+def get_stratum(folder_path: str) -> str:
+    """
+    Get the stratum of the folder path, e.g. age1_sex1 for /tests/age1_sex1_test.
+    """
+    return "_".join(get_tags(folder_path))
+
+
+class TestSpec:
+    """
+    A test class from the mapping with its parameters from the configuration, resolved once per run.
+    """
+
+    def __init__(self, name: str, test_class, params: dict):
+        self.name = name
+        self.test_class = test_class
+        self.params = params
+
+    def build(self):
+        """
+        Create a new instance of the test, test objects hold their results so they are not shared between suites.
+        """
+        return self.test_class(**self.params) if self.params else self.test_class()
+
+
+def get_test_specs(
     config: dict,
     tests_mapping: dict,
     test_type: str,
 ) -> list:
     """
-    Get the tests from the configuration file, and use the mapping to get the test functions.
+    Get the tests from the configuration file, and use the mapping to resolve them into test specs.
     """
     test_configs = config["tests"][test_type]
-    tests = []
+    specs = []
     for test_config in test_configs:
         test_name = test_config["name"]
         params = test_config.get("params", {})
@@ -66,46 +94,69 @@ def get_tests(
             test_function = tests_mapping[test_type.replace("_tests", "")][test_name]
             module_name = "evidently.tests"
             test_class = import_function(module_name, test_function)
-            tests.append(test_class(**params) if params else test_class())
+            spec = TestSpec(test_name, test_class, params)
+            # instantiate once so that invalid params are reported when the plan is compiled
+            spec.build()
+            specs.append(spec)
         except KeyError as e:
             logger.error(f"KeyError: {e}")
         except Exception as e:
             logger.error(f"Error instantiating test {test_name}: {e}")
-    return tests
+    return specs
+
+
+def compile_test_plan(config: dict, tests_mapping: dict = None) -> dict:
+    """
+    Resolve the tests in the configuration into test specs for each test type. Compile once per run and share
+    the plan across all the strata.
+    """
+    if tests_mapping is None:
+        tests_mapping = load_json("src/utils/tests_map.json")
+
+    return {
+        test_type: get_test_specs(config, tests_mapping, test_type)
+        for test_type in TEST_TYPES
+        if test_type in config["tests"]
+    }
+
+
+def get_tests(test_plan: dict, test_type: str) -> list:
+    """
+    Get new test instances of a test type from the test plan.
+    """
+    return [spec.build() for spec in test_plan.get(test_type, [])]
 
 
-def get_data_tests(config: dict, tests_mapping: dict) -> list:
+def get_data_tests(test_plan: dict) -> list:
     """
-    Get the data tests from the config file.
+    Get the data tests from the test plan.
     """
-    return get_tests(config, tests_mapping, "data_quality_tests") + get_tests(
-        config, tests_mapping, "data_drift_tests"
-    )
+    return get_tests(test_plan, "data_quality_tests") + get_tests(test_plan, "data_drift_tests")
 
 
-def get_regression_tests(config: dict, tests_mapping: dict) -> list:
+def get_regression_tests(test_plan: dict) -> list:
     """
-    Get the regression tests from the config file.
+    Get the regression tests from the test plan.
     """
-    return get_tests(config, tests_mapping, "regression_tests")
+    return get_tests(test_plan, "regression_tests")
 
 
-def get_classification_tests(config: dict, tests_mapping: dict) -> list:
+def get_classification_tests(test_plan: dict) -> list:
     """
-    Get the classification tests from the config file.
+    Get the classification tests from the test plan.
     """
-    return get_tests(config, tests_mapping, "classification_tests")
+    return get_tests(test_plan, "classification_tests")
 
 
 def data_tests(
     data: pd.DataFrame,
     reference_data: pd.DataFrame,
     config: dict,
-    tests_mapping: dict,
+    test_plan: dict,
     folder_path: str,
     timestamp: str,
     details: dict,
-    alert_collector: AlertCollector,
+    alert_queue: AlertQueue,
 ) -> None:
     """
     Generate data test results.
@@ -120,30 +171,32 @@ def data_tests(
         logger.error(f"Error setting up column mapping: {e}")
         return
     try:
-        test_functions = get_data_tests(config, tests_mapping)
+        test_functions = get_data_tests(test_plan)
 
         t = get_tags(folder_path)
         if len(t) == 1:
             t.append("single")
         t.append("data")
         data_test_suite = TestSuite(tests=test_functions, tags=t, timestamp=timestamp)
-        data_test_suite.run(
-            reference_data=reference_data,
-            current_data=data,
-            column_mapping=data_mapping,
-        )
-
-        # Check for failures and send alerts
-        is_alert, failed_tests = check_test_results(data_test_suite, t)
-        if is_alert:
-            logger.info(f"Failed tests: {failed_tests}")
-            alert_collector.add_failed_tests("Data Tests", failed_tests)
+        with span("evidently.test_suite", {"name": "data", "stratum": folder_path, "rows": len(data)}):
+            data_test_suite.run(
+                reference_data=reference_data,
+                current_data=data,
+                column_mapping=data_mapping,
+            )
+
+        # Check for failures and publish the alerts
+        if alerts_on_stratum(t, config):
+            is_alert, failed_tests = check_test_results(data_test_suite, test_functions)
+            if is_alert:
+                logger.info(f"Failed tests: {failed_tests}")
+            alert_queue.publish("Data Tests", failed_tests, get_stratum(folder_path))
 
         # check if in docker environment
         if os.path.exists("/app"):
-            data_test_suite.save(f"/app/snapshots/{timestamp}/{folder_path}/data_test_suite.json")
+            save_snapshot(data_test_suite, f"/app/snapshots/{timestamp}/{folder_path}/data_test_suite.json", config)
         else:
-            data_test_suite.save(f"snapshots/{timestamp}/{folder_path}/data_test_suite.json")
+            save_snapshot(data_test_suite, f"snapshots/{timestamp}/{folder_path}/data_test_suite.json", config)
     except Exception as e:
         logger.error(f"Error running data tests: {e}")
         return
@@ -153,11 +206,11 @@ def regression_tests(
     data: pd.DataFrame,
     reference_data: pd.DataFrame,
     config: dict,
-    tests_mapping: dict,
+    test_plan: dict,
     folder_path: str,
     timestamp: str,
     details: dict,
-    alert_collector: AlertCollector,
+    alert_queue: AlertQueue,
 ) -> None:
     """
     Generate regression test results.
@@ -173,28 +226,33 @@ def regression_tests(
         return
 
     try:
-        test_functions = get_regression_tests(config, tests_mapping)
+        test_functions = get_regression_tests(test_plan)
         t = get_tags(folder_path)
         if len(t) == 1:
             t.append("single")
         t.append("regression")
         regression_test_suite = TestSuite(tests=test_functions, tags=t, timestamp=timestamp)
-        regression_test_suite.run(
-            reference_data=reference_data,
-            current_data=data,
-            column_mapping=regression_mapping,
-        )
+        with span("evidently.test_suite", {"name": "regression", "stratum": folder_path, "rows": len(data)}):
+            regression_test_suite.run(
+                reference_data=reference_data,
+                current_data=data,
+                column_mapping=regression_mapping,
+            )
 
-        # Check for failures and send alerts
-        is_alert, failed_tests = check_test_results(regression_test_suite, t)
-        if is_alert:
-            alert_collector.add_failed_tests("Regression Tests", failed_tests)
+        # Check for failures and publish the alerts
+        if alerts_on_stratum(t, config):
+            _, failed_tests = check_test_results(regression_test_suite, test_functions)
+            alert_queue.publish("Regression Tests", failed_tests, get_stratum(folder_path))
 
         # check if in docker environment
         if os.path.exists("/app"):
-            regression_test_suite.save(f"/app/snapshots/{timestamp}/{folder_path}/regression_test_suite.json")
+            save_snapshot(
+                regression_test_suite, f"/app/snapshots/{timestamp}/{folder_path}/regression_test_suite.json", config
+            )
         else:
-            regression_test_suite.save(f"snapshots/{timestamp}/{folder_path}/regression_test_suite.json")
+            save_snapshot(
+                regression_test_suite, f"snapshots/{timestamp}/{folder_path}/regression_test_suite.json", config
+            )
     except Exception as e:
         logger.error(f"Error running regression tests: {e}")
 
@@ -203,11 +261,11 @@ def classification_tests(
     data: pd.DataFrame,
     reference_data: pd.DataFrame,
     config: dict,
-    tests_mapping: dict,
+    test_plan: dict,
     folder_path: str,
     timestamp: str,
     details: dict,
-    alert_collector: AlertCollector,
+    alert_queue: AlertQueue,
 ) -> None:
     """
     Generate classification test results.
@@ -223,28 +281,37 @@ def classification_tests(
         return
 
     try:
-        test_functions = get_classification_tests(config, tests_mapping)
+        test_functions = get_classification_tests(test_plan)
         t = get_tags(folder_path)
         if len(t) == 1:
             t.append("single")
         t.append("classification")
         classification_test_suite = TestSuite(tests=test_functions, tags=t, timestamp=timestamp)
-        classification_test_suite.run(
-            reference_data=reference_data,
-            current_data=data,
-            column_mapping=classification_mapping,
-        )
+        with span("evidently.test_suite", {"name": "classification", "stratum": folder_path, "rows": len(data)}):
+            classification_test_suite.run(
+                reference_data=reference_data,
+                current_data=data,
+                column_mapping=classification_mapping,
+            )
 
-        # Check for failures and send alerts
-        is_alert, failed_tests = check_test_results(classification_test_suite, t)
-        if is_alert:
-            alert_collector.add_failed_tests("Classification Tests", failed_tests)
+        # Check for failures and publish the alerts
+        if alerts_on_stratum(t, config):
+            _, failed_tests = check_test_results(classification_test_suite, test_functions)
+            alert_queue.publish("Classification Tests", failed_tests, get_stratum(folder_path))
 
         # check if in docker environment
         if os.path.exists("/app"):
-            classification_test_suite.save(f"/app/snapshots/{timestamp}/{folder_path}/classification_test_suite.json")
+            save_snapshot(
+                classification_test_suite,
+                f"/app/snapshots/{timestamp}/{folder_path}/classification_test_suite.json",
+                config,
+            )
         else:
-            classification_test_suite.save(f"snapshots/{timestamp}/{folder_path}/classification_test_suite.json")
+            save_snapshot(
+                classification_test_suite,
+                f"snapshots/{timestamp}/{folder_path}/classification_test_suite.json",
+                config,
+            )
     except Exception as e:
         logger.error(f"Error running classification tests: {e}")
         return
@@ -258,42 +325,48 @@ def generate_tests(
     folder_path: str,
     timestamp: str,
     details: dict,
+    test_plan: dict = None,
+    alert_queue: AlertQueue = None,
 ) -> None:
     """
-    Generate the test suite based on the model type.
+    Generate the test suite based on the model type. Pass in the test plan compiled for the run, otherwise it is
+    compiled from the configuration. The failed tests are published to the alert queue of the run, otherwise they
+    are sent once the tests are done.
     """
-    try:
-        tests_mapping = load_json("src/utils/tests_map.json")
-    except Exception as e:
-        logger.error(f"Error loading tests mapping: {e}")
-        return
+    if test_plan is None:
+        try:
+            test_plan = compile_test_plan(config)
+        except Exception as e:
+            logger.error(f"Error loading tests mapping: {e}")
+            return
 
-    alert_collector = AlertCollector(config)
+    send_now = alert_queue is None
+    if send_now:
+        alert_queue = AlertQueue()
 
     # Generate the data tests
     try:
-        data_tests(data, reference_data, config, tests_mapping, folder_path, timestamp, details, alert_collector)
+        data_tests(data, reference_data, config, test_plan, folder_path, timestamp, details, alert_queue)
     except Exception as e:
         logger.error(f"Error running data tests: {e}")
 
     # Generate the regression tests
     if model_type["regression"]:
         try:
-            regression_tests(
-                data, reference_data, config, tests_mapping, folder_path, timestamp, details, alert_collector
-            )
+            regression_tests(data, reference_data, config, test_plan, folder_path, timestamp, details, alert_queue)
         except Exception as e:
             logger.error(f"Error running regression tests: {e}")
 
     # Generate the classification tests
     if model_type["binary_classification"]:
         try:
-            classification_tests(
-                data, reference_data, config, tests_mapping, folder_path, timestamp, details, alert_collector
-            )
+            classification_tests(data, reference_data, config, test_plan, folder_path, timestamp, details, alert_queue)
         except Exception as e:
             logger.error(f"Error running classification tests: {e}")
 
-    # Send alerts if necessary
-    if alert_collector.should_alert():
-        alert_collector.send_alert(config["alerts"]["emails"])
+    # Send the alerts if they aren't dispatched with the rest of the run
+    if send_now:
+        try:
+            AlertDispatcher(config).dispatch(alert_queue)
+        except Exception as e:
+            logger.error(f"Error sending alerts: {e}")
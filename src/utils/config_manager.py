@@ -1,24 +1,265 @@
 """
-File to load the JSON config file.
+File to load the JSON config file. get_config() parses and validates the file once per process and returns a read-only Config, reloaded when the file changes, with the values derived from it (required columns, feature split, column mappings) computed once instead of in every loop.
 """
 
 import json
+import logging
+import os
+import threading
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-def load_config() -> dict:
+CONFIG_PATHS = [
+    "config/config.json",
+    "/app/config/config.json",
+]
+# keys every configuration needs, the prediction and label columns are checked by model type
+REQUIRED_COLUMNS = ["study_id", "sex", "hospital", "age", "instrument_type", "patient_class", "features", "timestamp"]
+
+_configs = {}
+_configs_lock = threading.Lock()
+
+
+class FrozenDict(dict):
     """
-    Load the JSON config file
+    A dict that can't be changed, so a cached configuration can be shared safely. It is still a dict: lookups,
+    iteration and json.dumps work as before.
     """
-    filepaths = [
-        "config/config.json",
-        "/app/config/config.json",
-    ]
-    for filepath in filepaths:
 
-        try:
-            with open(filepath, "r") as file:
-                config = json.load(file)
-            return config
-        except FileNotFoundError:
-            continue
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only, use thaw() to get a mutable copy")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __deepcopy__(self, memo):
+        # a deep copy is made to be changed, e.g. a configuration adjusted for a test
+        return thaw(self)
+
+
+class FrozenList(list):
+    """
+    A list that can't be changed, for the lists of a cached configuration.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only, use thaw() to get a mutable copy")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = remove = pop = clear = sort = reverse = _immutable
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+def freeze(value):
+    """
+    Make a read-only copy of a parsed JSON value.
+    """
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """
+    Make a mutable copy of a parsed JSON value, frozen or not.
+    """
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+def validate_config(config: dict) -> None:
+    """
+    Check the keys the pipeline and the APIs need, reporting every missing key at once.
+    """
+    missing = []
+    model_type = config.get("model_config", {}).get("model_type", {})
+    for key in ["regression", "binary_classification"]:
+        if key not in model_type:
+            missing.append(f"model_config.model_type.{key}")
+    columns = config.get("columns", {})
+    missing.extend(f"columns.{key}" for key in REQUIRED_COLUMNS if key not in columns)
+    for enabled, prediction, label in [
+        (model_type.get("regression"), "regression_prediction", "regression_label"),
+        (model_type.get("binary_classification"), "classification_prediction", "classification_label"),
+    ]:
+        if enabled and prediction not in columns.get("predictions", {}):
+            missing.append(f"columns.predictions.{prediction}")
+        if enabled and label not in columns.get("labels", {}):
+            missing.append(f"columns.labels.{label}")
+    if missing:
+        raise ValueError(f"Missing config key: {', '.join(missing)}. Please fix the config.")
+
+
+class Config(FrozenDict):
+    """
+    A parsed and validated configuration. It reads like the dict of the JSON file (config["columns"]["age"]) but
+    can't be changed, and the values derived from it are computed once, when it is loaded.
+    """
+
+    path: str
+    # modification time of the file in nanoseconds, to reload it when it changes
+    mtime: int
+    model_id: str
+    regression: bool
+    binary_classification: bool
+    # columns of an uploaded results or labels file
+    results_required_columns: tuple
+    labels_required_columns: tuple
+    # top-level columns of the configuration, the other columns of an uploaded results file are kept as features
+    defined_columns: frozenset
+    # categorical columns of the stratification, and the extra features
+    stratified_columns: tuple
+    features: tuple
+    # classification columns, categorical in the data report
+    classification_columns: tuple
+    # id, datetime, target and prediction columns of the column mapping of each report type
+    column_mappings: FrozenDict
+
+    def __init__(self, config: dict = (), path: str = None, mtime: int = None):
+        config = dict(config)
+        validate_config(config)
+        super().__init__({key: freeze(value) for key, value in config.items()})
+        self.path = path
+        self.mtime = mtime
+
+        model_type = self["model_config"]["model_type"]
+        columns = self["columns"]
+        predictions = columns.get("predictions") or {}
+        labels = columns.get("labels") or {}
+        self.model_id = self["model_config"].get("model_id")
+        self.regression = bool(model_type["regression"])
+        self.binary_classification = bool(model_type["binary_classification"])
+
+        optional = [columns[key] for key in ["instrument_type", "patient_class"] if columns[key]]
+        self.stratified_columns = (columns["sex"], columns["hospital"], *optional)
+        self.features = tuple(columns["features"] or [])
+        prediction_columns = [
+            predictions[key]
+            for key, enabled in [
+                ("regression_prediction", self.regression),
+                ("classification_prediction", self.binary_classification),
+            ]
+            if enabled
+        ]
+        label_columns = [
+            labels[key]
+            for key, enabled in [
+                ("regression_label", self.regression),
+                ("classification_label", self.binary_classification),
+            ]
+            if enabled
+        ]
+        self.results_required_columns = (
+            columns["study_id"],
+            columns["sex"],
+            columns["hospital"],
+            columns["age"],
+            *optional,
+            *prediction_columns,
+        )
+        self.labels_required_columns = (columns["study_id"], *label_columns)
+        self.defined_columns = frozenset(column for column in columns.values() if isinstance(column, str))
+        self.classification_columns = (
+            (predictions.get("classification_prediction"), labels.get("classification_label"))
+            if self.binary_classification
+            else ()
+        )
+
+        base_mapping = {"id": columns["study_id"], "datetime": columns["timestamp"]}
+        self.column_mappings = freeze(
+            {
+                "data": {
+                    **base_mapping,
+                    "target": labels.get("regression_label"),
+                    "prediction": predictions.get("regression_prediction"),
+                },
+                "regression": {
+                    **base_mapping,
+                    "target": labels.get("regression_label"),
+                    "prediction": predictions.get("regression_prediction"),
+                },
+                "classification": {
+                    **base_mapping,
+                    "target": labels.get("classification_label"),
+                    "prediction": predictions.get("classification_prediction"),
+                },
+            }
+        )
+
+    def __reduce__(self):
+        return type(self), (thaw(self), self.path, self.mtime)
+
+    def split_features(self, categorical_columns: list) -> tuple[list, list]:
+        """
+        Split the features into numerical and categorical, given the categorical columns of the data details.
+        Return new lists, the callers may extend them.
+        """
+        categorical_features = list(self.stratified_columns)
+        numerical_features = []
+        for feature in self.features:
+            if feature in categorical_columns:
+                if feature not in categorical_features:
+                    categorical_features.append(feature)
+            else:
+                numerical_features.append(feature)
+        if self["columns"]["age"] not in numerical_features:
+            numerical_features.append(self["columns"]["age"])
+        return numerical_features, categorical_features
+
+
+def as_config(config: dict) -> Config:
+    """
+    Get the Config of a configuration, e.g. a dict built by a test, without copying it if it is one already.
+    """
+    return config if isinstance(config, Config) else Config(config)
+
+
+def find_config_path() -> str:
+    """
+    Find the config file, locally or in the docker environment.
+    """
+    for filepath in CONFIG_PATHS:
+        if os.path.exists(filepath):
+            return os.path.abspath(filepath)
     raise FileNotFoundError("Config file not found.")
+
+
+def get_config() -> Config:
+    """
+    Get the configuration, parsed once per process and reloaded when the file has been modified.
+    """
+    filepath = find_config_path()
+    mtime = os.stat(filepath).st_mtime_ns
+    config = _configs.get(filepath)
+    if config is not None and config.mtime == mtime:
+        return config
+    with _configs_lock:
+        config = _configs.get(filepath)
+        if config is None or config.mtime != mtime:
+            with open(filepath, "r") as file:
+                config = Config(json.load(file), filepath, mtime)
+            if filepath in _configs:
+                logger.info(f"Reloaded the modified config file {filepath}.")
+            _configs[filepath] = config
+    return config
+
+
+def load_config() -> dict:
+    """
+    Load the JSON config file, as a mutable copy of the cached configuration
+    """
+    return thaw(get_config())
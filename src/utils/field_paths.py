@@ -0,0 +1,131 @@
+"""
+File to compile the field paths of the dashboard panels. The paths in panels_map.json (e.g. metrics.RegressionQualityMetric.fields.current.mean_abs_error) are resolved once against the Evidently metrics, without eval, and a bad path fails the whole mapping at load time. check_panels_map() checks the mapping without loading Evidently, for the APIs to fail at startup.
+"""
+
+import json
+import logging
+from functools import lru_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PANELS_MAP_PATH = "src/utils/panels_map.json"
+
+
+class PanelPath:
+    """
+    A panel from the mapping, with its current field path and, for metrics calculated on both datasets, the matching
+    reference field path.
+    """
+
+    def __init__(self, name: str, title: str, metric_id: str, category: str, parts: list):
+        self.name = name
+        self.title = title
+        self.metric_id = metric_id
+        self.category = category
+        # field names within the metric result, e.g. ["current", "mean_abs_error"]
+        self.parts = parts
+        self.current = compile_field_path(metric_id, parts)
+        self.reference_parts = ["reference"] + parts[1:] if parts[0] == "current" else None
+        self.reference = compile_field_path(metric_id, self.reference_parts) if self.reference_parts else None
+
+
+def compile_field_path(metric_id: str, parts: list):
+    """
+    Resolve the field names of a metric result to an Evidently field path, checking that every field exists.
+    """
+    # imported here so the modules reading the mapping don't load Evidently until a path is compiled
+    from evidently import metrics
+
+    metric_class = getattr(metrics, metric_id, None)
+    if not isinstance(metric_class, type):
+        raise ValueError(f"Unknown metric: {metric_id}")
+
+    field_path = metric_class.fields
+    for part in parts:
+        check_field_name(metric_id, part)
+        try:
+            field_path = getattr(field_path, part)
+        except AttributeError as e:
+            raise ValueError(f"Invalid field '{part}' for metric {metric_id}: {e}") from e
+    return field_path
+
+
+def check_field_name(metric_id: str, part: str) -> None:
+    """
+    Check that a field name is a public identifier, so a path can't reach the internals of a metric.
+    """
+    if not part.isidentifier() or part.startswith("_"):
+        raise ValueError(f"Invalid field name '{part}' for metric {metric_id}")
+
+
+def parse_field_path(field_path: str) -> tuple[str, list]:
+    """
+    Split a mapping field path into the metric id and the field names.
+    """
+    names = field_path.split(".")
+    if len(names) < 4 or names[0] != "metrics" or names[2] != "fields":
+        raise ValueError(f"Invalid field path: {field_path}, expected metrics.<Metric>.fields.<field>")
+    for part in [names[1], *names[3:]]:
+        check_field_name(names[1], part)
+    return names[1], names[3:]
+
+
+def parse_panel(panel: dict) -> tuple[str, list]:
+    """
+    Check a panel of the mapping without Evidently: its keys, its field path and its metric id. Return the metric id
+    and the field names.
+    """
+    metric_id, parts = parse_field_path(panel["field_path"])
+    if metric_id != panel["metric_id"]:
+        raise ValueError(f"Field path metric {metric_id} doesn't match the metric id {panel['metric_id']}")
+    if not isinstance(panel["title"], str) or not isinstance(panel["category"], str):
+        raise ValueError("The title and the category must be strings")
+    return metric_id, parts
+
+
+def compile_panels_map(panel_mapping: dict, compile_paths: bool = True) -> dict:
+    """
+    Compile the panels mapping into {panel_name: PanelPath}, reporting every invalid panel at once. Without
+    compile_paths, only check the panels, without loading Evidently, and return {panel_name: (metric_id, parts)}.
+    """
+    panel_paths = {}
+    errors = []
+    for name, panel in panel_mapping.items():
+        try:
+            metric_id, parts = parse_panel(panel)
+            if compile_paths:
+                panel_paths[name] = PanelPath(name, panel["title"], metric_id, panel["category"], parts)
+            else:
+                panel_paths[name] = (metric_id, parts)
+        except (KeyError, TypeError, ValueError) as e:
+            errors.append(f"{name}: {e}")
+
+    if errors:
+        raise ValueError(f"Invalid panels mapping: {'; '.join(errors)}")
+    return panel_paths
+
+
+def check_panels_map(file_path: str = PANELS_MAP_PATH) -> list:
+    """
+    Check the panels mapping without loading Evidently, and return the names of its panels. The metric and field
+    names are resolved against Evidently by load_panel_paths(), when a panel is first built.
+    """
+    with open(file_path, "r") as file:
+        return list(compile_panels_map(json.load(file), compile_paths=False))
+
+
+@lru_cache(maxsize=None)
+def load_panel_paths(file_path: str = PANELS_MAP_PATH) -> dict:
+    """
+    Load and compile the panels mapping, once per process.
+    """
+    with open(file_path, "r") as file:
+        return compile_panels_map(json.load(file))
+
+
+def get_metric_panels(metric_id: str) -> list:
+    """
+    Get the panels showing a field of a metric.
+    """
+    return [panel for panel in load_panel_paths().values() if panel.metric_id == metric_id]
@@ -0,0 +1,204 @@
+"""
+File to store the dashboard panel metrics as time series in SQLite, keyed by (stratum tags, metric, series, timestamp). The flow appends the metrics as it computes them and the dashboard API serves time ranges on /metrics_series. The Evidently panels of the dashboard still read the snapshots, the store is for clients that query the series directly.
+"""
+
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from src.utils.field_paths import get_metric_panels
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+METRIC_STORE_FILE_NAME = "metrics.db"
+
+# period of a point in a roll-up, matching datetime.strftime("%Y-%m-%d") and strftime("%Y-%W")
+ROLLUP_PERIODS = {
+    "daily": "substr(timestamp, 1, 10)",
+    "weekly": "strftime('%Y-%W', timestamp)",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_points (
+    tags TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    series TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    value REAL,
+    -- number of run points a roll-up averages, so rolling it up again weights it by its samples
+    samples INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (tags, metric, series, timestamp)
+) WITHOUT ROWID
+"""
+
+
+def get_metric_store_path() -> str:
+    """
+    Get the path of the metric store, next to the snapshots in the docker environment or locally.
+    """
+    if os.path.exists("/app"):
+        return os.path.join("/app/snapshots", METRIC_STORE_FILE_NAME)
+    return os.path.join("snapshots", METRIC_STORE_FILE_NAME)
+
+
+def tags_key(tags: list) -> str:
+    """
+    Get the canonical key of a list of stratum tags, independent of their order.
+    """
+    return ",".join(sorted(set(tags)))
+
+
+def get_field(result, field_parts: list):
+    """
+    Get the value of a field of a metric result, or None if it doesn't exist.
+    """
+    value = result
+    for part in field_parts:
+        value = getattr(value, part, None)
+        if value is None:
+            return None
+    return value
+
+
+def column_series(metric, config: dict) -> str:
+    """
+    Get the series name of a column drift metric: prediction or ground truth.
+    """
+    predictions = config["columns"]["predictions"].values()
+    if metric.column_name.name in predictions:
+        return "prediction"
+    return "ground_truth"
+
+
+def extract_metric_points(metrics: list, config: dict) -> list:
+    """
+    Extract the panel metrics from calculated Evidently metrics, as a list of (metric, series, value).
+    """
+    points = []
+    for metric in metrics:
+        panels = get_metric_panels(type(metric).__name__)
+        if not panels:
+            continue
+        result = metric.get_result()
+        for panel in panels:
+            if panel.metric_id == "ColumnDriftMetric":
+                series_paths = [(column_series(metric, config), panel.parts)]
+            elif panel.reference_parts:
+                series_paths = [("current", panel.parts), ("reference", panel.reference_parts)]
+            else:
+                series_paths = [("current", panel.parts)]
+
+            for series, parts in series_paths:
+                value = get_field(result, parts)
+                try:
+                    points.append((panel.name, series, float(value)))
+                except (TypeError, ValueError):
+                    continue
+    return points
+
+
+class MetricStore:
+    """
+    SQLite store of the panel metrics. Each call opens its own connection, so the store can be shared between the
+    flow tasks and the API threads. A read-only store (e.g. for the dashboard API) doesn't create or change the
+    database, the flow does.
+    """
+
+    def __init__(self, db_path: str = None, read_only: bool = False):
+        self.db_path = db_path or get_metric_store_path()
+        self.read_only = read_only
+        if read_only:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(SCHEMA)
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(metric_points)")]
+            if "samples" not in columns:
+                # stores created before the roll-ups were weighted
+                connection.execute("ALTER TABLE metric_points ADD COLUMN samples INTEGER NOT NULL DEFAULT 1")
+
+    @contextmanager
+    def connect(self):
+        """
+        Open a connection to the store, committing on success and closing it when done.
+        """
+        if self.read_only:
+            connection = sqlite3.connect(f"{Path(self.db_path).absolute().as_uri()}?mode=ro", uri=True, timeout=30)
+        else:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def append(self, tags: list, timestamp: str, points: list) -> None:
+        """
+        Append the (metric, series, value) points of a stratum at a timestamp. Points already stored are replaced.
+        """
+        key = tags_key(tags)
+        rows = [(key, metric, series, timestamp, value) for metric, series, value in points]
+        with self.connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO metric_points (tags, metric, series, timestamp, value) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def query(self, tags: list, metric: str, start: str = None, end: str = None) -> dict:
+        """
+        Get the points of a metric for a stratum in a time range, as {series: [(timestamp, value)]}.
+        """
+        sql = "SELECT series, timestamp, value FROM metric_points WHERE tags = ? AND metric = ?"
+        params = [tags_key(tags), metric]
+        if start:
+            sql += " AND timestamp >= ?"
+            params.append(start)
+        if end:
+            sql += " AND timestamp <= ?"
+            params.append(end)
+        sql += " ORDER BY series, timestamp"
+
+        series = {}
+        if self.read_only and not os.path.exists(self.db_path):
+            # the flow hasn't stored any metric yet
+            return series
+        with self.connect() as connection:
+            for name, timestamp, value in connection.execute(sql, params):
+                series.setdefault(name, []).append((timestamp, value))
+        return series
+
+    def rollup(self, before: str, period: str = "daily") -> int:
+        """
+        Replace the points older than a timestamp by their average over each period, stored at the last timestamp of
+        the period. A point that is already a roll-up counts for all the points it averages. Return the number of
+        points removed.
+        """
+        period_expr = ROLLUP_PERIODS[period]
+        with self.connect() as connection:
+            connection.execute(
+                f"""
+                CREATE TEMP TABLE rollup AS
+                SELECT tags, metric, series, {period_expr} AS period, MAX(timestamp) AS timestamp,
+                SUM(value * samples) / SUM(CASE WHEN value IS NULL THEN 0 ELSE samples END) AS value,
+                SUM(samples) AS samples
+                FROM metric_points WHERE timestamp < ?
+                GROUP BY tags, metric, series, period HAVING COUNT(*) > 1
+                """,
+                (before,),
+            )
+            removed = connection.execute(
+                f"""
+                DELETE FROM metric_points WHERE timestamp < ?
+                AND (tags, metric, series, {period_expr}) IN (SELECT tags, metric, series, period FROM rollup)
+                """,
+                (before,),
+            ).rowcount
+            added = connection.execute(
+                "INSERT INTO metric_points (tags, metric, series, timestamp, value, samples) "
+                "SELECT tags, metric, series, timestamp, value, samples FROM rollup"
+            ).rowcount
+            connection.execute("DROP TABLE rollup")
+        return removed - added
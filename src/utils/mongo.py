@@ -0,0 +1,168 @@
+"""
+File to manage the MongoDB connection. Each process shares one pooled client, configured from the environment, and a registry of the existing collections so they aren't listed on every request or ETL run. The registry expires after MONGO_COLLECTIONS_TTL seconds and is then refreshed in the background.
+"""
+
+import logging
+import os
+import threading
+import time
+from pymongo import MongoClient
+from pymongo.errors import CollectionInvalid
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DB_NAME = "data_ingestion"
+DEFAULT_COLLECTIONS_TTL = 60
+
+# client option -> (environment variable, default)
+CLIENT_OPTIONS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", 50),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": ("MONGO_MAX_IDLE_TIME_MS", 300000),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", 10000),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", None),
+}
+
+
+def get_client_options() -> dict:
+    """
+    Get the client options from the environment: pool size, timeouts, and the wire compressors in MONGO_COMPRESSORS
+    (e.g. zstd,snappy,zlib, zstd and snappy need their Python packages).
+    """
+    options = {}
+    for option, (variable, default) in CLIENT_OPTIONS.items():
+        value = os.getenv(variable) or default
+        if value is not None:
+            options[option] = int(value)
+
+    compressors = os.getenv("MONGO_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+class MongoManager:
+    """
+    Shared MongoDB client and collection registry of the process.
+
+    The registry lists the collections once, then answers from memory and records the ones created or written to by
+    this process. Once older than the TTL, it is still used while a background thread lists the collections again,
+    so a collection created by another process is known within one TTL.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @staticmethod
+    def get_instance():
+        """
+        Get the singleton instance of the MongoManager, connecting to MONGO_URI on first use.
+        """
+        with MongoManager._instance_lock:
+            if MongoManager._instance is None:
+                mongo_uri = os.getenv("MONGO_URI")
+                if not mongo_uri:
+                    raise ValueError("MONGO_URI environment variable is not set")
+                ttl = float(os.getenv("MONGO_COLLECTIONS_TTL") or DEFAULT_COLLECTIONS_TTL)
+                MongoManager._instance = MongoManager(MongoClient(mongo_uri, **get_client_options()), ttl=ttl)
+            return MongoManager._instance
+
+    def __init__(self, client, db_name: str = DB_NAME, ttl: float = DEFAULT_COLLECTIONS_TTL):
+        self.client = client
+        self.db = client[db_name]
+        self.ttl = ttl
+        self.collections = None
+        # collections marked since the last refresh, in case the listing started before them
+        self.marked = set()
+        self.refreshed_at = 0.0
+        self.refreshing = False
+        self.lock = threading.Lock()
+
+    def get_collection(self, name: str):
+        """
+        Get a collection of the database.
+        """
+        return self.db[name]
+
+    def collection_exists(self, name: str) -> bool:
+        """
+        Check if a collection exists, from the registry. The first check lists the collections.
+        """
+        with self.lock:
+            collections = self.collections
+            stale = time.monotonic() - self.refreshed_at > self.ttl
+            start_refresh = collections is not None and stale and not self.refreshing
+            if start_refresh:
+                self.refreshing = True
+        if collections is None:
+            collections = self.refresh_collections()
+        elif start_refresh:
+            threading.Thread(target=self.refresh_collections, name="mongo-collections", daemon=True).start()
+        return name in collections
+
+    def ensure_collection(self, name: str) -> None:
+        """
+        Create a collection if it doesn't exist.
+        """
+        if self.collection_exists(name):
+            return
+        try:
+            self.db.create_collection(name)
+        except CollectionInvalid:
+            # created by another process since the last refresh
+            pass
+        self.mark_collection(name)
+
+    def mark_collection(self, name: str) -> None:
+        """
+        Record that a collection exists, e.g. after inserting into it.
+        """
+        with self.lock:
+            self.marked.add(name)
+            if self.collections is not None:
+                self.collections.add(name)
+
+    def refresh_collections(self) -> set:
+        """
+        List the collections of the database and replace the registry. On error, the registry is kept.
+        """
+        try:
+            collections = set(self.db.list_collection_names())
+        except Exception as e:
+            with self.lock:
+                self.refreshing = False
+                if self.collections is None:
+                    raise
+                # retry after another TTL
+                self.refreshed_at = time.monotonic()
+                logger.warning(f"Error listing the collections, using the cached ones: {e}")
+                return self.collections
+
+        with self.lock:
+            self.collections = collections | self.marked
+            self.marked = set()
+            self.refreshed_at = time.monotonic()
+            self.refreshing = False
+            return self.collections
+
+    def ping(self) -> bool:
+        """
+        Check that the deployment is reachable.
+        """
+        try:
+            self.client.admin.command("ping")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to MongoDB: {e}")
+            return False
+
+    def close(self) -> None:
+        """
+        Close the client and its connection pool.
+        """
+        self.client.close()
+        with MongoManager._instance_lock:
+            if MongoManager._instance is self:
+                MongoManager._instance = None
@@ -0,0 +1,187 @@
+"""
+File to profile the stages of a monitoring run: wall time, CPU time, peak RSS and input/output row counts. The profile of a run is saved as profile.json in its snapshots directory, so runs of different releases can be compared.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import psutil
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROFILE_FILE_NAME = "profile.json"
+RSS_SAMPLE_INTERVAL = 0.05
+
+_current_profile = None
+
+
+def get_profile_path(timestamp: str) -> str:
+    """
+    Get the path of the profile of a run, next to its snapshots in the docker environment or locally.
+    """
+    if os.path.exists("/app"):
+        return os.path.join("/app/snapshots", timestamp, PROFILE_FILE_NAME)
+    return os.path.join("snapshots", timestamp, PROFILE_FILE_NAME)
+
+
+def to_mb(num_bytes: int) -> float:
+    """
+    Convert a number of bytes to megabytes.
+    """
+    return round(num_bytes / (1024 * 1024), 1)
+
+
+class RunProfile:
+    """
+    Profile of a monitoring run, shared by the tasks of the run.
+
+    The CPU time of a stage is the CPU time of its thread, so concurrent tasks don't count each other. The RSS is
+    the one of the process, sampled in a background thread while stages are running: the peak of a stage includes
+    the stages running at the same time.
+    """
+
+    def __init__(self, timestamp: str, sample_interval: float = RSS_SAMPLE_INTERVAL):
+        self.timestamp = timestamp
+        self.sample_interval = sample_interval
+        self.process = psutil.Process()
+        self.started = time.perf_counter()
+        self.records = []
+        self.active = []
+        self.num_started = 0
+        self.lock = threading.Lock()
+        self.sampler = None
+
+    def sample_rss(self) -> None:
+        """
+        Update the peak RSS of the running stages until none is left.
+        """
+        while True:
+            rss = self.process.memory_info().rss
+            with self.lock:
+                if not self.active:
+                    self.sampler = None
+                    return
+                for record in self.active:
+                    record["peak_rss_mb"] = max(record["peak_rss_mb"], to_mb(rss))
+            time.sleep(self.sample_interval)
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = None):
+        """
+        Profile a stage. Yield its record, to set rows_out on it.
+        """
+        record = {
+            "stage": name,
+            "started_at": datetime.now().isoformat(timespec="milliseconds"),
+            "thread": threading.current_thread().name,
+            "rows_in": rows_in,
+            "rows_out": None,
+            "peak_rss_mb": to_mb(self.process.memory_info().rss),
+        }
+        with self.lock:
+            # order in which the stages started
+            record["index"] = self.num_started
+            self.num_started += 1
+            self.active.append(record)
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self.sample_rss, name="profile-rss", daemon=True)
+                self.sampler.start()
+
+        wall_start = time.perf_counter()
+        record["offset_seconds"] = round(wall_start - self.started, 4)
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        except BaseException:
+            record["error"] = True
+            raise
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - wall_start, 4)
+            record["cpu_seconds"] = round(time.thread_time() - cpu_start, 4)
+            rss = to_mb(self.process.memory_info().rss)
+            with self.lock:
+                record["peak_rss_mb"] = max(record["peak_rss_mb"], rss)
+                self.active.remove(record)
+                self.records.append(record)
+
+    def summary(self) -> dict:
+        """
+        Aggregate the records by stage type, the part of the stage name before the colon (e.g. report for
+        report:main).
+        """
+        summary = {}
+        with self.lock:
+            records = list(self.records)
+        for record in records:
+            stage_type = record["stage"].split(":")[0]
+            totals = summary.setdefault(
+                stage_type, {"count": 0, "rows_in": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_mb": 0.0}
+            )
+            totals["count"] += 1
+            totals["rows_in"] += record["rows_in"] or 0
+            totals["wall_seconds"] = round(totals["wall_seconds"] + record["wall_seconds"], 4)
+            totals["cpu_seconds"] = round(totals["cpu_seconds"] + record["cpu_seconds"], 4)
+            totals["peak_rss_mb"] = max(totals["peak_rss_mb"], record["peak_rss_mb"])
+        return summary
+
+    def to_dict(self) -> dict:
+        """
+        Get the profile as a dictionary.
+        """
+        with self.lock:
+            stages = sorted(self.records, key=lambda record: record["index"])
+        return {
+            "timestamp": self.timestamp,
+            "pid": self.process.pid,
+            "cpu_count": os.cpu_count(),
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            "peak_rss_mb": max([stage["peak_rss_mb"] for stage in stages], default=None),
+            "summary": self.summary(),
+            "stages": stages,
+        }
+
+    def save(self, file_path: str = None) -> str:
+        """
+        Save the profile as JSON, by default in the snapshots directory of the run. Return the path.
+        """
+        file_path = file_path or get_profile_path(self.timestamp)
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        with open(file_path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+        logger.info(f"Run profile saved to {file_path}")
+        return file_path
+
+
+def start_profile(timestamp: str) -> RunProfile:
+    """
+    Start the profile of a run. The stages profiled in the process are recorded in it until the next run.
+    """
+    global _current_profile
+    _current_profile = RunProfile(timestamp)
+    return _current_profile
+
+
+def get_profile():
+    """
+    Get the profile of the current run, or None outside a run.
+    """
+    return _current_profile
+
+
+@contextmanager
+def stage(name: str, rows_in: int = None):
+    """
+    Profile a stage in the current run. Outside a run, the stage is not recorded. Yield the record of the stage, to
+    set rows_out on it.
+    """
+    profile = _current_profile
+    if profile is None:
+        yield {}
+        return
+    with profile.stage(name, rows_in) as record:
+        yield record
@@ -0,0 +1,338 @@
+"""
+File to expose operational metrics in the Prometheus text format: counters, gauges and histograms kept in memory. With several worker processes, each worker dumps its metrics to a shared directory in the background, and a scrape merges the dumps of the live workers, so any worker can answer it. The counters and histograms of exited workers are folded into an aggregate file, so the merged totals never go down.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+import psutil
+from scripts.data_details import file_lock
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_DUMP_INTERVAL = 5
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+AGGREGATE_FILE = "aggregate.json"
+
+
+def format_value(value: float) -> str:
+    """
+    Format a sample value, integers without a decimal point.
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names, values) -> str:
+    """
+    Format the labels of a sample, e.g. {endpoint="ingest_results"}.
+    """
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """
+    A metric family with its values by label values.
+    """
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels: dict) -> tuple:
+        """
+        Get the label values of a sample, in the order of the label names.
+        """
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects the labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def snapshot(self) -> dict:
+        """
+        Get the metric as a JSON-serializable dictionary.
+        """
+        with self.lock:
+            values = [[list(key), value] for key, value in self.values.items()]
+        return {"type": self.type, "help": self.documentation, "labels": list(self.label_names), "values": values}
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increment the counter.
+        """
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        """
+        Set the gauge.
+        """
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record an observation. The values are the counts per bucket, then the sum and the count.
+        """
+        key = self.key(labels)
+        with self.lock:
+            counts = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of a block, in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+
+def merge_snapshots(snapshots: list) -> dict:
+    """
+    Merge the metrics of several workers, oldest first: counters and histograms are summed, gauges take the latest
+    value.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot["metrics"].items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for key, value in metric["values"]:
+                key = tuple(key)
+                if metric["type"] == "gauge" or key not in target["values"]:
+                    target["values"][key] = list(value) if isinstance(value, list) else value
+                elif metric["type"] == "histogram":
+                    target["values"][key] = [a + b for a, b in zip(target["values"][key], value)]
+                else:
+                    target["values"][key] += value
+    return merged
+
+
+def cumulative_snapshot(snapshots: list, folded: list) -> dict:
+    """
+    Merge the counters and histograms of exited workers into an aggregate snapshot. Their gauges are dropped, a gauge
+    only makes sense for a live worker.
+    """
+    metrics = {}
+    for name, metric in merge_snapshots(snapshots).items():
+        if metric["type"] != "gauge":
+            metrics[name] = {**metric, "values": [[list(key), value] for key, value in metric["values"].items()]}
+    # the oldest snapshot, so the gauges of the live workers take precedence
+    return {"pid": None, "time": 0, "metrics": metrics, "folded": folded}
+
+
+def render(metrics: dict) -> str:
+    """
+    Render merged metrics in the Prometheus text format.
+    """
+    lines = []
+    for name, metric in metrics.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for key, value in sorted(metric["values"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{format_labels(metric['labels'], key)} {format_value(value)}")
+                continue
+            names = metric["labels"] + ["le"]
+            for bound, count in zip(metric["buckets"] + [float("inf")], value[:-2] + [value[-1]]):
+                lines.append(f"{name}_bucket{format_labels(names, list(key) + [format_value(bound)])} {count}")
+            lines.append(f"{name}_sum{format_labels(metric['labels'], key)} {format_value(value[-2])}")
+            lines.append(f"{name}_count{format_labels(metric['labels'], key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """
+    Metrics of a process. Without a dump directory, a scrape only sees the metrics of the process answering it.
+    """
+
+    def __init__(self, dump_dir: str = None, dump_interval: float = DEFAULT_DUMP_INTERVAL):
+        self.metrics = {}
+        self.dump_dir = dump_dir
+        self.dump_interval = dump_interval
+        self.dumper = None
+        self.started = time.time()
+        self.lock = threading.Lock()
+        if dump_dir:
+            os.makedirs(dump_dir, exist_ok=True)
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Register a metric, or return the one already registered under its name.
+        """
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def snapshot(self) -> dict:
+        """
+        Get the metrics of the process.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {
+            "pid": os.getpid(),
+            "started": self.started,
+            "time": time.time(),
+            "metrics": {m.name: m.snapshot() for m in metrics},
+        }
+
+    def dump(self) -> None:
+        """
+        Write the metrics of the process to the dump directory, through a renamed temporary file.
+        """
+        file_path = os.path.join(self.dump_dir, f"worker-{os.getpid()}.json")
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temp_path, file_path)
+
+    def dump_periodically(self) -> None:
+        """
+        Dump the metrics until the process exits.
+        """
+        while True:
+            time.sleep(self.dump_interval)
+            try:
+                self.dump()
+            except OSError as e:
+                logger.error(f"Error dumping the metrics: {e}")
+
+    def start(self) -> None:
+        """
+        Start dumping the metrics in the background, once per process.
+        """
+        with self.lock:
+            if self.dump_dir and (self.dumper is None or self.dumper[0] != os.getpid()):
+                thread = threading.Thread(target=self.dump_periodically, name="metrics-dump", daemon=True)
+                thread.start()
+                self.dumper = (os.getpid(), thread)
+
+    def read_aggregate(self) -> dict:
+        """
+        Read the aggregate of the exited workers, or None if no worker has exited.
+        """
+        try:
+            with open(os.path.join(self.dump_dir, AGGREGATE_FILE)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def fold(self, file_path: str) -> None:
+        """
+        Fold the dump of an exited worker into the aggregate, then remove it. The workers scraping at the same time
+        take turns, and a dump already folded (e.g. before a crash) isn't counted twice.
+        """
+        aggregate_path = os.path.join(self.dump_dir, AGGREGATE_FILE)
+        with file_lock(aggregate_path):
+            try:
+                with open(file_path) as file:
+                    dump = json.load(file)
+            except FileNotFoundError:
+                # folded by another worker
+                return
+            except ValueError:
+                os.remove(file_path)
+                return
+            aggregate = self.read_aggregate()
+            folded = aggregate["folded"] if aggregate else []
+            worker_id = f"{dump['pid']}-{dump.get('started')}"
+            if worker_id not in folded:
+                snapshots = ([aggregate] if aggregate else []) + [dump]
+                temp_path = f"{aggregate_path}.tmp"
+                with open(temp_path, "w") as file:
+                    json.dump(cumulative_snapshot(snapshots, folded + [worker_id]), file)
+                os.replace(temp_path, aggregate_path)
+            os.remove(file_path)
+
+    def worker_snapshots(self) -> list:
+        """
+        Read the dumps of the other live workers and the aggregate of the exited ones, folding the dumps of the
+        workers that have exited since the last scrape.
+        """
+        snapshots = []
+        if not self.dump_dir:
+            return snapshots
+        for entry in os.listdir(self.dump_dir):
+            if not (entry.startswith("worker-") and entry.endswith(".json")):
+                continue
+            pid = int(entry[len("worker-") : -len(".json")])
+            file_path = os.path.join(self.dump_dir, entry)
+            if pid == os.getpid():
+                continue
+            if not psutil.pid_exists(pid):
+                self.fold(file_path)
+                continue
+            try:
+                with open(file_path) as file:
+                    snapshots.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        aggregate = self.read_aggregate()
+        if aggregate:
+            snapshots.append(aggregate)
+        return snapshots
+
+    def render(self) -> str:
+        """
+        Render the metrics of all the workers in the Prometheus text format.
+        """
+        self.start()
+        snapshots = sorted(self.worker_snapshots() + [self.snapshot()], key=lambda snapshot: snapshot["time"])
+        return render(merge_snapshots(snapshots))
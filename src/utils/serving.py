@@ -0,0 +1,52 @@
+"""
+File to serve the Flask APIs in production with uvicorn: several worker processes, keep-alive connections and a graceful shutdown. The apps run on uvicorn's WSGI thread pool, so a blocking MongoDB or file call only holds up its own request.
+
+Usage: python -m src.utils.serving api.ingestion.app:app --port 5001 --env-prefix INGESTION_API
+"""
+
+import argparse
+import logging
+import os
+import uvicorn
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEEP_ALIVE = 5
+DEFAULT_GRACEFUL_SHUTDOWN = 30
+MAX_DEFAULT_WORKERS = 4
+
+
+def get_server_options(env_prefix: str, default_workers: int = None) -> dict:
+    """
+    Get the uvicorn options from the environment, e.g. for the INGESTION_API prefix: INGESTION_API_WORKERS,
+    INGESTION_API_KEEP_ALIVE and INGESTION_API_GRACEFUL_SHUTDOWN (in seconds).
+    """
+    if default_workers is None:
+        default_workers = min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1)
+    return {
+        "workers": max(1, int(os.environ.get(f"{env_prefix}_WORKERS") or default_workers)),
+        "timeout_keep_alive": int(os.environ.get(f"{env_prefix}_KEEP_ALIVE") or DEFAULT_KEEP_ALIVE),
+        "timeout_graceful_shutdown": int(
+            os.environ.get(f"{env_prefix}_GRACEFUL_SHUTDOWN") or DEFAULT_GRACEFUL_SHUTDOWN
+        ),
+    }
+
+
+def serve(app_path: str, port: int, env_prefix: str, default_workers: int = None) -> None:
+    """
+    Serve a Flask app, given as an import string so each worker process imports it.
+    """
+    options = get_server_options(env_prefix, default_workers)
+    logger.info(f"Serving {app_path} on port {port} with uvicorn: {options}")
+    uvicorn.run(app_path, host="0.0.0.0", port=port, interface="wsgi", proxy_headers=True, **options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a Flask API with uvicorn.")
+    parser.add_argument("app", help="Import string of the Flask app, e.g. api.ingestion.app:app")
+    parser.add_argument("--env-prefix", required=True, help="Prefix of the environment variables, e.g. INGESTION_API")
+    parser.add_argument("--port", type=int, required=True, help="Port to listen on")
+    parser.add_argument("--default-workers", type=int, default=None, help="Number of workers if not set in the env")
+    args = parser.parse_args()
+    serve(args.app, args.port, args.env_prefix, args.default_workers)
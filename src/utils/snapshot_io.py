@@ -0,0 +1,159 @@
+"""
+File to write and read the Evidently snapshots. Snapshots are written as compact, optionally gzip-compressed JSON, with the large plot arrays optionally down-sampled, and read back in parallel.
+"""
+
+import gzip
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import orjson
+import numpy as np
+import pandas as pd
+from evidently.utils import NumpyEncoder
+from evidently.suite.base_suite import Snapshot
+from src.utils.profiling import stage
+
+SNAPSHOT_EXTENSIONS = (".json", ".json.gz")
+DEFAULT_COMPRESSION = "gzip"
+DEFAULT_MAX_PLOT_POINTS = 0
+COMPRESSION_LEVEL = 6
+MAX_LOAD_WORKERS = 8
+LOAD_BATCH_SIZE = 200
+
+
+def get_snapshot_options(config: dict) -> tuple[str, int]:
+    """
+    Get the compression and the maximum number of plot points from the configuration.
+    """
+    options = config.get("snapshots", {})
+    compression = options.get("compression", DEFAULT_COMPRESSION)
+    max_plot_points = options.get("max_plot_points", DEFAULT_MAX_PLOT_POINTS)
+    if compression not in ("gzip", None):
+        raise ValueError(f"Invalid snapshot compression: {compression}")
+    return compression, int(max_plot_points or 0)
+
+
+def is_snapshot_file(file_name: str) -> bool:
+    """
+    Check if the file is a snapshot written by save_snapshot.
+    """
+    return not file_name.startswith(".") and file_name.endswith(SNAPSHOT_EXTENSIONS)
+
+
+def is_numeric_sequence(value) -> bool:
+    """
+    Check if the value is a sequence of numbers, i.e. plot data.
+    """
+    if isinstance(value, (pd.Series, np.ndarray)):
+        return value.ndim == 1 and np.issubdtype(value.dtype, np.number)
+    if isinstance(value, (list, tuple)):
+        return all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value)
+    return False
+
+
+def downsample(value, max_points: int):
+    """
+    Recursively down-sample the numeric sequences longer than max_points. The same stride is used for sequences of
+    the same length, so paired arrays (e.g. predicted and actual values) stay aligned.
+    """
+    if isinstance(value, dict):
+        return {key: downsample(item, max_points) for key, item in value.items()}
+    if isinstance(value, (list, tuple, pd.Series, np.ndarray)) and len(value) > max_points:
+        if is_numeric_sequence(value):
+            step = math.ceil(len(value) / max_points)
+            if isinstance(value, pd.Series):
+                return value.iloc[::step]
+            return value[::step]
+    if isinstance(value, (list, tuple)):
+        return type(value)(downsample(item, max_points) for item in value)
+    return value
+
+
+def save_snapshot(suite, file_path: str, config: dict) -> str:
+    """
+    Save a report or test suite snapshot. Return the path of the written file, which has a .gz suffix if compressed.
+    """
+    with stage("snapshot_write"):
+        # same snapshot as Report.save / TestSuite.save
+        return write_snapshot_data(suite._get_snapshot().dict(), file_path, config)
+
+
+def write_snapshot_data(data: dict, file_path: str, config: dict) -> str:
+    """
+    Write the data of a snapshot. Return the path of the written file, which has a .gz suffix if compressed.
+    """
+    compression, max_plot_points = get_snapshot_options(config)
+    if max_plot_points:
+        data["suite"]["metric_results"] = downsample(data["suite"]["metric_results"], max_plot_points)
+
+    payload = json.dumps(data, cls=NumpyEncoder, separators=(",", ":")).encode("utf-8")
+    if compression == "gzip":
+        file_path = f"{file_path}.gz"
+        payload = gzip.compress(payload, compresslevel=COMPRESSION_LEVEL)
+
+    # write to a temporary file and rename, so the snapshot is never read half-written
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(payload)
+    os.replace(temp_path, file_path)
+    return file_path
+
+
+def load_snapshot_data(file_path: str) -> dict:
+    """
+    Load the snapshot data from a compressed or uncompressed JSON file, ready for Snapshot(**data).
+    """
+    with open(file_path, "rb") as file:
+        payload = file.read()
+    if file_path.endswith(".gz"):
+        payload = gzip.decompress(payload)
+    try:
+        return orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        # orjson rejects the NaN and Infinity values Evidently writes for undefined metrics
+        return json.loads(payload)
+
+
+def read_snapshot(file_path: str) -> tuple:
+    """
+    Load and validate a snapshot. Return (file_path, snapshot, error), with the error message if it failed.
+    """
+    try:
+        return file_path, Snapshot(**load_snapshot_data(file_path)), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+def load_snapshots(file_paths: list, max_workers: int = None, batch_size: int = LOAD_BATCH_SIZE):
+    """
+    Load and validate the snapshots in parallel worker processes, yielding them in batches of
+    (file_path, snapshot, error) in the order of the file paths.
+    """
+    if max_workers is None:
+        max_workers = min(MAX_LOAD_WORKERS, os.cpu_count() or 1)
+
+    # not worth starting worker processes for a handful of files
+    if max_workers <= 1 or len(file_paths) < 2 * max_workers:
+        results = map(read_snapshot, file_paths)
+        yield from batched(results, batch_size)
+        return
+
+    chunksize = max(1, min(32, len(file_paths) // (4 * max_workers)))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(read_snapshot, file_paths, chunksize=chunksize)
+        yield from batched(results, batch_size)
+
+
+def batched(iterable, batch_size: int):
+    """
+    Group the items of an iterable into lists of batch_size items.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,241 @@
+"""
+File to trace the ingestion API and the monitoring flow with OpenTelemetry. The exporter is set by OTEL_TRACES_EXPORTER: none (default), console, otlp (to OTEL_EXPORTER_OTLP_ENDPOINT, over OTEL_EXPORTER_OTLP_PROTOCOL http/protobuf or grpc), or file, which appends the spans as JSON lines to OTEL_TRACES_FILE and needs no collector.
+
+Each ingested record keeps the traceparent of its upload. The flow links its merge span and the dashboard update span of the run to these uploads, so an ingested batch can be followed to the dashboard update that first shows it.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from opentelemetry import context as otel_context, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRACER_NAME = "bone-age-monitoring"
+TRACE_CONTEXT_FIELD = "trace_context"
+DEFAULT_TRACES_FILE = "traces.jsonl"
+
+_provider = None
+_setup_lock = threading.Lock()
+_run_context = None
+_ingestion_links = []
+_propagator = TraceContextTextMapPropagator()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Append the finished spans to a file, one JSON object per line.
+    """
+
+    def __init__(self, file_path: str = DEFAULT_TRACES_FILE):
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(file_path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans) -> SpanExportResult:
+        """
+        Write a batch of spans.
+        """
+        lines = "".join(json.dumps(json.loads(span.to_json())) + "\n" for span in spans)
+        try:
+            with self.lock, open(self.file_path, "a") as file:
+                file.write(lines)
+        except OSError as e:
+            logger.error(f"Error writing spans to {self.file_path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def get_exporter(exporter_name: str):
+    """
+    Get the span exporter for the name set in OTEL_TRACES_EXPORTER, or None to disable tracing.
+    """
+    if exporter_name in ("", "none"):
+        return None
+    if exporter_name == "console":
+        return ConsoleSpanExporter()
+    if exporter_name == "file":
+        return FileSpanExporter(os.getenv("OTEL_TRACES_FILE") or DEFAULT_TRACES_FILE)
+    if exporter_name == "otlp":
+        if os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "http/protobuf") == "grpc":
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        else:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        # the endpoint and headers are read from the OTEL_EXPORTER_OTLP_* variables
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown traces exporter: {exporter_name}")
+
+
+def setup_tracing(service_name: str, exporter=None) -> bool:
+    """
+    Set up the tracer provider of the process, once. Return whether tracing is enabled.
+    """
+    global _provider
+    with _setup_lock:
+        if _provider is not None:
+            return True
+        try:
+            if exporter is None:
+                exporter = get_exporter(os.getenv("OTEL_TRACES_EXPORTER", "none").lower())
+        except Exception as e:
+            logger.error(f"Error setting up the traces exporter, tracing is disabled: {e}")
+            return False
+        if exporter is None:
+            return False
+
+        service_name = os.getenv("OTEL_SERVICE_NAME") or service_name
+        _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        _provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(_provider)
+        logger.info(f"Tracing enabled for {service_name} with {type(exporter).__name__}")
+        return True
+
+
+def flush_tracing() -> None:
+    """
+    Export the finished spans now, e.g. at the end of a run.
+    """
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def get_tracer():
+    """
+    Get the tracer, a no-op one if tracing isn't set up.
+    """
+    return trace.get_tracer(TRACER_NAME)
+
+
+@contextmanager
+def span(name: str, attributes: dict = None, links: list = None):
+    """
+    Start a span, as a child of the current span or of the current run. Yield the span.
+    """
+    parent = None
+    if not trace.get_current_span().get_span_context().is_valid:
+        # e.g. in a task thread, which doesn't inherit the context of the flow
+        parent = _run_context
+    with get_tracer().start_as_current_span(name, context=parent, attributes=attributes, links=links) as current:
+        yield current
+
+
+@contextmanager
+def run_span(name: str, attributes: dict = None):
+    """
+    Start the root span of a monitoring run. The spans started in other threads during the run are its children.
+    The spans are exported when the run ends.
+    """
+    global _run_context
+    _ingestion_links.clear()
+    try:
+        with get_tracer().start_as_current_span(name, attributes=attributes) as current:
+            _run_context = otel_context.get_current()
+            yield current
+    finally:
+        _run_context = None
+        flush_tracing()
+
+
+def get_traceparent() -> str:
+    """
+    Get the traceparent of the current span, or None if it isn't traced.
+    """
+    carrier = {}
+    _propagator.inject(carrier)
+    return carrier.get("traceparent")
+
+
+def get_links(traceparents) -> list:
+    """
+    Get the span links to the spans of the given traceparents, skipping the invalid ones.
+    """
+    links = []
+    for traceparent in set(traceparents):
+        if not isinstance(traceparent, str):
+            continue
+        span_context = trace.get_current_span(_propagator.extract({"traceparent": traceparent})).get_span_context()
+        if span_context.is_valid:
+            links.append(trace.Link(span_context))
+    return links
+
+
+def add_ingestion_links(traceparents) -> list:
+    """
+    Record the uploads of the data fetched in the current run. Return their links.
+    """
+    links = get_links(traceparents)
+    _ingestion_links.extend(links)
+    return links
+
+
+def get_ingestion_links() -> list:
+    """
+    Get the links to the uploads of the data fetched in the current run.
+    """
+    return list(_ingestion_links)
+
+
+def traced(name: str):
+    """
+    Decorator to run a function in a span.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_flask(app) -> None:
+    """
+    Run each request of a Flask app in a span.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def start_request_span():
+        rule = request.url_rule.rule if request.url_rule else request.path
+        request_span = get_tracer().start_span(
+            f"{request.method} {rule}", attributes={"http.method": request.method, "http.route": rule}
+        )
+        g.request_span = request_span
+        g.trace_token = otel_context.attach(trace.set_span_in_context(request_span))
+
+    @app.after_request
+    def record_status(response):
+        if "request_span" in g:
+            g.request_span.set_attribute("http.status_code", response.status_code)
+        return response
+
+    @app.teardown_request
+    def end_request_span(error=None):
+        request_span = g.pop("request_span", None)
+        if request_span is None:
+            return
+        if error is not None:
+            request_span.record_exception(error)
+            request_span.set_status(trace.Status(trace.StatusCode.ERROR))
+        otel_context.detach(g.pop("trace_token"))
+        request_span.end()
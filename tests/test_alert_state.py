@@ -0,0 +1,81 @@
+"""
+Script to test the alert state kept across runs.
+"""
+
+import os
+import pytest
+from src.monitoring.alert_state import AlertStateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Fixture to create an alert state store
+    """
+    return AlertStateStore(os.path.join(tmp_path, "alerts.db"))
+
+
+def failure(stratum: str, test_id: str = "TestNumberOfRows:abc") -> dict:
+    """
+    Create a failed test of a stratum
+    """
+    test = {"name": "Number of Rows", "description": "The number of rows is 3.", "status": "FAIL", "test_id": test_id}
+    return {"category": "Data Tests", "stratum": stratum, "test": test}
+
+
+EVALUATED = {("Data Tests", "main"), ("Data Tests", "hospital1")}
+
+
+def update(store, failures: list, evaluated: set, timestamp: str, **kwargs) -> tuple[list, list]:
+    """
+    Find what a run notifies and record it as sent
+    """
+    notify, resolved = store.pending(failures, evaluated, timestamp, **kwargs)
+    store.record(failures, notify, resolved, timestamp)
+    return notify, resolved
+
+
+def test_persistent_failure_suppressed(store):
+    notify, _ = update(store, [failure("main")], EVALUATED, "2024-01-01T00:00:00", suppression_hours=24)
+    assert len(notify) == 1 and notify[0]["first_seen"] == "2024-01-01T00:00:00"
+
+    notify, _ = update(store, [failure("main")], EVALUATED, "2024-01-01T01:00:00", suppression_hours=24)
+    assert notify == []
+
+    # reminder once the suppression window is over
+    notify, _ = update(store, [failure("main")], EVALUATED, "2024-01-02T00:00:00", suppression_hours=24)
+    assert len(notify) == 1 and notify[0]["first_seen"] == "2024-01-01T00:00:00"
+
+
+def test_resolution_of_evaluated_strata(store):
+    update(store, [failure("main"), failure("hospital1")], EVALUATED, "2024-01-01T00:00:00")
+
+    # hospital1 wasn't tested in this run, so it can't be resolved
+    notify, resolved = update(store, [], {("Data Tests", "main")}, "2024-01-01T01:00:00")
+    assert notify == []
+    assert [alert["stratum"] for alert in resolved] == ["main"]
+
+    # resolved once, then reopened as a new failure
+    _, resolved = update(store, [], {("Data Tests", "main")}, "2024-01-01T02:00:00")
+    assert resolved == []
+    notify, _ = update(store, [failure("main")], EVALUATED, "2024-01-01T03:00:00")
+    assert notify[0]["first_seen"] == "2024-01-01T03:00:00"
+
+
+def test_test_arguments_are_separate_alerts(store):
+    notify, _ = update(
+        store,
+        [failure("main", "TestValueList:sex"), failure("main", "TestValueList:hospital")],
+        EVALUATED,
+        "2024-01-01T00:00:00",
+    )
+    assert len(notify) == 2
+
+
+def test_pending_does_not_change_the_store(store):
+    notify, _ = store.pending([failure("main")], EVALUATED, "2024-01-01T00:00:00")
+    assert len(notify) == 1
+    # not recorded as notified, so it is still new
+    store.record([failure("main")], [], [], "2024-01-01T00:00:00")
+    notify, _ = update(store, [failure("main")], EVALUATED, "2024-01-01T01:00:00")
+    assert len(notify) == 1 and notify[0]["first_seen"] == "2024-01-01T00:00:00"
@@ -0,0 +1,140 @@
+"""
+Script to test the run-scoped alert queue and dispatcher.
+"""
+
+import os
+import pandas as pd
+import pytest
+from evidently.test_suite import TestSuite
+from evidently.tests import TestNumberOfRows
+from src.monitoring.alert_state import AlertStateStore
+from src.monitoring.alerts import AlertDispatcher, AlertQueue, StubTransport, check_test_results, get_transport
+
+
+@pytest.fixture
+def mock_config():
+    """
+    Fixture to mock the configuration file
+    """
+    return {
+        "info": {"project_name": "Test Project"},
+        "alerts": {"emails": ["johndoe@gmail.com"], "retries": 2, "backoff_seconds": 1},
+    }
+
+
+def failed_test(name: str) -> dict:
+    """
+    Create a failed test result
+    """
+    return {"name": name, "description": f"{name} is out of range", "status": "FAIL"}
+
+
+def test_dispatch_groups_and_dedupes(mock_config):
+    alert_queue = AlertQueue()
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "/tests/main")
+    # published again by a retried task
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "/tests/main")
+    alert_queue.publish("Classification Tests", [failed_test("accuracy"), failed_test("f1")], "/tests/main")
+
+    transport = StubTransport()
+    assert AlertDispatcher(mock_config, transport).dispatch(alert_queue)
+    assert len(transport.sent) == 1
+    body = transport.sent[0]["body"]
+    assert body.count("Test: num_rows") == 1
+    assert "Category: Classification Tests" in body and "Test: f1" in body
+    assert alert_queue.drain() == []
+
+
+def test_dispatch_retries_with_backoff(mock_config):
+    alert_queue = AlertQueue()
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "/tests/main")
+    sleeps = []
+    transport = StubTransport(failures=2)
+    assert AlertDispatcher(mock_config, transport, sleep=sleeps.append).dispatch(alert_queue)
+    assert sleeps == [1, 2]
+    assert len(transport.sent) == 1
+
+
+def test_dispatch_gives_up(mock_config):
+    alert_queue = AlertQueue()
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "/tests/main")
+    sleeps = []
+    transport = StubTransport(failures=5)
+    assert not AlertDispatcher(mock_config, transport, sleep=sleeps.append).dispatch(alert_queue)
+    assert len(sleeps) == 2
+    assert transport.sent == []
+
+
+def test_nothing_to_dispatch(mock_config):
+    transport = StubTransport()
+    assert not AlertDispatcher(mock_config, transport).dispatch(AlertQueue())
+    assert transport.sent == []
+
+
+def test_get_transport(mock_config):
+    mock_config["alerts"]["transport"] = "stub"
+    assert isinstance(get_transport(mock_config), StubTransport)
+    mock_config["alerts"]["transport"] = "pigeon"
+    with pytest.raises(ValueError):
+        get_transport(mock_config)
+
+
+def test_check_test_results_ids():
+    tests = [TestNumberOfRows(gte=10), TestNumberOfRows(lte=10)]
+    test_suite = TestSuite(tests=tests)
+    data = pd.DataFrame({"a": [1, 2, 3]})
+    test_suite.run(reference_data=data, current_data=data)
+    is_alert, failed_tests = check_test_results(test_suite, tests)
+    assert is_alert and len(failed_tests) == 1
+    assert failed_tests[0]["test_id"].startswith("TestNumberOfRows:")
+
+
+def test_dispatch_with_state(mock_config, tmp_path):
+    state = AlertStateStore(os.path.join(tmp_path, "alerts.db"))
+    transport = StubTransport()
+    dispatcher = AlertDispatcher(mock_config, transport, state=state)
+
+    alert_queue = AlertQueue()
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "main")
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "hospital1")
+    assert dispatcher.dispatch(alert_queue, "2024-01-01T00:00:00")
+    # the strata are grouped into one email
+    assert len(transport.sent) == 1
+    assert "Stratum: hospital1" in transport.sent[0]["body"]
+
+    # still failing: suppressed
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "main")
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "hospital1")
+    assert not dispatcher.dispatch(alert_queue, "2024-01-01T01:00:00")
+
+    # fixed in hospital1
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "main")
+    alert_queue.publish("Data Tests", [], "hospital1")
+    assert dispatcher.dispatch(alert_queue, "2024-01-01T02:00:00")
+    assert "Resolved" in transport.sent[-1]["subject"]
+    assert "Stratum: hospital1" in transport.sent[-1]["body"]
+
+
+def test_failed_dispatch_is_notified_again(mock_config, tmp_path):
+    state = AlertStateStore(os.path.join(tmp_path, "alerts.db"))
+    sleeps = []
+    dispatcher = AlertDispatcher(mock_config, StubTransport(failures=100), sleep=sleeps.append, state=state)
+    alert_queue = AlertQueue()
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "main")
+    assert not dispatcher.dispatch(alert_queue, "2024-01-01T00:00:00")
+
+    # the next run notifies the failure again, within the suppression window
+    transport = StubTransport()
+    dispatcher = AlertDispatcher(mock_config, transport, state=state)
+    alert_queue.publish("Data Tests", [failed_test("num_rows")], "main")
+    assert dispatcher.dispatch(alert_queue, "2024-01-01T01:00:00")
+    assert "Failing since: 2024-01-01T00:00:00" in transport.sent[0]["body"]
+
+    # the resolution notice isn't lost either
+    dispatcher.transport = StubTransport(failures=100)
+    alert_queue.publish("Data Tests", [], "main")
+    assert not dispatcher.dispatch(alert_queue, "2024-01-01T02:00:00")
+    dispatcher.transport = transport
+    alert_queue.publish("Data Tests", [], "main")
+    assert dispatcher.dispatch(alert_queue, "2024-01-01T03:00:00")
+    assert "Resolved" in transport.sent[-1]["subject"]
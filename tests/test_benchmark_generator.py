@@ -0,0 +1,59 @@
+"""
+Script to test the synthetic workload generator of the benchmarks.
+"""
+
+import pytest
+from benchmarks.generator import generate_workload, get_workload_options
+from src.data_preprocessing.validate import validate_data
+from src.utils.config_manager import load_config
+
+
+@pytest.fixture
+def config():
+    """
+    Fixture to load the configuration file
+    """
+    return load_config()
+
+
+def test_workload_matches_config(config):
+    results, labels = generate_workload(config, 200)
+    data = results.merge(labels.drop(columns=[config["columns"]["timestamp"]]), on=config["columns"]["study_id"])
+    assert len(data) == 200
+    assert set(results[config["columns"]["hospital"]]) <= {
+        "Credit Valley Hospital",
+        "Mississauga Hospital",
+        "Queensway Hospital",
+    }
+    assert validate_data(data, config)
+
+
+def test_workload_is_reproducible(config):
+    first, _ = generate_workload(config, 100, {"seed": 7, "end": "2024-06-01"})
+    second, _ = generate_workload(config, 100, {"seed": 7, "end": "2024-06-01"})
+    assert first.equals(second)
+    assert first[config["columns"]["timestamp"]].is_monotonic_increasing
+
+
+def test_label_lag(config):
+    results, labels = generate_workload(config, 1000, {"label_lag": 0.25})
+    assert len(labels) == 750
+    # the most recent results are the ones without a label
+    assert labels[config["columns"]["study_id"]].tolist() == results[config["columns"]["study_id"]][:750].tolist()
+
+
+def test_drift_injection(config):
+    options = {"drift_fraction": 0.5, "drift_age_shift": 60.0, "drift_prediction_bias": 10.0, "seed": 1}
+    results, labels = generate_workload(config, 2000, options)
+    age = results[config["columns"]["age"]]
+    error = (
+        results[config["columns"]["predictions"]["regression_prediction"]]
+        - labels[config["columns"]["labels"]["regression_label"]]
+    )
+    assert age[1000:].mean() - age[:1000].mean() > 30
+    assert error[1000:].mean() - error[:1000].mean() == pytest.approx(10.0, abs=1.0)
+
+
+def test_unknown_option():
+    with pytest.raises(ValueError):
+        get_workload_options({"num_hospitals": 5})
@@ -0,0 +1,76 @@
+"""
+Script to test the cached configuration and the values derived from it.
+"""
+
+import copy
+import json
+import os
+import pytest
+from src.utils import config_manager
+from src.utils.config_manager import Config, get_config, load_config
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    """
+    Fixture to read the configuration from a copy of the config file
+    """
+    file_path = tmp_path / "config.json"
+    file_path.write_text(json.dumps(load_config()))
+    monkeypatch.setattr(config_manager, "CONFIG_PATHS", [str(file_path)])
+    return file_path
+
+
+def test_config_is_cached(config_file):
+    config = get_config()
+    assert get_config() is config
+    assert config["columns"]["age"] == "Chronological Age"
+    assert json.loads(json.dumps(config)) == load_config()
+
+
+def test_config_reloaded_when_modified(config_file):
+    config = get_config()
+    data = load_config()
+    data["columns"]["age"] = "Age"
+    config_file.write_text(json.dumps(data))
+    os.utime(config_file, ns=(config.mtime + 10**9, config.mtime + 10**9))
+    assert get_config() is not config
+    assert get_config()["columns"]["age"] == "Age"
+
+
+def test_config_is_read_only(config_file):
+    config = get_config()
+    with pytest.raises(TypeError):
+        config["columns"]["age"] = "Age"
+    with pytest.raises(TypeError):
+        config["columns"]["features"].append("Age")
+    # copies can be changed, e.g. to adjust the configuration of a test
+    copied = copy.deepcopy(config)
+    copied["columns"]["age"] = "Age"
+    assert config["columns"]["age"] == "Chronological Age"
+
+
+def test_derived_values(config_file):
+    config = get_config()
+    assert config.results_required_columns == (
+        "StudyID",
+        "PatientSex",
+        "Hospital",
+        "Chronological Age",
+        "Prediction",
+        "Classification Prediction",
+    )
+    assert config.labels_required_columns == ("StudyID", "Label", "Classification Label")
+    assert config.split_features(["Upper Limit"]) == (
+        ["Lower Limit", "Chronological Age"],
+        ["PatientSex", "Hospital", "Upper Limit"],
+    )
+    assert config.column_mappings["classification"]["target"] == "Classification Label"
+
+
+def test_missing_keys():
+    data = load_config()
+    del data["columns"]["age"]
+    del data["columns"]["labels"]["classification_label"]
+    with pytest.raises(ValueError, match="columns.age, columns.labels.classification_label"):
+        Config(data)
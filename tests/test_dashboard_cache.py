@@ -0,0 +1,60 @@
+"""
+Script to test the dashboard panels cache.
+"""
+
+import pytest
+from unittest.mock import patch
+from src.dashboard.create_project import build_panels
+from src.dashboard.dashboard_cache import DashboardCache
+from src.utils.config_manager import load_config
+
+
+@pytest.fixture
+def mock_build_panels():
+    """
+    Fixture to replace the panel building with a call counter
+    """
+    with patch("src.dashboard.dashboard_cache.build_panels", side_effect=lambda config, tags: list(tags)) as mock:
+        yield mock
+
+
+def test_build_panels():
+    config = load_config()
+    panels = build_panels(config, ["main", "single"])
+    titles = [panel.title for panel in panels]
+    assert "Regression Tests" in titles
+    assert "Mean Absolute Error (MAE)" in titles
+
+
+def test_cached_panels(mock_build_panels):
+    cache = DashboardCache()
+    assert cache.get_panels({}, ["male", "single"], 1) == ["male", "single"]
+    assert cache.get_panels({}, ["male", "single"], 1) == ["male", "single"]
+    assert mock_build_panels.call_count == 1
+
+
+def test_new_generation_invalidates_cache(mock_build_panels):
+    cache = DashboardCache()
+    cache.get_panels({}, ["male", "single"], 1)
+    cache.get_panels({}, ["male", "single"], 2)
+    assert mock_build_panels.call_count == 2
+
+
+def test_least_recently_used_panels_are_evicted(mock_build_panels):
+    cache = DashboardCache(max_size=2)
+    cache.get_panels({}, ["male"], 1)
+    cache.get_panels({}, ["female"], 1)
+    cache.get_panels({}, ["male"], 1)
+    cache.get_panels({}, ["hospital1"], 1)
+    assert list(cache.panels) == [frozenset(["male"]), frozenset(["hospital1"])]
+
+
+def test_filter_order_shares_panels(mock_build_panels):
+    cache = DashboardCache()
+    cache.get_panels({}, ["male", "hospital1"], 1)
+    cache.get_panels({}, ["hospital1", "male"], 1)
+    assert mock_build_panels.call_count == 1
+    # a single filter keeps its 'single' tag in the key
+    cache.get_panels({}, ["male", "single"], 1)
+    cache.get_panels({}, ["male"], 1)
+    assert mock_build_panels.call_count == 3
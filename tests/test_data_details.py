@@ -0,0 +1,99 @@
+"""
+Script to test the incremental and atomic updates of the data details.
+"""
+
+import json
+import multiprocessing
+import os
+import mongomock
+import pandas as pd
+import pytest
+from scripts.data_details import DetailsStore, MongoDetailsStore
+
+
+@pytest.fixture
+def mock_config():
+    """
+    Fixture to mock the configuration file
+    """
+    return {
+        "columns": {
+            "hospital": "clinic",
+            "sex": "gender",
+            "instrument_type": None,
+            "patient_class": None,
+            "timestamp": "date",
+        }
+    }
+
+
+def make_data(clinics: list) -> pd.DataFrame:
+    """
+    Create data with the given clinics
+    """
+    return pd.DataFrame(
+        {
+            "clinic": clinics,
+            "gender": ["M"] * len(clinics),
+            "date": ["2024-01-01"] * len(clinics),
+            "age": [10] * len(clinics),
+        }
+    )
+
+
+def update_in_process(file_path: str, config: dict, clinic: str) -> None:
+    """
+    Update the details from another process
+    """
+    DetailsStore(file_path).update(make_data([clinic]), config)
+
+
+def test_incremental_update(tmp_path, mock_config):
+    store = DetailsStore(os.path.join(tmp_path, "details.json"))
+    details = store.update(make_data(["clinic1", "clinic2", "clinic1"]), mock_config)
+    assert details["hospital_unique_values"] == ["clinic1", "clinic2"]
+    assert details["categorical_columns"] == ["clinic", "gender"]
+    assert details["num_rows"] == 3
+    assert details["version"] == 1
+
+    # nothing new: the file isn't rewritten
+    signature = store.signature()
+    assert store.update(make_data(["clinic2"]), mock_config)["version"] == 1
+    assert store.signature() == signature
+
+    details = store.update(make_data(["clinic3"]), mock_config)
+    assert details["hospital_unique_values"] == ["clinic1", "clinic2", "clinic3"]
+    assert details["num_rows"] == 3
+    assert details["version"] == 2
+    assert store.load() == details
+
+
+def test_concurrent_updates(tmp_path, mock_config):
+    file_path = os.path.join(tmp_path, "details.json")
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=update_in_process, args=(file_path, mock_config, f"clinic{i}")) for i in range(8)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    with open(file_path) as file:
+        details = json.load(file)
+    assert sorted(details["hospital_unique_values"]) == [f"clinic{i}" for i in range(8)]
+    assert details["version"] == 8
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_mongo_details_store(mock_config):
+    store = MongoDetailsStore(mongomock.MongoClient()["data_ingestion"]["details"])
+    assert store.signature() is None
+    store.update(make_data(["clinic1", "clinic2"]), mock_config)
+    details = store.update(make_data(["clinic2", "clinic3"]), mock_config)
+    assert sorted(details["hospital_unique_values"]) == ["clinic1", "clinic2", "clinic3"]
+    assert details["num_rows"] == 2
+    assert details["version"] == 2
+
+    store.update(make_data(["clinic1"]), mock_config)
+    assert store.signature() == 2
@@ -0,0 +1,59 @@
+"""
+Script to test the compilation of the panel field paths.
+"""
+
+import pytest
+from evidently import metrics
+from src.utils.field_paths import check_panels_map, compile_panels_map, load_panel_paths
+
+
+def test_load_panel_paths():
+    panel_paths = load_panel_paths()
+
+    mae = panel_paths["mae"]
+    assert str(mae.current) == str(metrics.RegressionQualityMetric.fields.current.mean_abs_error)
+    assert str(mae.reference) == str(metrics.RegressionQualityMetric.fields.reference.mean_abs_error)
+    assert mae.reference_parts == ["reference", "mean_abs_error"]
+
+    drift = panel_paths["prediction_groundtruth_drift"]
+    assert str(drift.current) == str(metrics.ColumnDriftMetric.fields.drift_score)
+    assert drift.reference is None
+
+
+@pytest.mark.parametrize(
+    "metric_id, field_path",
+    [
+        ("RegressionQualityMetric", "metrics.RegressionQualityMetric.fields.current.not_a_field"),
+        ("NotAMetric", "metrics.NotAMetric.fields.current.rmse"),
+        ("RegressionQualityMetric", "metrics.RegressionQualityMetric.current.rmse"),
+        ("RegressionQualityMetric", "metrics.RegressionQualityMetric.fields.__class__"),
+        ("RegressionQualityMetric", "metrics.ColumnDriftMetric.fields.drift_score"),
+    ],
+)
+def test_invalid_field_paths_are_rejected(metric_id, field_path):
+    mapping = {
+        "rmse": {
+            "title": "RMSE",
+            "metric_id": "RegressionQualityMetric",
+            "field_path": "metrics.RegressionQualityMetric.fields.current.rmse",
+            "category": "regression",
+        },
+        "bad": {"title": "Bad", "metric_id": metric_id, "field_path": field_path, "category": "regression"},
+    }
+    with pytest.raises(ValueError, match="bad"):
+        compile_panels_map(mapping)
+
+
+def test_check_panels_map(tmp_path):
+    assert set(check_panels_map()) == set(load_panel_paths())
+
+    file_path = tmp_path / "panels_map.json"
+    file_path.write_text(
+        '{"bad": {"title": "Bad", "metric_id": "RegressionQualityMetric", '
+        '"field_path": "metrics.RegressionQualityMetric.fields.__class__", "category": "regression"}}'
+    )
+    with pytest.raises(ValueError, match="bad"):
+        check_panels_map(str(file_path))
+    file_path.write_text("{not json")
+    with pytest.raises(ValueError):
+        check_panels_map(str(file_path))
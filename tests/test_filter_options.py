@@ -0,0 +1,106 @@
+"""
+Script to test the cached dashboard filter options.
+"""
+
+import json
+import os
+import pytest
+from scripts.data_details import DetailsStore
+from src.dashboard.filter_options import FilterOptionsCache, get_filters
+from src.utils.config_manager import Config, load_config
+
+
+@pytest.fixture
+def mock_config():
+    """
+    Fixture to mock the configuration file
+    """
+    return {
+        "columns": {"instrument_type": None, "patient_class": "patient_category"},
+        "age_filtering": {"filter_type": "default"},
+    }
+
+
+def write_details(file_path: str, hospitals: list) -> None:
+    """
+    Write a details file with the given hospitals
+    """
+    details = {
+        "num_rows": 4,
+        "hospital_unique_values": hospitals,
+        "sex_unique_values": ["M", "F", "U"],
+        "instrument_type_unique_values": [],
+        "patient_class_unique_values": ["IP", "OP"],
+        "categorical_columns": [],
+    }
+    with open(file_path, "w") as file:
+        json.dump(details, file)
+
+
+@pytest.fixture
+def details_path(tmp_path):
+    """
+    Fixture to create a details file
+    """
+    file_path = os.path.join(tmp_path, "details.json")
+    write_details(file_path, ["hospital1"])
+    return file_path
+
+
+def test_get_filters(mock_config):
+    details = {
+        "hospital_unique_values": ["hospital1"],
+        "sex_unique_values": ["m", "F", "U"],
+        "patient_class_unique_values": ["IP"],
+    }
+    filters = get_filters(mock_config, details)
+    assert filters["sex"] == ["male", "female", "U"]
+    assert filters["age"] == ["[0-18]", "[18-65]", "[65+]"]
+    assert "instrument_type" not in filters
+
+
+def test_filter_options_reloaded_on_change(mock_config, details_path):
+    cache = FilterOptionsCache(mock_config, details_path)
+    body, etag = cache.get()
+    assert json.loads(body)["hospital"] == ["hospital1"]
+    assert cache.get() == (body, etag)
+
+    write_details(details_path, ["hospital1", "hospital2"])
+    os.utime(details_path, ns=(0, 0))
+    new_body, new_etag = cache.get()
+    assert json.loads(new_body)["hospital"] == ["hospital1", "hospital2"]
+    assert new_etag != etag
+
+
+def test_broken_details_keep_cached_options(mock_config, details_path):
+    cache = FilterOptionsCache(mock_config, details_path)
+    body, etag = cache.get()
+
+    with open(details_path, "w") as file:
+        file.write("{")
+    assert cache.get() == (body, etag)
+
+
+def test_write_during_reload_is_picked_up(mock_config, details_path):
+    class RacingStore(DetailsStore):
+        def load(self):
+            details = super().load()
+            # the flow writes new details right after they are read
+            write_details(self.file_path, ["hospital1", "hospital2"])
+            os.utime(self.file_path, ns=(0, 0))
+            return details
+
+    cache = FilterOptionsCache(mock_config, store=RacingStore(details_path))
+    assert json.loads(cache.get()[0])["hospital"] == ["hospital1"]
+    cache.store = DetailsStore(details_path)
+    assert json.loads(cache.get()[0])["hospital"] == ["hospital1", "hospital2"]
+
+
+def test_reloaded_config_is_picked_up(details_path):
+    data = load_config()
+    data["age_filtering"] = {"filter_type": "custom", "custom_ranges": [{"min": 0, "max": 100}]}
+    cache = FilterOptionsCache(Config(data, mtime=1), details_path)
+    assert json.loads(cache.get()[0])["age"] == ["[0-100]"]
+
+    data["age_filtering"] = {"filter_type": "default"}
+    assert json.loads(cache.get(Config(data, mtime=2))[0])["age"] == ["[0-18]", "[18-65]", "[65+]"]
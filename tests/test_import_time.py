@@ -0,0 +1,31 @@
+"""
+Script to test the import-time benchmark, and that the API and pipeline modules don't load Evidently when imported.
+"""
+
+import subprocess
+import sys
+import pytest
+from benchmarks.import_time import parse_importtime
+from benchmarks.results import ROOT_DIR
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1000 |       1500 |     pandas.core
+import time:       500 |       2000 |   pandas
+import time:       300 |       2420 | api.dashboard.app
+"""
+
+
+def test_parse_importtime():
+    module_seconds, packages = parse_importtime(IMPORTTIME_OUTPUT, "api.dashboard.app")
+    assert module_seconds == pytest.approx(0.00242)
+    assert packages == pytest.approx({"_io": 0.00012, "pandas": 0.0015, "api": 0.0003})
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["api.dashboard.app", "src.dashboard.workspace_manager", "src.monitoring.stratify", "src.utils.metric_store"],
+)
+def test_no_evidently_at_import(module):
+    code = f"import sys, {module}; sys.exit('evidently' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR).returncode == 0
@@ -0,0 +1,86 @@
+"""
+Script to test the metric time series store.
+"""
+
+import os
+import sqlite3
+import pytest
+import pandas as pd
+from evidently import ColumnMapping
+from evidently.report import Report
+from evidently.metrics import ColumnDriftMetric, RegressionQualityMetric
+from src.utils.metric_store import MetricStore, extract_metric_points, tags_key
+
+
+@pytest.fixture
+def mock_config():
+    """
+    Fixture to mock the configuration file
+    """
+    return {
+        "columns": {
+            "predictions": {"regression_prediction": "pred", "classification_prediction": None},
+            "labels": {"regression_label": "label", "classification_label": None},
+        }
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    """
+    Fixture to create a metric store in a temporary directory
+    """
+    return MetricStore(os.path.join(tmp_path, "metrics.db"))
+
+
+def test_extract_metric_points(mock_config):
+    data = pd.DataFrame({"pred": [10.0, 12.0, 14.0, 16.0], "label": [11.0, 12.0, 13.0, 18.0]})
+    metrics = [RegressionQualityMetric(), ColumnDriftMetric("pred")]
+    report = Report(metrics=metrics)
+    report.run(reference_data=data, current_data=data, column_mapping=ColumnMapping(target="label", prediction="pred"))
+
+    points = {(metric, series): value for metric, series, value in extract_metric_points(metrics, mock_config)}
+    assert points[("mae", "current")] == pytest.approx(1.0)
+    assert points[("mae", "reference")] == pytest.approx(1.0)
+    assert ("prediction_groundtruth_drift", "prediction") in points
+
+
+def test_tags_key_ignores_order():
+    assert tags_key(["single", "male"]) == tags_key(["male", "single"])
+
+
+def test_query_time_range(store):
+    for timestamp, value in [("2024-08-01T10:00:00", 1.0), ("2024-08-02T10:00:00", 2.0), ("2024-08-03T10:00:00", 3.0)]:
+        store.append(["male", "single"], timestamp, [("mae", "current", value), ("mae", "reference", 0.5)])
+    store.append(["female", "single"], "2024-08-02T10:00:00", [("mae", "current", 9.0)])
+
+    series = store.query(["single", "male"], "mae", start="2024-08-02", end="2024-08-03T10:00:00")
+    assert series["current"] == [("2024-08-02T10:00:00", 2.0), ("2024-08-03T10:00:00", 3.0)]
+    assert len(series["reference"]) == 2
+
+
+def test_append_replaces_existing_points(store):
+    store.append(["main", "single"], "2024-08-01T10:00:00", [("mae", "current", 1.0)])
+    store.append(["main", "single"], "2024-08-01T10:00:00", [("mae", "current", 4.0)])
+    assert store.query(["main", "single"], "mae") == {"current": [("2024-08-01T10:00:00", 4.0)]}
+
+
+def test_repeated_rollups_keep_the_mean(store):
+    # hourly runs, each rolled up with the runs before it as the cutoff moves forward
+    for hour, value in enumerate([0.0, 0.0, 0.0, 12.0]):
+        timestamp = f"2024-08-01T{hour:02d}:00:00"
+        store.append(["main", "single"], timestamp, [("mae", "current", value)])
+        store.rollup(f"2024-08-01T{hour:02d}:00:01")
+    assert store.query(["main", "single"], "mae") == {"current": [("2024-08-01T03:00:00", 3.0)]}
+
+
+def test_read_only_store(tmp_path):
+    db_path = os.path.join(tmp_path, "metrics.db")
+    reader = MetricStore(db_path, read_only=True)
+    assert reader.query(["main", "single"], "mae") == {}
+    assert not os.path.exists(db_path)
+
+    MetricStore(db_path).append(["main", "single"], "2024-08-01T10:00:00", [("mae", "current", 1.0)])
+    assert reader.query(["main", "single"], "mae") == {"current": [("2024-08-01T10:00:00", 1.0)]}
+    with pytest.raises(sqlite3.OperationalError):
+        reader.append(["main", "single"], "2024-08-02T10:00:00", [("mae", "current", 2.0)])
@@ -0,0 +1,42 @@
+"""
+Script to test the micro-benchmark runner and its comparison with the baseline.
+"""
+
+import pytest
+from benchmarks.micro import compare, get_case_config, run_benchmarks
+from src.utils.config_manager import load_config
+
+
+def test_case_config_depth():
+    config = load_config()
+    assert get_case_config(config, 3)["columns"]["patient_class"] is None
+    columns = get_case_config(config, 5)["columns"]
+    assert columns["instrument_type"] and columns["patient_class"]
+    with pytest.raises(ValueError):
+        get_case_config(config, 6)
+
+
+def test_run_benchmarks():
+    cases = run_benchmarks(load_config(), ["strata_products", "validate_schema"], [40], [2], [3, 4], repeats=1)
+    assert set(cases) == {
+        "strata_products[rows=40,hospitals=2,depth=3]",
+        "strata_products[rows=40,hospitals=2,depth=4]",
+        "validate_schema[rows=40,hospitals=2,depth=3]",
+        "validate_schema[rows=40,hospitals=2,depth=4]",
+    }
+    assert all(timing["median_seconds"] >= timing["min_seconds"] > 0 for timing in cases.values())
+
+
+def test_compare_with_baseline():
+    baseline = {
+        "fast": {"median_seconds": 1.0, "min_seconds": 1.0},
+        "slow": {"median_seconds": 1.0, "min_seconds": 1.0},
+    }
+    cases = {
+        "fast": {"median_seconds": 1.1, "min_seconds": 1.0},
+        "slow": {"median_seconds": 1.5, "min_seconds": 1.4},
+        "new": {"median_seconds": 9.0, "min_seconds": 9.0},
+    }
+    regressions = compare(cases, baseline, threshold=20)
+    assert [regression["case"] for regression in regressions] == ["slow"]
+    assert regressions[0]["change_percent"] == pytest.approx(50.0)
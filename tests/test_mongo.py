@@ -0,0 +1,75 @@
+"""
+Script to test the shared MongoDB client and its collection registry.
+"""
+
+import time
+import mongomock
+import pytest
+from src.utils.mongo import MongoManager, get_client_options
+
+
+@pytest.fixture
+def mongo():
+    """
+    Fixture to create a manager on an in-memory MongoDB
+    """
+    return MongoManager(mongomock.MongoClient())
+
+
+def test_get_client_options(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "10")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zlib")
+    monkeypatch.delenv("MONGO_SOCKET_TIMEOUT_MS", raising=False)
+    options = get_client_options()
+    assert options["maxPoolSize"] == 10
+    assert options["compressors"] == "zlib"
+    assert "socketTimeoutMS" not in options
+
+
+def test_get_instance_without_uri(monkeypatch):
+    monkeypatch.delenv("MONGO_URI", raising=False)
+    monkeypatch.setattr(MongoManager, "_instance", None)
+    with pytest.raises(ValueError):
+        MongoManager.get_instance()
+
+
+def test_collections_answered_from_memory(mongo, monkeypatch):
+    mongo.db["model1_results"].insert_one({"a": 1})
+    calls = []
+    list_collection_names = mongo.db.list_collection_names
+
+    def counted(*args, **kwargs):
+        calls.append(kwargs)
+        return list_collection_names(*args, **kwargs)
+
+    monkeypatch.setattr(mongo.db, "list_collection_names", counted)
+    assert mongo.collection_exists("model1_results")
+    assert not mongo.collection_exists("model1_labels")
+    assert len(calls) == 1
+
+    # written to by this process
+    mongo.db["model1_labels"].insert_one({"b": 1})
+    mongo.mark_collection("model1_labels")
+    assert mongo.collection_exists("model1_labels")
+    assert len(calls) == 1
+
+
+def test_stale_collections_refreshed_in_background(mongo):
+    assert not mongo.collection_exists("model1_results")
+
+    # created by another process, known after the next refresh
+    mongo.db["model1_results"].insert_one({"a": 1})
+    mongo.ttl = 0
+    assert not mongo.collection_exists("model1_results")
+    deadline = time.monotonic() + 5
+    while mongo.refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    mongo.ttl = 60
+    assert mongo.collection_exists("model1_results")
+
+
+def test_ensure_collection(mongo):
+    mongo.ensure_collection("model1_results")
+    mongo.ensure_collection("model1_results")
+    assert mongo.db.list_collection_names() == ["model1_results"]
+    assert mongo.collection_exists("model1_results")
@@ -0,0 +1,63 @@
+"""
+Script to test the profiling of the run stages.
+"""
+
+import json
+import os
+import pytest
+from src.utils import profiling
+from src.utils.profiling import RunProfile, stage, start_profile
+
+
+@pytest.fixture
+def profile(monkeypatch):
+    """
+    Fixture to start the profile of a run
+    """
+    monkeypatch.setattr(profiling, "_current_profile", None)
+    return start_profile("2024-01-01T00:00:00")
+
+
+def test_stage_records(profile):
+    with stage("fetch") as record:
+        record["rows_out"] = 10
+    for key in ["main", "hospital1"]:
+        with stage(f"report:{key}", rows_in=5):
+            with stage("snapshot_write"):
+                sum(range(10000))
+
+    stages = profile.to_dict()["stages"]
+    assert [record["stage"] for record in stages][:2] == ["fetch", "report:main"]
+    assert stages[0]["rows_out"] == 10
+    assert all(record["wall_seconds"] >= 0 and record["cpu_seconds"] >= 0 for record in stages)
+    assert all(record["peak_rss_mb"] > 0 for record in stages)
+
+    summary = profile.summary()
+    assert summary["report"]["count"] == 2
+    assert summary["report"]["rows_in"] == 10
+    assert summary["snapshot_write"]["count"] == 2
+
+
+def test_failed_stage_recorded(profile):
+    with pytest.raises(ValueError):
+        with stage("validate", rows_in=3):
+            raise ValueError("invalid data")
+    assert profile.to_dict()["stages"][0]["error"] is True
+
+
+def test_save_profile(profile, tmp_path):
+    with stage("details"):
+        pass
+    file_path = profile.save(os.path.join(tmp_path, "2024-01-01T00:00:00", "profile.json"))
+    with open(file_path) as file:
+        saved = json.load(file)
+    assert saved["timestamp"] == "2024-01-01T00:00:00"
+    assert saved["summary"]["details"]["count"] == 1
+
+
+def test_stage_outside_run(monkeypatch):
+    monkeypatch.setattr(profiling, "_current_profile", None)
+    with stage("fetch") as record:
+        record["rows_out"] = 1
+    assert profiling.get_profile() is None
+    assert RunProfile("2024-01-01T00:00:00").to_dict()["stages"] == []
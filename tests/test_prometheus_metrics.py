@@ -0,0 +1,159 @@
+"""
+Script to test the Prometheus metrics and the ingestion backlog counts.
+"""
+
+import json
+import os
+import time
+import mongomock
+import pytest
+from api.ingestion.metrics import BacklogMonitor, backlog_documents, count_backlog
+from src.utils.mongo import MongoManager
+from src.utils.prometheus_metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """
+    Fixture to create a registry dumping to a temporary directory
+    """
+    return MetricsRegistry(str(tmp_path))
+
+
+def test_render_counter_and_histogram():
+    registry = MetricsRegistry()
+    rows = registry.counter("rows_total", "Rows.", ("endpoint",))
+    seconds = registry.histogram("parse_seconds", "Parse time.", buckets=(0.1, 1.0))
+    rows.inc(3, endpoint="ingest_results")
+    rows.inc(2, endpoint="ingest_results")
+    seconds.observe(0.5)
+    seconds.observe(2)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE rows_total counter" in lines
+    assert 'rows_total{endpoint="ingest_results"} 5' in lines
+    assert 'parse_seconds_bucket{le="0.1"} 0' in lines
+    assert 'parse_seconds_bucket{le="1"} 1' in lines
+    assert 'parse_seconds_bucket{le="+Inf"} 2' in lines
+    assert "parse_seconds_sum 2.5" in lines
+    assert "parse_seconds_count 2" in lines
+
+
+def test_labels_must_match():
+    counter = MetricsRegistry().counter("rows_total", "Rows.", ("endpoint",))
+    with pytest.raises(ValueError):
+        counter.inc(model_id="model1")
+
+
+def test_render_merges_live_workers(registry, tmp_path):
+    rows = registry.counter("rows_total", "Rows.", ("endpoint",))
+    backlog = registry.gauge("backlog", "Backlog.")
+    rows.inc(5, endpoint="ingest_labels")
+    backlog.set(7)
+
+    # a live worker (the parent of the test) with older gauges, and an exited one
+    worker = registry.snapshot()
+    worker.update(pid=os.getppid(), time=worker["time"] - 60)
+    worker["metrics"]["backlog"]["values"] = [[[], 3]]
+    (tmp_path / f"worker-{os.getppid()}.json").write_text(json.dumps(worker))
+    (tmp_path / "worker-999999999.json").write_text(json.dumps(worker))
+
+    lines = registry.render().splitlines()
+    assert 'rows_total{endpoint="ingest_labels"} 15' in lines
+    assert "backlog 7" in lines
+    assert not (tmp_path / "worker-999999999.json").exists()
+
+
+def test_exited_workers_keep_their_totals(registry, tmp_path):
+    seconds = registry.histogram("parse_seconds", "Parse time.", buckets=(1.0,))
+    rows = registry.counter("rows_total", "Rows.")
+    seconds.observe(0.5)
+    rows.inc(2)
+    worker = registry.snapshot()
+    worker["pid"] = 999999999
+    (tmp_path / "worker-999999999.json").write_text(json.dumps(worker))
+
+    # the exited worker is folded into the aggregate once, and its totals stay in the next scrapes
+    for _ in range(2):
+        lines = registry.render().splitlines()
+        assert "rows_total 4" in lines
+        assert 'parse_seconds_bucket{le="1"} 2' in lines
+        assert "parse_seconds_count 2" in lines
+    assert not (tmp_path / "worker-999999999.json").exists()
+
+    # a dump left behind by a crash after it was folded isn't counted twice
+    (tmp_path / "worker-999999999.json").write_text(json.dumps(worker))
+    assert "rows_total 4" in registry.render().splitlines()
+
+
+def test_dump(registry, tmp_path):
+    registry.counter("rows_total", "Rows.").inc()
+    registry.dump()
+    dump = json.loads((tmp_path / f"worker-{os.getpid()}.json").read_text())
+    assert dump["metrics"]["rows_total"]["values"] == [[[], 1]]
+
+
+def test_count_backlog():
+    mongo = MongoManager(mongomock.MongoClient())
+    mongo.db["model_1_results"].insert_many([{"a": 1}, {"a": 2}])
+    mongo.db["model_1_labels"].insert_one({"a": 1})
+    mongo.db["model_1_merged"].insert_one({"a": 1})
+    assert count_backlog(mongo) == {("model_1", "results"): 2, ("model_1", "labels"): 1}
+
+
+def test_backlog_monitor_sets_gauges(tmp_path):
+    mongo = MongoManager(mongomock.MongoClient())
+    mongo.db["model_2_results"].insert_one({"a": 1})
+    monitor = BacklogMonitor(interval=60, get_mongo=lambda: mongo, lock_path=str(tmp_path / "backlog"))
+    monitor.refresh()
+    assert backlog_documents.values[("model_2", "results")] == 1
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    """
+    Wait until a condition holds, or the timeout
+    """
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_one_worker_polls_the_backlog(tmp_path):
+    mongo = MongoManager(mongomock.MongoClient())
+    calls = {"first": 0, "second": 0}
+
+    def get_mongo(name):
+        calls[name] += 1
+        return mongo
+
+    lock_path = str(tmp_path / "backlog")
+    first = BacklogMonitor(interval=0.01, get_mongo=lambda: get_mongo("first"), lock_path=lock_path)
+    second = BacklogMonitor(interval=0.01, get_mongo=lambda: get_mongo("second"), lock_path=lock_path)
+    first.start()
+    assert wait_for(lambda: calls["first"] >= 2)
+    second.start()
+    time.sleep(0.1)
+    assert calls["second"] == 0
+
+    # the second worker takes over when the first one stops
+    first.stop()
+    assert wait_for(lambda: calls["second"] >= 1)
+    second.stop()
+
+
+def test_failed_counts_wait_for_the_interval(tmp_path):
+    calls = []
+
+    def get_mongo():
+        calls.append(time.time())
+        raise ConnectionError("MongoDB is down")
+
+    monitor = BacklogMonitor(interval=60, get_mongo=get_mongo, lock_path=str(tmp_path / "backlog"))
+    monitor.start()
+    assert wait_for(lambda: len(calls) == 1)
+    time.sleep(0.1)
+    monitor.stop()
+    assert len(calls) == 1
@@ -0,0 +1,143 @@
+"""
+Script to test the snapshot retention and compaction.
+"""
+
+import os
+import shutil
+import uuid
+import pytest
+from unittest.mock import patch
+import pandas as pd
+from datetime import datetime
+from evidently import ColumnMapping
+from evidently.report import Report
+from evidently.metrics import RegressionQualityMetric
+from src.dashboard.create_project import log_snapshots, find_timestamp_snapshots, list_subdirectories
+from src.dashboard.retention import compact_snapshots, group_runs
+from src.dashboard.snapshot_registry import SnapshotRegistry
+from src.utils.metric_store import MetricStore
+from src.utils.snapshot_io import load_snapshot_data, save_snapshot
+
+NOW = datetime(2024, 9, 15, 12, 0, 0)
+OLD_RUNS = {"2024-08-01T10:00:00": 1.0, "2024-08-01T11:00:00": 2.0, "2024-08-01T12:00:00": 6.0}
+RECENT_RUNS = {"2024-09-14T10:00:00": 1.0, "2024-09-14T11:00:00": 1.0}
+
+
+class MockProject:
+    def __init__(self):
+        self.id = uuid.uuid4()
+
+
+class MockWorkspace:
+    def __init__(self):
+        self.added = []
+        self.deleted = []
+
+    def add_snapshot(self, project_id, snapshot):
+        self.added.append(snapshot.id)
+
+    def delete_snapshot(self, project_id, snapshot_id):
+        self.deleted.append(snapshot_id)
+
+
+def write_run(snapshots_dir, timestamp: str, error: float) -> None:
+    """
+    Write a regression snapshot for the main stratum, with the given absolute error
+    """
+    folder = os.path.join(snapshots_dir, timestamp, "reports", "main_report")
+    os.makedirs(folder)
+    data = pd.DataFrame({"pred": [10.0, 20.0, 30.0], "label": [10.0 + error, 20.0 - error, 30.0 + error]})
+    report = Report(metrics=[RegressionQualityMetric()], tags=["main", "single", "regression"])
+    report.run(reference_data=data, current_data=data, column_mapping=ColumnMapping(target="label", prediction="pred"))
+    save_snapshot(report, os.path.join(folder, "regression_report.json"), {})
+
+
+@pytest.fixture
+def snapshots_dir(tmp_path):
+    """
+    Fixture to create a snapshots directory with old and recent runs
+    """
+    for timestamp, error in {**OLD_RUNS, **RECENT_RUNS}.items():
+        write_run(tmp_path, timestamp, error)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def config():
+    """
+    Fixture to mock the retention configuration
+    """
+    return {"retention": {"enabled": True, "full_resolution_days": 30, "rollup_period": "daily"}}
+
+
+def test_group_runs():
+    timestamps = ["2024-08-01T10:00:00", "2024-08-01T11:00:00", "2024-08-02T10:00:00", "2024-09-14T10:00:00"]
+    assert group_runs(timestamps, NOW, "daily") == [["2024-08-01T10:00:00", "2024-08-01T11:00:00"]]
+    assert group_runs(timestamps, NOW, "weekly") == [
+        ["2024-08-01T10:00:00", "2024-08-01T11:00:00", "2024-08-02T10:00:00"]
+    ]
+
+
+def test_compact_snapshots_rolls_up_old_runs(snapshots_dir, config):
+    assert compact_snapshots(config, snapshots_dir, now=NOW) == 2
+    assert list_subdirectories(snapshots_dir) == ["2024-08-01T12:00:00", *RECENT_RUNS]
+
+    (relative_path,) = find_timestamp_snapshots(snapshots_dir, "2024-08-01T12:00:00")
+    data = load_snapshot_data(os.path.join(snapshots_dir, relative_path))
+    assert data["suite"]["metric_results"][0]["current"]["mean_abs_error"] == pytest.approx(3.0)
+    assert data["metadata"]["rollup_runs"] == "3"
+
+    # compacting again doesn't change anything
+    assert compact_snapshots(config, snapshots_dir, now=NOW) == 0
+
+
+def test_compact_snapshots_updates_project(snapshots_dir, config):
+    project = MockProject()
+    log_snapshots(project, MockWorkspace(), snapshots_dir)
+
+    workspace = MockWorkspace()
+    compact_snapshots(config, snapshots_dir, workspace=workspace, project=project, now=NOW)
+    assert len(workspace.deleted) == 3
+    registry = SnapshotRegistry(snapshots_dir, project.id)
+    assert len(registry.snapshots) == 2
+
+    # the next dashboard update adds the roll-up
+    log_snapshots(project, workspace, snapshots_dir)
+    assert len(workspace.added) == 1
+
+
+def test_compact_snapshots_rolls_up_metric_store(snapshots_dir, config):
+    store = MetricStore(os.path.join(snapshots_dir, "metrics.db"))
+    for timestamp, error in {**OLD_RUNS, **RECENT_RUNS}.items():
+        store.append(["main", "single"], timestamp, [("mae", "current", error)])
+
+    compact_snapshots(config, snapshots_dir, now=NOW)
+    series = store.query(["main", "single"], "mae")
+    assert series["current"] == [
+        ("2024-08-01T12:00:00", pytest.approx(3.0)),
+        ("2024-09-14T10:00:00", 1.0),
+        ("2024-09-14T11:00:00", 1.0),
+    ]
+
+
+def test_compact_snapshots_recovers_after_crash(snapshots_dir, config):
+    rmtree = shutil.rmtree
+
+    def crash_on_second_run(path, *args, **kwargs):
+        if path.endswith("2024-08-01T11:00:00"):
+            raise OSError("crash")
+        rmtree(path, *args, **kwargs)
+
+    # the oldest run is deleted, then the roll-up crashes with the latest run still in place
+    with patch("src.dashboard.retention.shutil.rmtree", side_effect=crash_on_second_run):
+        assert compact_snapshots(config, snapshots_dir, now=NOW) == 0
+    assert "2024-08-01T10:00:00" not in list_subdirectories(snapshots_dir)
+
+    # the next run finishes the roll-up instead of discarding it
+    compact_snapshots(config, snapshots_dir, now=NOW)
+    assert list_subdirectories(snapshots_dir) == ["2024-08-01T12:00:00", *RECENT_RUNS]
+    (relative_path,) = find_timestamp_snapshots(snapshots_dir, "2024-08-01T12:00:00")
+    data = load_snapshot_data(os.path.join(snapshots_dir, relative_path))
+    assert data["suite"]["metric_results"][0]["current"]["mean_abs_error"] == pytest.approx(3.0)
+    assert data["metadata"]["rollup_runs"] == "3"
+    assert not os.path.exists(os.path.join(snapshots_dir, "2024-08-01T12:00:00", ".sources"))
@@ -0,0 +1,73 @@
+import pytest
+import pandas as pd
+from src.monitoring.scheduler import schedule_strata, gate_strata, batch_strata
+
+
+@pytest.fixture
+def mock_config():
+    """
+    Fixture to mock the configuration file
+    """
+    return {
+        "scheduling": {
+            "min_stratum_rows": 5,
+            "batch_max_rows": 20,
+        },
+    }
+
+
+def make_data(num_rows: int) -> pd.DataFrame:
+    """
+    Generate a dataframe with the given number of rows
+    """
+    return pd.DataFrame({"age": range(num_rows)})
+
+
+@pytest.fixture
+def stratifications():
+    """
+    Fixture to generate stratified data of different sizes
+    """
+    return {
+        "main_report": make_data(100),
+        "male_report": make_data(50),
+        "female_report": make_data(3),
+        "hospital1_male_report": make_data(8),
+        "hospital2_male_report": make_data(10),
+        "hospital1_female_report": make_data(6),
+    }
+
+
+def test_gate_strata_drops_small_strata(stratifications):
+    results = gate_strata(stratifications, 5)
+    assert "female_report" not in results
+    assert len(results) == len(stratifications) - 1
+
+
+def test_gate_strata_keeps_main():
+    results = gate_strata({"main_report": make_data(2)}, 5)
+    assert "main_report" in results
+
+
+def test_batch_strata_packs_small_strata():
+    strata = [("a", make_data(30)), ("b", make_data(12)), ("c", make_data(8)), ("d", make_data(6))]
+    batches = batch_strata(strata, 20)
+    assert [[key for key, _ in batch] for batch in batches] == [["a"], ["b", "c"], ["d"]]
+
+
+def test_schedule_strata(stratifications, mock_config):
+    batches = schedule_strata(stratifications, mock_config)
+    keys = [key for batch in batches for key, _ in batch]
+    # every stratum is scheduled exactly once, apart from the one below the minimum
+    assert sorted(keys) == sorted(key for key in stratifications if key != "female_report")
+    # largest first
+    sizes = [sum(len(data) for _, data in batch) for batch in batches]
+    assert sizes == sorted(sizes, reverse=True)
+    assert [key for key, _ in batches[0]] == ["main_report"]
+
+
+def test_schedule_strata_without_batching(stratifications):
+    config = {"scheduling": {"min_stratum_rows": 0, "batch_max_rows": 0}}
+    batches = schedule_strata(stratifications, config)
+    assert all(len(batch) == 1 for batch in batches)
+    assert len(batches) == len(stratifications)
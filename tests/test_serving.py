@@ -0,0 +1,17 @@
+"""
+Script to test the production server options.
+"""
+
+from src.utils.serving import get_server_options
+
+
+def test_server_options_from_environment(monkeypatch):
+    monkeypatch.setenv("INGESTION_API_WORKERS", "3")
+    monkeypatch.setenv("INGESTION_API_KEEP_ALIVE", "")
+    options = get_server_options("INGESTION_API")
+    assert options == {"workers": 3, "timeout_keep_alive": 5, "timeout_graceful_shutdown": 30}
+
+
+def test_server_options_default_workers(monkeypatch):
+    monkeypatch.delenv("DASHBOARD_API_WORKERS", raising=False)
+    assert get_server_options("DASHBOARD_API", default_workers=1)["workers"] == 1
@@ -0,0 +1,80 @@
+"""
+Script to test writing and reading the snapshots.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from evidently import ColumnMapping
+from evidently.report import Report
+from evidently.metrics import RegressionQualityMetric, RegressionPredictedVsActualScatter
+from evidently.suite.base_suite import Snapshot
+from src.utils.snapshot_io import save_snapshot, load_snapshot_data, downsample, is_snapshot_file
+
+
+@pytest.fixture
+def regression_report():
+    """
+    Fixture to generate a regression report with raw scatter plot data
+    """
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({"target": rng.random(2500) * 200, "prediction": rng.random(2500) * 200})
+    report = Report(
+        metrics=[RegressionQualityMetric(), RegressionPredictedVsActualScatter()],
+        options={"render": {"raw_data": True}},
+        tags=["main", "single", "regression"],
+    )
+    report.run(reference_data=data, current_data=data, column_mapping=ColumnMapping())
+    return report
+
+
+def scatter_points(snapshot_data: dict) -> tuple[int, int]:
+    """
+    Get the number of predicted and actual points in the scatter plot
+    """
+    scatter = snapshot_data["suite"]["metric_results"][1]["current"]
+    return len(scatter["predicted"]), len(scatter["actual"])
+
+
+def test_save_compressed_snapshot(regression_report, tmp_path):
+    config = {"snapshots": {"compression": "gzip", "max_plot_points": 1000}}
+    file_path = save_snapshot(regression_report, str(tmp_path / "regression_report.json"), config)
+
+    assert file_path.endswith(".json.gz")
+    assert is_snapshot_file("regression_report.json.gz")
+
+    data = load_snapshot_data(file_path)
+    assert scatter_points(data) == (834, 834)
+
+    snapshot = Snapshot(**data)
+    assert snapshot.tags == ["main", "single", "regression"]
+
+
+def test_save_uncompressed_snapshot(regression_report, tmp_path):
+    config = {"snapshots": {"compression": None}}
+    file_path = save_snapshot(regression_report, str(tmp_path / "regression_report.json"), config)
+
+    assert file_path.endswith(".json")
+    data = load_snapshot_data(file_path)
+    assert scatter_points(data) == (2500, 2500)
+    Snapshot(**data)
+
+
+def test_downsample_keeps_short_and_non_numeric_sequences():
+    value = {"short": [1, 2, 3], "labels": ["a"] * 10, "long": list(range(10))}
+    result = downsample(value, 5)
+    assert result["short"] == [1, 2, 3]
+    assert result["labels"] == ["a"] * 10
+    assert result["long"] == [0, 2, 4, 6, 8]
+
+
+def test_load_snapshot_with_undefined_metrics(tmp_path):
+    # R2 is not defined for a single row, Evidently writes it as NaN
+    data = pd.DataFrame({"target": [1.0], "prediction": [2.0]})
+    report = Report(metrics=[RegressionQualityMetric()])
+    report.run(reference_data=data, current_data=data, column_mapping=ColumnMapping())
+    file_path = save_snapshot(report, str(tmp_path / "regression_report.json"), {})
+
+    data = load_snapshot_data(file_path)
+    assert np.isnan(data["suite"]["metric_results"][0]["current"]["r2_score"])
+    Snapshot(**data)
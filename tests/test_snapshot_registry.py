@@ -0,0 +1,102 @@
+"""
+Script to test the incremental registration of snapshots.
+"""
+
+import os
+import uuid
+import pytest
+import pandas as pd
+from evidently.report import Report
+from evidently.metrics import DatasetSummaryMetric
+from src.dashboard.create_project import log_snapshots
+from src.dashboard.snapshot_registry import SnapshotRegistry
+from src.utils.snapshot_io import save_snapshot
+
+
+class MockProject:
+    def __init__(self):
+        self.id = uuid.uuid4()
+
+
+class MockWorkspace:
+    def __init__(self):
+        self.added = []
+
+    def add_snapshot(self, project_id, snapshot):
+        self.added.append(snapshot.id)
+
+
+def write_run(snapshots_dir, timestamp: str, strata: list) -> None:
+    """
+    Write one data quality snapshot per stratum for a run
+    """
+    data = pd.DataFrame({"age": [1, 2, 3], "sex": ["M", "F", "M"]})
+    for stratum in strata:
+        folder = os.path.join(snapshots_dir, timestamp, "reports", f"{stratum}_report")
+        os.makedirs(folder)
+        report = Report(metrics=[DatasetSummaryMetric()], tags=[stratum, "data"])
+        report.run(reference_data=data, current_data=data)
+        save_snapshot(report, os.path.join(folder, "data_quality_report.json"), {})
+
+
+@pytest.fixture
+def snapshots_dir(tmp_path):
+    """
+    Fixture to create a snapshots directory with one run
+    """
+    write_run(tmp_path, "2024-08-01T10:00:00", ["main", "male"])
+    return str(tmp_path)
+
+
+def test_log_snapshots_registers_only_new_snapshots(snapshots_dir):
+    project = MockProject()
+
+    workspace = MockWorkspace()
+    log_snapshots(project, workspace, snapshots_dir)
+    assert len(workspace.added) == 2
+
+    # a new run only adds the new snapshots
+    write_run(snapshots_dir, "2024-08-01T11:00:00", ["female"])
+    workspace = MockWorkspace()
+    log_snapshots(project, workspace, snapshots_dir)
+    assert len(workspace.added) == 1
+
+    registry = SnapshotRegistry(snapshots_dir, project.id)
+    assert registry.is_completed("2024-08-01T10:00:00")
+    assert registry.is_completed("2024-08-01T11:00:00")
+    assert len(registry.snapshots) == 3
+
+
+def test_log_snapshots_new_project_registers_everything(snapshots_dir):
+    log_snapshots(MockProject(), MockWorkspace(), snapshots_dir)
+
+    workspace = MockWorkspace()
+    log_snapshots(MockProject(), workspace, snapshots_dir)
+    assert len(workspace.added) == 2
+
+
+def test_log_snapshots_retries_broken_snapshots(snapshots_dir):
+    project = MockProject()
+    broken = os.path.join(snapshots_dir, "2024-08-01T10:00:00", "reports", "main_report", "broken_report.json")
+    with open(broken, "w") as file:
+        file.write("{")
+
+    log_snapshots(project, MockWorkspace(), snapshots_dir)
+    registry = SnapshotRegistry(snapshots_dir, project.id)
+    assert not registry.is_completed("2024-08-01T10:00:00")
+
+    # once the broken snapshot is removed, the registered snapshots are not added again
+    os.remove(broken)
+    workspace = MockWorkspace()
+    log_snapshots(project, workspace, snapshots_dir)
+    assert workspace.added == []
+    assert SnapshotRegistry(snapshots_dir, project.id).is_completed("2024-08-01T10:00:00")
+
+
+def test_log_snapshots_in_parallel(snapshots_dir):
+    write_run(snapshots_dir, "2024-08-01T11:00:00", ["female", "hospital1", "hospital2"])
+
+    workspace = MockWorkspace()
+    log_snapshots(MockProject(), workspace, snapshots_dir, max_workers=2)
+    assert len(workspace.added) == 5
+    assert len(set(workspace.added)) == 5
@@ -0,0 +1,65 @@
+"""
+Script to test the pre-rendered static dashboard panels.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+from src.dashboard.static_panels import get_static_html, render_static_html, file_digest, asset_name
+
+
+@pytest.fixture
+def mock_config():
+    """
+    Fixture to mock the project information
+    """
+    return {
+        "info": {
+            "project_name": "Bone Age",
+            "project_description": "Bone age monitoring",
+            "model_developer": "AIDE Lab",
+            "contact_name": "Jane Doe",
+            "contact_email": "jane@example.com",
+            "references": [{"name": "Paper", "url": "https://example.com"}],
+            "disclaimer": "For research use only.",
+            "fact_card": "card.png",
+        }
+    }
+
+
+@pytest.fixture
+def images_dir(tmp_path):
+    """
+    Fixture to create a fact card image and clear the rendered panels
+    """
+    with open(os.path.join(tmp_path, "card.png"), "wb") as file:
+        file.write(b"\x89PNG first image")
+    render_static_html.cache_clear()
+    with patch("src.dashboard.static_panels.FACT_CARD_DIR", str(tmp_path)):
+        yield str(tmp_path)
+
+
+def test_static_html_is_cached(mock_config, images_dir):
+    first = get_static_html(mock_config)
+    assert get_static_html(mock_config) is first
+    assert "data:image/png;base64," in first["disclaimer"]
+    assert "Jane Doe" in first["model_info"]
+
+    # a new image renders the panels again
+    with open(os.path.join(images_dir, "card.png"), "wb") as file:
+        file.write(b"\x89PNG second, larger image")
+    assert get_static_html(mock_config) is not first
+
+
+def test_fact_card_served_by_reference(mock_config, images_dir, monkeypatch):
+    monkeypatch.setenv("DASHBOARD_ASSETS_URL", "http://localhost:5002/")
+    image_path = os.path.join(images_dir, "card.png")
+
+    disclaimer = get_static_html(mock_config)["disclaimer"]
+    assert f"http://localhost:5002/assets/{asset_name(image_path, file_digest(image_path))}" in disclaimer
+    assert "base64" not in disclaimer
+
+
+def test_missing_fact_card_uses_text(mock_config, images_dir):
+    mock_config["info"]["fact_card"] = "missing.png"
+    assert "For research use only." in get_static_html(mock_config)["disclaimer"]
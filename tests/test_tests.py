@@ -1,7 +1,8 @@
 import pytest
 import pandas as pd
-from src.monitoring.tests import generate_tests
+from src.monitoring.tests import generate_tests, compile_test_plan, get_data_tests
 from unittest.mock import patch
+from src.monitoring.tests import load_json
 
 
 @pytest.fixture
@@ -188,3 +189,24 @@ def test_generate_tests(mock_config, mock_data, mock_reference_data):
 
         # Check that regression tests are not called
         mock_regression_tests.assert_not_called()
+
+
+def test_compile_test_plan(mock_config):
+    test_plan = compile_test_plan(mock_config, load_json("src/utils/tests_map.json"))
+
+    assert [spec.name for spec in test_plan["classification_tests"]] == [
+        test["name"] for test in mock_config["tests"]["classification_tests"]
+    ]
+    # col_regex and test_col_range have invalid params in the mock config, so they are dropped from the plan
+    assert len(test_plan["data_quality_tests"]) == len(mock_config["tests"]["data_quality_tests"]) - 2
+
+    # each suite gets its own test instances
+    first, second = get_data_tests(test_plan), get_data_tests(test_plan)
+    assert len(first) == len(second) == 7
+    assert all(a is not b and type(a) is type(b) for a, b in zip(first, second))
+
+
+def test_compile_test_plan_skips_invalid_tests(mock_config):
+    mock_config["tests"]["regression_tests"] = [{"name": "not_a_test"}, {"name": "rmse"}]
+    test_plan = compile_test_plan(mock_config, load_json("src/utils/tests_map.json"))
+    assert [spec.name for spec in test_plan["regression_tests"]] == ["rmse"]
@@ -0,0 +1,108 @@
+"""
+Script to test the tracing of the ingestion API and the monitoring flow.
+"""
+
+import json
+import os
+import threading
+import pytest
+from flask import Flask
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from src.utils import tracing
+from src.utils.tracing import (
+    FileSpanExporter,
+    add_ingestion_links,
+    flush_tracing,
+    get_ingestion_links,
+    get_traceparent,
+    instrument_flask,
+    run_span,
+    setup_tracing,
+    span,
+)
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    """
+    Fixture to export the spans of the tests in memory
+    """
+    exporter = InMemorySpanExporter()
+    assert setup_tracing("tests", exporter=exporter)
+    return exporter
+
+
+def finished_spans(exporter) -> dict:
+    """
+    Get the finished spans by name
+    """
+    flush_tracing()
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    exporter.clear()
+    return spans
+
+
+def update_dashboard() -> None:
+    """
+    Trace a dashboard update
+    """
+    with span("dashboard.create_or_update", links=get_ingestion_links()):
+        pass
+
+
+def test_upload_linked_to_dashboard_update(exporter):
+    with span("POST /ingest_results"):
+        traceparent = get_traceparent()
+    assert traceparent
+
+    with run_span("monitoring_run"):
+        links = add_ingestion_links([traceparent, traceparent, None, "not-a-traceparent"])
+        assert len(links) == 1
+
+        # a task thread doesn't inherit the context of the flow
+        thread = threading.Thread(target=update_dashboard)
+        thread.start()
+        thread.join()
+
+    spans = finished_spans(exporter)
+    upload = spans["POST /ingest_results"]
+    dashboard = spans["dashboard.create_or_update"]
+    assert dashboard.parent.span_id == spans["monitoring_run"].context.span_id
+    assert [link.context.span_id for link in dashboard.links] == [upload.context.span_id]
+
+
+def test_flask_requests_traced(exporter):
+    app = Flask(__name__)
+    instrument_flask(app)
+
+    @app.route("/ingest/<model_id>", methods=["POST"])
+    def ingest(model_id):
+        return {"traceparent": get_traceparent()}
+
+    response = app.test_client().post("/ingest/model1")
+    spans = finished_spans(exporter)
+    request_span = spans["POST /ingest/<model_id>"]
+    assert request_span.attributes["http.status_code"] == 200
+    assert format(request_span.context.trace_id, "032x") in response.json["traceparent"]
+
+
+def test_file_exporter(tmp_path):
+    file_path = os.path.join(tmp_path, "traces.jsonl")
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(FileSpanExporter(file_path)))
+    with provider.get_tracer("tests").start_as_current_span("etl.fetch_and_merge"):
+        pass
+    with provider.get_tracer("tests").start_as_current_span("etl.validate_data"):
+        pass
+
+    with open(file_path) as file:
+        names = [json.loads(line)["name"] for line in file]
+    assert names == ["etl.fetch_and_merge", "etl.validate_data"]
+
+
+def test_tracing_disabled(monkeypatch):
+    monkeypatch.setattr(tracing, "_provider", None)
+    monkeypatch.setenv("OTEL_TRACES_EXPORTER", "none")
+    assert not setup_tracing("tests")
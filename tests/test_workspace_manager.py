@@ -0,0 +1,55 @@
+"""
+Script to test that the dashboard reloads the Evidently workspace only when the flow has changed it.
+"""
+
+import pytest
+from src.dashboard import workspace_manager
+from src.dashboard.workspace_manager import WorkspaceManager, bump_generation, get_generation
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """
+    Fixture to create a workspace manager in a temporary directory, counting the workspace loads
+    """
+    workspace_dir = tmp_path / "workspace"
+    monkeypatch.setattr(workspace_manager, "WORKSPACE_NAME", str(workspace_dir))
+    monkeypatch.setattr(workspace_manager, "GENERATION_FILE", str(workspace_dir / ".generation"))
+    monkeypatch.setattr(WorkspaceManager, "_instance", None)
+    loads = []
+    monkeypatch.setattr(WorkspaceManager, "load_or_create_workspace", lambda self, name: loads.append(name) or loads)
+    manager = WorkspaceManager.get_instance()
+    manager.loads = loads
+    return manager
+
+
+def test_no_reload_when_unchanged(manager):
+    assert manager.generation == 0
+    assert not manager.reload_if_changed()
+    assert not manager.reload_if_changed()
+    assert len(manager.loads) == 1
+
+
+def test_reload_after_bump(manager):
+    assert bump_generation() == 1
+    assert manager.reload_if_changed()
+    assert manager.generation == 1 and len(manager.loads) == 2
+    # reloaded once per change
+    assert not manager.reload_if_changed()
+    assert len(manager.loads) == 2
+
+
+@pytest.mark.parametrize("content", [None, "", "not a number"])
+def test_missing_or_corrupt_generation(manager, content):
+    if content is not None:
+        generation_file = workspace_manager.GENERATION_FILE
+        workspace_manager.ensure_directory(workspace_manager.WORKSPACE_NAME)
+        with open(generation_file, "w") as file:
+            file.write(content)
+    assert get_generation() == 0
+    assert not manager.reload_if_changed()
+
+    # the next update of the flow starts again from 0
+    assert bump_generation() == 1
+    assert manager.reload_if_changed()
+    assert len(manager.loads) == 2